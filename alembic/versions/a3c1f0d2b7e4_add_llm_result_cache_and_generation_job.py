@@ -0,0 +1,78 @@
+"""add llm_result_cache and generation_job
+
+Revision ID: a3c1f0d2b7e4
+Revises: 5e91b75f693a
+Create Date: 2026-10-18 10:12:31.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c1f0d2b7e4'
+down_revision: Union[str, None] = '5e91b75f693a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_table(name: str) -> bool:
+    # 이 리비전 이전에는 app/main.py 의 create_all 로 만들어졌을 수 있으므로 이미 있으면 건너뜀
+    return name in sa.inspect(op.get_bind()).get_table_names()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not _has_table('llm_result_cache'):
+        op.create_table('llm_result_cache',
+        sa.Column('key', sa.String(length=64), nullable=False),
+        sa.Column('mode', sa.String(), nullable=True),
+        sa.Column('model_id', sa.String(), nullable=True),
+        sa.Column('result', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('last_hit_at', sa.DateTime(), nullable=True),
+        sa.Column('hit_count', sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint('key')
+        )
+        op.create_index(op.f('ix_llm_result_cache_mode'), 'llm_result_cache', ['mode'], unique=False)
+        op.create_index(op.f('ix_llm_result_cache_created_at'), 'llm_result_cache', ['created_at'], unique=False)
+        op.create_index(op.f('ix_llm_result_cache_last_hit_at'), 'llm_result_cache', ['last_hit_at'], unique=False)
+
+    if not _has_table('generation_job'):
+        op.create_table('generation_job',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('complaint_id', sa.Integer(), nullable=True),
+        sa.Column('user_uid', sa.String(), nullable=True),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('result', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=True),
+        sa.Column('worker_id', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['complaint_id'], ['complaint.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_uid'], ['user.user_uid'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_generation_job_id'), 'generation_job', ['id'], unique=False)
+        op.create_index(op.f('ix_generation_job_complaint_id'), 'generation_job', ['complaint_id'], unique=False)
+        op.create_index(op.f('ix_generation_job_user_uid'), 'generation_job', ['user_uid'], unique=False)
+        op.create_index('ix_generation_job_status_created_at', 'generation_job', ['status', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_generation_job_status_created_at', table_name='generation_job')
+    op.drop_index(op.f('ix_generation_job_user_uid'), table_name='generation_job')
+    op.drop_index(op.f('ix_generation_job_complaint_id'), table_name='generation_job')
+    op.drop_index(op.f('ix_generation_job_id'), table_name='generation_job')
+    op.drop_table('generation_job')
+    op.drop_index(op.f('ix_llm_result_cache_last_hit_at'), table_name='llm_result_cache')
+    op.drop_index(op.f('ix_llm_result_cache_created_at'), table_name='llm_result_cache')
+    op.drop_index(op.f('ix_llm_result_cache_mode'), table_name='llm_result_cache')
+    op.drop_table('llm_result_cache')
@@ -0,0 +1,31 @@
+"""add priority to generation_job
+
+Revision ID: c8d4e6b1a925
+Revises: a3c1f0d2b7e4
+Create Date: 2026-10-18 10:14:05.118932
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8d4e6b1a925'
+down_revision: Union[str, None] = 'a3c1f0d2b7e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # create_all 은 이미 있는 테이블에 컬럼을 추가하지 않으므로 여기서 추가 (기존 작업은 interactive)
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('generation_job')}
+    if 'priority' not in columns:
+        op.add_column('generation_job', sa.Column('priority', sa.String(), server_default='interactive', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('generation_job', 'priority')
@@ -0,0 +1,32 @@
+"""add waiters to generation_job
+
+Revision ID: e5f7a9c3d108
+Revises: c8d4e6b1a925
+Create Date: 2026-10-18 15:42:37.604215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5f7a9c3d108'
+down_revision: Union[str, None] = 'c8d4e6b1a925'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 이미 대기/실행 중인 작업은 요청한 쪽이 하나 있다고 보고 1 로 채운다 (연결이 끊겨도 취소되도록)
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('generation_job')}
+    if 'waiters' not in columns:
+        op.add_column('generation_job', sa.Column('waiters', sa.Integer(), server_default='0', nullable=False))
+        op.execute("UPDATE generation_job SET waiters = 1 WHERE status IN ('queued', 'running')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('generation_job', 'waiters')
@@ -0,0 +1,31 @@
+"""add adapter to generation_job
+
+Revision ID: f1b3d5e7a920
+Revises: e5f7a9c3d108
+Create Date: 2026-10-18 17:05:12.330481
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b3d5e7a920'
+down_revision: Union[str, None] = 'e5f7a9c3d108'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 기존 작업은 기본 모델(null)
+    columns = {c['name'] for c in sa.inspect(op.get_bind()).get_columns('generation_job')}
+    if 'adapter' not in columns:
+        op.add_column('generation_job', sa.Column('adapter', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('generation_job', 'adapter')
@@ -1,4 +1,5 @@
 import jwt
+import os
 from datetime import datetime, timedelta
 from typing import Optional
 from passlib.context import CryptContext
@@ -23,6 +24,10 @@ SECRET_KEY = "your_secret_key"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60  # 60분 만료
 
+# 관리자 로그인 ID (쉼표 구분). 모델 운영 API(LoRA 어댑터 로딩/해제)는 이 계정만 사용 가능
+# 비어 있으면 아무도 사용할 수 없음
+ADMIN_USER_IDS = {u.strip() for u in os.getenv("ADMIN_USER_IDS", "").split(",") if u.strip()}
+
 # 비밀번호 해시/검증 설정
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -70,4 +75,10 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         raise credentials_exception
 
     print(f"[DEBUG] 인증 성공: user_uid={user.user_uid}")
-    return user
\ No newline at end of file
+    return user
+
+# 관리자 확인 (로그인 + ADMIN_USER_IDS)
+def get_current_admin(current_user: User = Depends(get_current_user)):
+    if current_user.user_id not in ADMIN_USER_IDS:
+        raise HTTPException(status_code=403, detail="관리자만 사용할 수 있습니다.")
+    return current_user
@@ -1,12 +1,27 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.database import engine, Base
-from app.routers import complaint_history, complaint, user_info, login, register, user_history,user
+from app.routers import complaint_history, complaint, user_info, login, register, user_history,user, generation_job
 from app.services.llm_service import generate_answer, InputSchema
 from pydantic import BaseModel
 from fastapi.exceptions import RequestValidationError
 from fastapi import Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy import text
+from app.database import SessionLocal
+from llm.loader import model_loader
+from llm.admission import llm_admission, Overloaded
+from llm.registry import registry
+from llm.infer import result_cache, assisted_stats, backend_stats, list_adapters, load_adapter, unload_adapter
+from llm import metrics
+from app.services.llm_cache_store import PostgresCacheStore
+from app.services.generation_worker import GenerationWorker
+from app.services.singleflight import LockTimeout
+from app.auth import get_current_admin
+from fastapi import Depends
+from typing import Optional
+import os
+import anyio.to_thread
 
 
 
@@ -29,7 +44,7 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# DB 테이블 생성
+# DB 테이블 생성 (없는 테이블만 — 기존 테이블의 컬럼 변경은 alembic upgrade head)
 Base.metadata.create_all(bind=engine)
 
 # 라우터 등록
@@ -40,6 +55,38 @@ app.include_router(login.router)
 app.include_router(register.router)
 app.include_router(user_history.router)
 app.include_router(user.router)
+app.include_router(generation_job.router)
+
+# LLM 모델은 백그라운드에서 로딩 (서버는 바로 요청을 받음)
+@app.on_event("startup")
+def start_llm_loader():
+    model_loader.start()
+
+# LLM 생성 작업 워커 (generation_job 큐). 기본 1 스레드 (혼자 띄운 개발 환경에서도 작업이 처리되도록)
+# uvicorn 워커 / 노드마다 곱해지므로 운영에서는 LLM_JOB_INLINE_WORKERS=0 으로 두고
+# 전용 워커 프로세스(python -m app.services.generation_worker --threads N)를 따로 띄운다
+@app.on_event("startup")
+def start_generation_workers():
+    threads = int(os.getenv("LLM_JOB_INLINE_WORKERS", "1"))
+    if threads > 0:
+        GenerationWorker(SessionLocal, threads=threads).start()
+
+# 동기 라우트 threadpool 크기 = 기본 크기 + LLM admission 이 붙잡을 수 있는 최대 스레드 수
+# → LLM 요청이 몰려 전부 대기/진행 중이어도 비 LLM 라우트는 기본 크기만큼 스레드를 쓸 수 있다
+@app.on_event("startup")
+async def reserve_threadpool():
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    base = int(os.getenv("API_THREADPOOL_SIZE", str(int(limiter.total_tokens))))
+    limiter.total_tokens = base + llm_admission.capacity
+
+# LLM 결과 캐시의 2차 저장소(Postgres, 노드 간 공유) 연결
+@app.on_event("startup")
+def attach_llm_cache_store():
+    result_cache.attach_store(PostgresCacheStore(
+        SessionLocal,
+        max_rows=int(os.getenv("LLM_CACHE_MAX_ROWS", "50000")),
+        max_age_hours=float(os.getenv("LLM_CACHE_MAX_AGE_HOURS", "720")),
+    ))
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -51,11 +98,116 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
         }
     )
 
+# LLM admission 초과: 대기열이 가득 차면 429, 대기 시간이 지나면 503 (둘 다 Retry-After)
+@app.exception_handler(Overloaded)
+async def llm_overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": "요청이 많아 답변 생성을 시작할 수 없습니다. 잠시 후 다시 시도해주세요.", "reason": exc.reason},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+# 같은 민원을 다른 요청(노드)이 LLM_ADVISORY_LOCK_TIMEOUT 이 지나도록 생성 중: 503 + Retry-After
+@app.exception_handler(LockTimeout)
+async def llm_lock_timeout_handler(request: Request, exc: LockTimeout):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "같은 민원의 생성이 다른 요청에서 진행 중입니다. 잠시 후 다시 시도해주세요."},
+        headers={"Retry-After": os.getenv("LLM_ADMISSION_RETRY_AFTER", "5")},
+    )
+
 # 루트 엔드포인트
 @app.get("/")
 def root():
     return {"message": "DB 및 백엔드 정상 작동 중.."}
 
+# 프로세스 생존 확인
+@app.get("/healthz")
+def healthz():
+    return {"status": "ok"}
+
+# 모델 로딩 + DB 연결 + 워밍업까지 끝났는지 확인
+@app.get("/readyz")
+def readyz():
+    db_ok = True
+    db = SessionLocal()
+    try:
+        db.execute(text("SELECT 1"))
+    except Exception:
+        db_ok = False
+    finally:
+        db.close()
+
+    llm_status = model_loader.status()
+    ready = db_ok and model_loader.is_ready()
+    content = {"ready": ready, "db": db_ok, "llm": llm_status}
+    if ready:
+        return content
+    return JSONResponse(
+        status_code=503,
+        content=content,
+        headers={"Retry-After": str(model_loader.retry_after)},
+    )
+
+# LLM 결과 캐시 hit / miss 통계
+@app.get("/llm/cache/stats")
+def llm_cache_stats():
+    return result_cache.stats()
+
+# Prometheus 스크레이프용 (TTFT, 토큰 수, 대기열 대기, 배치 점유율 등 — llm/metrics.py)
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+# 모드별 LLM 백엔드 (GPU / CPU / ...) 라우팅 상태
+@app.get("/llm/backends")
+def llm_backends():
+    return backend_stats()
+
+# LLM admission 상태 (진행 / 대기 / 거절 수)
+@app.get("/llm/admission")
+def llm_admission_stats():
+    return llm_admission.stats()
+
+# 모델 레지스트리: 로딩된 모델별 RAM / VRAM, 사용 중 여부, 해제 횟수
+@app.get("/llm/registry")
+def llm_registry_stats():
+    return registry.stats()
+
+# 답변 문체 LoRA 어댑터 (부서별): 목록 / 로딩·교체 / 해제 — 서버 재시작 없이
+# 로딩·해제는 관리자(ADMIN_USER_IDS)만, 경로는 모델을 가진 프로세스(remote 면 모델 서버)의
+# LLM_ADAPTER_DIR 아래 safetensors 어댑터 디렉터리만
+class LoadAdapterRequest(BaseModel):
+    path: Optional[str] = None   # LLM_ADAPTER_DIR 기준 상대 경로 (없으면 어댑터 이름)
+
+@app.get("/llm/adapters")
+def llm_adapters():
+    return {"adapters": list_adapters()}
+
+@app.put("/llm/adapters/{name}", dependencies=[Depends(get_current_admin)])
+def llm_load_adapter(name: str, req: Optional[LoadAdapterRequest] = None):
+    try:
+        load_adapter(name, req.path if req else None)
+    except (ValueError, NotImplementedError) as e:
+        return JSONResponse(status_code=400, content={"detail": str(e)})
+    return {"adapters": list_adapters()}
+
+@app.delete("/llm/adapters/{name}", dependencies=[Depends(get_current_admin)])
+def llm_unload_adapter(name: str):
+    try:
+        unload_adapter(name)
+    except KeyError:
+        return JSONResponse(status_code=404, content={"detail": f"로딩되지 않은 어댑터입니다: {name}"})
+    except NotImplementedError as e:
+        return JSONResponse(status_code=400, content={"detail": str(e)})
+    return {"adapters": list_adapters()}
+
+# Assisted decoding 모드별 수락률
+@app.get("/llm/assisted/stats")
+def llm_assisted_stats():
+    return assisted_stats()
+
 # 인증된 사용자 정보 테스트 (선택)
 from fastapi import Depends
 from app.auth import get_current_user
@@ -67,5 +219,6 @@ def get_me(current_user: dict = Depends(get_current_user)):
 # LLM 답변 생성 API 등록
 @app.post("/generate_answer")
 def handle_complaint(complaint: Complaint):
-    response = generate_answer(InputSchema(content=complaint.content))
+    with llm_admission.admit():
+        response = generate_answer(InputSchema(content=complaint.content))
     return {"answer": response}
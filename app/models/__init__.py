@@ -4,4 +4,6 @@ from .reply import Reply
 from .user_info import UserInfo
 from .user_reply_history import UserReplyHistory
 from .complaint_history import ComplaintHistory
-from .similar_history import SimilarHistory 
\ No newline at end of file
+from .similar_history import SimilarHistory 
+from .llm_result_cache import LLMResultCache
+from .generation_job import GenerationJob
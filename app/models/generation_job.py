@@ -0,0 +1,47 @@
+# app/models/generation_job.py
+'''
+LLM 생성 작업 큐 테이블 (요약 / 답변 생성 비동기 처리)
+
+- API 는 작업을 queued 로 넣고 바로 202 + 작업 id 반환
+- 워커(여러 노드 가능)는 SELECT ... FOR UPDATE SKIP LOCKED 로 작업을 하나씩 가져감
+- 상태 흐름: queued → running → done / failed
+- 실행 중인 워커는 heartbeat_at 을 주기적으로 갱신. 워커가 죽어 갱신이 끊기면 다시 queued 로 돌려놓음
+- kind: "summary" / "reply" / "reply-again"
+- priority: "interactive" / "bulk" / "backfill" — 워커는 높은 우선순위부터, 같은 우선순위에서는
+  실행 중인 작업이 적은 사용자의 작업부터 가져감
+- adapter: 답변 작업의 문체(LoRA 어댑터 이름), 없으면 기본 모델. 요약 작업은 항상 null
+- result: summary → {"summary", "long_summary"}, reply → {"reply_id"}
+- waiters: 이 작업을 요청한(기다리는) 요청 수. 동기 라우트의 클라이언트가 떠나면 하나씩 줄고,
+  0 이 될 때만 작업을 취소함 (같은 작업을 함께 기다리는 다른 요청의 작업을 취소하지 않도록)
+'''
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from datetime import datetime
+from app.database import Base
+
+class GenerationJob(Base):
+    __tablename__ = "generation_job"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    complaint_id = Column(Integer, ForeignKey("complaint.id", ondelete="CASCADE"), index=True)
+    user_uid = Column(String, ForeignKey("user.user_uid"), index=True)
+    priority = Column(String, default="interactive", nullable=False)
+    adapter = Column(String, nullable=True)
+
+    status = Column(String, default="queued", nullable=False)
+    result = Column(JSONB, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, default=0)
+    worker_id = Column(String, nullable=True)
+    waiters = Column(Integer, default=0, server_default="0", nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_generation_job_status_created_at", "status", "created_at"),
+    )
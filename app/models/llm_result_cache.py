@@ -0,0 +1,26 @@
+# app/models/llm_result_cache.py
+'''
+LLM 생성 결과 캐시 테이블 (모든 API 노드가 공유하는 2차 캐시)
+
+- key: (모델 id, 프롬프트 템플릿 버전, 모드, 샘플링 파라미터, 정규화 입력) 의 sha256
+- mode: "short" / "long" / "reply" 등 생성 종류
+- result: 후처리까지 끝난 최종 텍스트
+- last_hit_at / hit_count: 최근 사용 시각과 재사용 횟수 → 오래되었거나 안 쓰이는 행부터 정리
+
+※ llm/cache.py 의 ResultCache 가 app/services/llm_cache_store.py 를 통해 사용
+'''
+
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from datetime import datetime
+from app.database import Base
+
+class LLMResultCache(Base):
+    __tablename__ = "llm_result_cache"
+
+    key = Column(String(64), primary_key=True)
+    mode = Column(String, index=True)
+    model_id = Column(String)
+    result = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    last_hit_at = Column(DateTime, default=datetime.utcnow, index=True)
+    hit_count = Column(Integer, default=0)
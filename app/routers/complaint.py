@@ -21,10 +21,24 @@ from sqlalchemy import text
 import re
 # from bllossom8b_infer.inference import generate_llm_reply  # 함수 임포트
 # from blossom_summarizer.summarizer import summarize_with_blossom
-from llm.infer import summarize, generate_reply as generate_llm_reply
+from llm.infer import generate_reply_stream as generate_llm_reply_stream, list_adapters as list_llm_adapters
+from llm.infer import REPLY_CANDIDATES, REPLY_CANDIDATES_MAX
+from llm.loader import model_loader, ModelNotReady
+from llm.context import request_context
+from llm.admission import llm_admission
+from app.services.complaint_generation import ensure_complaint_summaries, batch_generate_drafts
+from app.services.complaint_generation import reply_summary_text, save_reply_once
+from app.services.complaint_generation import generate_reply_candidates as generate_reply_candidate_contents, save_selected_reply
+from app.services import job_queue
+from app.services.job_queue import JobCancelled, JobFailed, JobTimeout
+from llm.cancellation import CancelToken, GenerationCancelled
+from starlette.concurrency import iterate_in_threadpool
+import anyio
+import os
+import time
 from typing import Any
 from sqlalchemy.orm import Session
-from app.schemas.complaint import ReplySummaryRequest
+from app.schemas.complaint import ReplySummaryRequest, BatchGenerateRequest, BatchGenerateResponse
 from app.models.complaint_history import ComplaintHistory
 from fastapi import Body
 from pydantic import BaseModel
@@ -38,32 +52,25 @@ logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 
-def wrap_body_to_json_string(core_text):
+def sse_event(event: str, data) -> str:
+    """Server-Sent Events 한 건을 문자열로 직렬화"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+class AdmittedStreamingResponse(StreamingResponse):
     """
-    프론트가 기대하는 형식:
-    body: '[{"index": "...", "section": [{"title": "...", "text": "..."}]}]'
-    로 맞추기 위한 래퍼.
+    llm_admission 자리(ticket)를 쥔 스트리밍 응답. 응답을 다 보내거나, 보내는 중 / 본문 시작 전에
+    연결이 끊겨도 응답이 끝나는 시점에 반납한다 (제너레이터가 한 번도 돌지 않아도)
     """
-    # 이미 리스트/딕셔너리 구조면 그대로 사용
-    if isinstance(core_text, (list, dict)):
-        body_blocks = core_text
-    else:
-        # 그냥 문자열이면 하나의 섹션으로 감싸기
-        text = str(core_text)
-        body_blocks = [
-            {
-                "index": "",  # 필요하면 "답변 내용" 같은 고정 문구 넣어도 됨
-                "section": [
-                    {
-                        "title": "",  # "가" 같은 타이틀 넣고 싶으면 여기
-                        "text": text,
-                    }
-                ],
-            }
-        ]
-
-    # 프론트가 JSON.parse 할 수 있도록 문자열로 반환
-    return json.dumps(body_blocks, ensure_ascii=False)
+    def __init__(self, content, ticket, **kwargs):
+        super().__init__(content, **kwargs)
+        self.ticket = ticket
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.ticket.release()
 
 
 router = APIRouter()
@@ -76,6 +83,67 @@ def get_db():
     finally:
         db.close()
 
+# LLM 모델 준비 여부 확인 (로딩/워밍업 중이면 503 + Retry-After)
+def require_llm_ready():
+    try:
+        model_loader.ensure_ready()
+    except ModelNotReady as e:
+        raise HTTPException(
+            status_code=503,
+            detail="LLM 모델을 준비 중입니다. 잠시 후 다시 시도해주세요.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+# 동기 LLM 라우트가 생성 작업을 기다리는 최대 시간 (초)
+JOB_WAIT_TIMEOUT = float(os.getenv("LLM_JOB_WAIT_TIMEOUT", "300"))
+
+def check_adapter(adapter: Optional[str]):
+    # 로딩되지 않은 LoRA 어댑터(부서 문체)면 생성을 시작하기 전에 400
+    if adapter is not None and adapter not in list_llm_adapters():
+        raise HTTPException(status_code=400, detail=f"사용할 수 없는 답변 문체(어댑터)입니다: {adapter}")
+
+
+def client_disconnected(request: Request) -> bool:
+    """동기 라우트(threadpool 스레드)에서 클라이언트 연결이 끊겼는지 확인"""
+    try:
+        return anyio.from_thread.run(request.is_disconnected)
+    except RuntimeError:
+        # 이벤트 루프 밖(직접 호출 등)이면 끊김 여부를 알 수 없음
+        return False
+
+
+def run_generation_job(db: Session, kind: str, complaint_id: int, user_uid: str,
+                       request: Optional[Request] = None, adapter: Optional[str] = None) -> dict:
+    """
+    생성 작업을 큐에 넣고 끝날 때까지 기다린 뒤 result 반환 (동기 라우트용 래퍼)
+    기다리는 동안 threadpool 스레드를 붙잡으므로 llm_admission 을 통과한 요청만 진행
+    (넘치면 Overloaded → 429 / 503 + Retry-After, app/main.py 의 예외 핸들러)
+    request 를 넘기면 기다리는 동안 클라이언트 연결이 끊길 경우 기다리기를 그만둔다 (화면을 떠난 담당자)
+    → 같은 작업을 기다리는 다른 요청이 없을 때만 작업도 취소 (job_queue.leave)
+    adapter 는 답변 문체(LoRA 어댑터) — 작업에 기록되어 워커가 그 어댑터로 생성한다
+    """
+    with llm_admission.admit():
+        job = job_queue.enqueue(db, kind, complaint_id, user_uid, adapter=adapter)
+        job_id = job.id
+        # 기다리는 동안 DB 연결을 잡고 있지 않도록 세션을 닫아 둔다 (이후 다시 사용 가능)
+        db.close()
+        return _wait_generation_job(job_id, request)
+
+def _wait_generation_job(job_id: int, request: Optional[Request] = None) -> dict:
+    should_cancel = (lambda: client_disconnected(request)) if request is not None else None
+    try:
+        return job_queue.wait_for_job(SessionLocal, job_id, timeout=JOB_WAIT_TIMEOUT, should_cancel=should_cancel)
+    except JobCancelled:
+        # 보통은 응답을 받을 클라이언트가 이미 없음 (nginx 관례의 499)
+        raise HTTPException(status_code=499, detail="생성이 취소되었습니다.")
+    except JobFailed as e:
+        raise HTTPException(status_code=500, detail=f"생성에 실패했습니다: {e}")
+    except JobTimeout:
+        raise HTTPException(
+            status_code=504,
+            detail=f"생성이 지연되고 있습니다. /jobs/{job_id} 에서 결과를 확인하세요.",
+        )
+
 # 단일 민원 생성 라우터
 @router.post("/complaints")
 def create_complaint(
@@ -337,9 +405,11 @@ def delete_complaint(
 
 # 6. 답변 생성(LLM) 라우터 
 # [complaint]의 content를 input하여 LLM 답변 생성
-@router.post("/complaints/{id}/generate-reply", response_model=ReplyBase)
+@router.post("/complaints/{id}/generate-reply", response_model=ReplyBase, dependencies=[Depends(require_llm_ready)])
 def generate_reply(
     id: int,
+    request: Request,
+    adapter: Optional[str] = Query(None, description="답변 문체 LoRA 어댑터 (부서별)"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -349,54 +419,136 @@ def generate_reply(
     ).first() 
     if not complaint:
         raise HTTPException(404, "민원이 없습니다.")
+    check_adapter(adapter)
+
+    # 요약 생성(없으면) + 답변 생성 + 저장은 생성 작업 워커가 수행
+    # (동시에 들어온 같은 요청은 하나의 작업/답변을 공유)
+    result = run_generation_job(db, "reply", id, current_user.user_uid, request=request, adapter=adapter)
+    return db.get(Reply, result["reply_id"])
 
-    # 요약 없으면 생성 (Kanana)
-    updated = False
-    if not complaint.summary:
-        complaint.summary = summarize(complaint.content, mode="short")
-        updated = True
-    if not complaint.long_summary:
-        complaint.long_summary = summarize(complaint.content, mode="long")
-        updated = True
-    if updated:
-        db.commit()
-        db.refresh(complaint)
 
-    # ✅ 도메인 분리 / RAG 없이 LLM 단일 호출
-    core_body = generate_llm_reply(
-        complaint.content,
-        complaint.reply_summary
+# 6-1. 답변 생성(LLM) 스트리밍 라우터
+# 디코딩되는 토큰을 Server-Sent Events 로 바로 전달하고, 끝나면 6번과 동일하게 [reply] 저장
+# 이벤트: summary(요약 확정) → token(텍스트 조각, 여러 번) → done(저장된 답변) / error
+# 클라이언트 연결이 끊기면 취소 토큰으로 생성을 멈추고(다음 디코드 스텝에서 배치에서 빠짐) 답변은 저장하지 않음
+@router.get("/complaints/{id}/generate-reply/stream", dependencies=[Depends(require_llm_ready)])
+def generate_reply_stream(
+    id: int,
+    adapter: Optional[str] = Query(None, description="답변 문체 LoRA 어댑터 (부서별)"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    complaint = db.query(Complaint).filter(
+        Complaint.id == id,
+        Complaint.user_uid == current_user.user_uid
+    ).first()
+    if not complaint:
+        raise HTTPException(404, "민원이 없습니다.")
+    check_adapter(adapter)
+    # 답변요지가 없으면 요약까지 만들고 나서 실패하지 않도록 스트림을 시작하기 전에 400
+    reply_summary = reply_summary_text(complaint)
+    if not reply_summary:
+        raise HTTPException(400, "답변요지가 없습니다. 답변요지를 먼저 저장해주세요.")
+
+    user_uid = current_user.user_uid
+    # 이 시각 이후에 다른 요청이 만든 답변이 있으면 저장할 때 새로 넣지 않는다 (save_reply_once)
+    requested_at = datetime.utcnow()
+    # 응답이 끝날 때 반납 (넘치면 응답 시작 전에 429 / 503)
+    ticket = llm_admission.acquire()
+    token = CancelToken()
+
+    # 의존성으로 받은 세션은 응답 스트리밍 전에 닫히므로 스트림 안에서는 별도 세션 사용
+    def event_stream():
+        stream_db = SessionLocal()
+        try:
+            target = stream_db.query(Complaint).filter(Complaint.id == id).first()
+            with request_context(priority="interactive", user=user_uid):
+                ensure_complaint_summaries(target, stream_db)
+            yield sse_event("summary", {
+                "summary": target.summary,
+                "long_summary": target.long_summary,
+            })
+
+            chunks = []
+            for chunk in generate_llm_reply_stream(target.content, reply_summary, user=user_uid, adapter=adapter,
+                                                   cancel=token):
+                chunks.append(chunk)
+                yield sse_event("token", {"text": chunk})
+
+            # 6번 / 생성 작업과 같은 single-flight 키로 저장 (동시에 만든 답변이 있으면 그것을 돌려줌)
+            reply_id = save_reply_once(id, user_uid, requested_at, "".join(chunks), adapter=adapter)
+            reply = stream_db.get(Reply, reply_id)
+
+            yield sse_event("done", ReplyBase.model_validate(reply).model_dump(mode="json"))
+        except GenerationCancelled:
+            stream_db.rollback()
+            logger.info(f"[답변 스트리밍] complaint_id={id} 연결 끊김으로 생성 취소")
+        except Exception as e:
+            stream_db.rollback()
+            logger.exception(f"[답변 스트리밍] complaint_id={id} 생성 실패")
+            yield sse_event("error", {"detail": str(e)})
+        finally:
+            stream_db.close()
+
+    return AdmittedStreamingResponse(
+        cancel_on_disconnect(event_stream(), token),
+        ticket,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
-    # ✅ 프론트 기대 형식(JSON 문자열)로 변환
-    body_json_str = wrap_body_to_json_string(core_body)
 
-    # ✅ 표준 reply.content 구조로 재조립
-    reply_content = {
-        "header": "평소 구정에 관심을 가져주셔서 감사합니다.",
-        "summary": f"귀하의 민원은 '{complaint.summary}'에 관한 것으로 이해됩니다.",
-        "body": body_json_str,  # JSON 문자열
-        "footer": "추가 문의는 담당 부서로 연락 바랍니다.",
-    }
+async def cancel_on_disconnect(events, token: CancelToken):
+    """
+    동기 SSE 제너레이터를 threadpool 에서 돌리다가, 연결이 끊겨 StreamingResponse 가 멈추면
+    토큰을 취소하고 제너레이터를 닫는다 (그냥 두면 생성이 끝까지 돌고 답변까지 저장됨)
+    """
+    try:
+        async for event in iterate_in_threadpool(events):
+            yield event
+    finally:
+        token.cancel("client_disconnected")
+        events.close()
 
-    # ✅ DB 저장
-    reply = Reply(
-        complaint_id=id,
-        content=reply_content,
-        user_uid=current_user.user_uid
-    )
-    db.add(reply)
-    db.commit()
-    db.refresh(reply)
 
-    return reply
+# 6-2. 여러 민원 일괄 생성 (짧은 요약 + 긴 요약 + 답변 초안)
+# 엑셀 업로드 후 한 번에 초안까지 만들 때 사용. 민원별 처리 결과(status)를 함께 반환
+BATCH_GENERATE_MAX = int(os.getenv("LLM_BATCH_GENERATE_MAX", "500"))
+
+@router.post("/complaints/batch-generate", response_model=BatchGenerateResponse, dependencies=[Depends(require_llm_ready)])
+def batch_generate(
+    req: BatchGenerateRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    if not req.complaint_ids:
+        raise HTTPException(status_code=400, detail="complaint_ids 가 비어 있습니다.")
+    if len(req.complaint_ids) > BATCH_GENERATE_MAX:
+        raise HTTPException(status_code=400, detail=f"한 번에 최대 {BATCH_GENERATE_MAX}건까지 생성할 수 있습니다.")
+    check_adapter(req.adapter)
+
+    started = time.monotonic()
+    with llm_admission.admit():
+        items = batch_generate_drafts(db, req.complaint_ids, current_user.user_uid, regenerate=req.regenerate,
+                                      adapter=req.adapter)
+    failed = sum(1 for item in items if item["status"] in ("failed", "not_found"))
+
+    return BatchGenerateResponse(
+        total=len(items),
+        succeeded=len(items) - failed,
+        failed=failed,
+        elapsed_seconds=round(time.monotonic() - started, 2),
+        items=items,
+    )
 
 
 # 7. 답변 재생산(LLM) 라우터 
 # 기존 [reply] 데이터 삭제 후, LLM으로 다시 생성
-@router.post("/complaints/{id}/generate-reply-again", response_model=ReplyBase)
+@router.post("/complaints/{id}/generate-reply-again", response_model=ReplyBase, dependencies=[Depends(require_llm_ready)])
 def generate_reply_again(
     id: int, 
+    request: Request,
+    adapter: Optional[str] = Query(None, description="답변 문체 LoRA 어댑터 (부서별)"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -406,53 +558,61 @@ def generate_reply_again(
     ).first()
     if not complaint:
         raise HTTPException(404, "민원이 없습니다.")
+    check_adapter(adapter)
 
-    # 기존 답변 삭제
-    db.query(Reply).filter(Reply.complaint_id == id).delete()
-    db.commit()
+    # 요약 생성(없으면) + 기존 답변 삭제 + 새로 생성은 생성 작업 워커가 수행
+    result = run_generation_job(db, "reply-again", id, current_user.user_uid, request=request, adapter=adapter)
+    return db.get(Reply, result["reply_id"])
 
-    # 요약 없으면 생성
-    updated = False
-    if not complaint.summary:
-        complaint.summary = summarize(complaint.content, mode="short")
-        updated = True
-    if not complaint.long_summary:
-        complaint.long_summary = summarize(complaint.content, mode="long")
-        updated = True
-    if updated:
-        db.commit()
-        db.refresh(complaint)
 
-    # ✅ 도메인 분리 / RAG 없이 LLM 단일 호출
-    core_body = generate_llm_reply(
-        complaint.content,
-        complaint.reply_summary
-    )
 
-    # ✅ 프론트 기대 형식(JSON 문자열)로 변환
-    body_json_str = wrap_body_to_json_string(core_body)
+# 7-1. 답변 후보 여러 개 생성 (LLM)
+# 재생성을 여러 번 반복하는 대신 후보 k개를 한 번에 만들어 고르게 한다 (프롬프트 prefill 은 한 번)
+# 후보는 저장하지 않고 generated_replies 로 반환, 현재 저장된 답변은 selected_reply
+@router.post("/complaints/{id}/generate-reply-candidates", response_model=FullReplySummaryResponse,
+             dependencies=[Depends(require_llm_ready)])
+def generate_reply_candidates(
+    id: int,
+    k: int = Query(REPLY_CANDIDATES, ge=1, le=REPLY_CANDIDATES_MAX, description="후보 수"),
+    adapter: Optional[str] = Query(None, description="답변 문체 LoRA 어댑터 (부서별)"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    complaint = db.query(Complaint).filter(
+        Complaint.id == id,
+        Complaint.user_uid == current_user.user_uid
+    ).first()
+    if not complaint:
+        raise HTTPException(404, "민원이 없습니다.")
+    check_adapter(adapter)
 
-    # ✅ 표준 reply.content 구조로 재조립
-    reply_content = {
-        "header": "평소 구정에 관심을 가져주셔서 감사합니다.",
-        "summary": f"귀하의 민원은 '{complaint.summary}'에 관한 것으로 이해됩니다.",
-        "body": body_json_str,  # JSON 문자열
-        "footer": "추가 문의는 담당 부서로 연락 바랍니다.",
-    }
+    with llm_admission.admit(), request_context(priority="interactive", user=current_user.user_uid):
+        candidates = generate_reply_candidate_contents(complaint, db, k, adapter=adapter)
 
-    reply = Reply(
-        complaint_id=id,
-        content=reply_content,
-        user_uid=current_user.user_uid
+    selected = db.query(Reply).filter(Reply.complaint_id == id).order_by(Reply.id.desc()).first()
+    return FullReplySummaryResponse(
+        summary=complaint.reply_summary,
+        selected_reply=ReplyBase.model_validate(selected) if selected else None,
+        generated_replies=candidates,
     )
 
-    # 상태 플래그는 기존 로직 유지
-    complaint.reply_status = "수정중"
-    db.add(reply)
-    db.commit()
-    db.refresh(reply)
 
-    return reply
+# 7-2. 답변 후보 선택
+# 7-1 에서 고른 후보(content)를 답변으로 저장 (기존 답변은 교체)
+@router.post("/complaints/{id}/reply-candidates/select", response_model=ReplyBase)
+def select_reply_candidate(
+    id: int,
+    content: Any = Body(..., embed=True),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    complaint = db.query(Complaint).filter(
+        Complaint.id == id,
+        Complaint.user_uid == current_user.user_uid
+    ).first()
+    if not complaint:
+        raise HTTPException(404, "민원이 없습니다.")
+    return save_selected_reply(db, complaint, current_user.user_uid, content)
 
 
 
@@ -528,7 +688,7 @@ def get_all_replies(
 
 # 9. 민원 요약(LLM) 라우터(없으면 생성 후 반환)
 #[complaint]의 content를 input하여  LLM모델로 summary 생성
-@router.get("/complaints/{id}/summary", response_model=ComplaintSummaryResponse)
+@router.get("/complaints/{id}/summary", response_model=ComplaintSummaryResponse, dependencies=[Depends(require_llm_ready)])
 def get_complaint_summary(
     id: int,
     db: Session = Depends(get_db),
@@ -542,17 +702,10 @@ def get_complaint_summary(
     if not complaint:
         raise HTTPException(status_code=404, detail="해당 민원이 없거나 권한이 없습니다.")
 
-    # Short summary 생성
-    if not complaint.summary:
-        complaint.summary = summarize(complaint.content, mode="short")
-        db.commit()
-        db.refresh(complaint)
-
-    # Long summary 생성
-    if not complaint.long_summary:
-        complaint.long_summary = summarize(complaint.content, mode="long")
-        db.commit()
-        db.refresh(complaint)
+    # Short / Long summary 생성 (없는 것만, 한 번에) — 생성 작업 워커가 수행
+    if not (complaint.summary and complaint.long_summary):
+        run_generation_job(db, "summary", id, current_user.user_uid)
+        complaint = db.get(Complaint, id)
 
     return ComplaintSummaryResponse(
         title=complaint.title,
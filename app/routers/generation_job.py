@@ -0,0 +1,159 @@
+# app/routers/generation_job.py
+'''
+LLM 생성 작업 API (비동기)
+
+- POST /complaints/{id}/jobs?kind=reply   작업 등록 → 202 + 작업 정보 (Location: /jobs/{job_id})
+                                          priority=interactive(기본) / bulk / backfill
+                                          adapter=답변 문체 LoRA 어댑터 (답변 작업만, 없으면 기본 모델)
+- GET  /jobs/{job_id}                     상태 / 대기 순번 / 결과 조회
+- GET  /jobs/{job_id}/events              SSE: status(상태 변경 시마다) → done(결과) / cancelled / error
+- POST /jobs/{job_id}/cancel              작업 취소 (대기 중이면 바로 cancelled, 실행 중이면 cancelling →
+                                          워커가 다음 디코드 스텝에서 생성을 멈추고 cancelled, 답변은 저장하지 않음)
+
+kind: summary(요약) / reply(답변 생성) / reply-again(답변 재생성)
+작업은 generation_job 테이블에 쌓이고 워커(app/services/generation_worker.py)가 처리한다.
+'''
+
+import time
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.auth import get_current_user
+from app.database import SessionLocal
+from app.models.complaint import Complaint
+from app.models.generation_job import GenerationJob
+from app.models.reply import Reply
+from app.models.user import User
+from app.routers.complaint import check_adapter, get_db, sse_event
+from app.schemas.generation_job import GenerationJobResponse
+from app.schemas.reply import ReplyBase
+from app.services import job_queue
+
+router = APIRouter()
+
+# SSE 상태 확인 주기 / 최대 스트리밍 시간 (초)
+EVENT_POLL_INTERVAL = 0.5
+EVENT_MAX_SECONDS = 600
+
+
+def job_to_response(db: Session, job: GenerationJob) -> GenerationJobResponse:
+    response = GenerationJobResponse.model_validate(job)
+    response.position = job_queue.queue_position(db, job)
+    return response
+
+
+def get_owned_job(db: Session, job_id: int, user_uid: str) -> GenerationJob:
+    job = db.query(GenerationJob).filter(
+        GenerationJob.id == job_id,
+        GenerationJob.user_uid == user_uid,
+    ).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="해당 작업이 없거나 권한이 없습니다.")
+    return job
+
+
+# 작업 등록 (같은 민원의 같은 작업이 이미 대기/실행 중이면 그 작업을 반환)
+@router.post("/complaints/{id}/jobs", status_code=202, response_model=GenerationJobResponse)
+def create_generation_job(
+    id: int,
+    response: Response,
+    kind: str = Query("reply", pattern="^(summary|reply|reply-again)$"),
+    priority: str = Query("interactive", pattern="^(interactive|bulk|backfill)$"),
+    adapter: Optional[str] = Query(None, description="답변 문체 LoRA 어댑터 (부서별, 답변 작업만)"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    complaint = db.query(Complaint).filter(
+        Complaint.id == id,
+        Complaint.user_uid == current_user.user_uid
+    ).first()
+    if not complaint:
+        raise HTTPException(status_code=404, detail="해당 민원이 없거나 권한이 없습니다.")
+    check_adapter(adapter)
+
+    job = job_queue.enqueue(db, kind, id, current_user.user_uid, priority=priority, adapter=adapter)
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return job_to_response(db, job)
+
+
+# 작업 상태 조회
+@router.get("/jobs/{job_id}", response_model=GenerationJobResponse)
+def get_generation_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    job = get_owned_job(db, job_id, current_user.user_uid)
+    return job_to_response(db, job)
+
+
+# 작업 취소 (이미 끝난 작업이면 상태만 그대로 반환)
+@router.post("/jobs/{job_id}/cancel", response_model=GenerationJobResponse)
+def cancel_generation_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    job = get_owned_job(db, job_id, current_user.user_uid)
+    job_queue.cancel(db, job.id)
+    db.refresh(job)
+    return job_to_response(db, job)
+
+
+# 작업 진행 상황 SSE
+# 이벤트: status(상태/대기 순번이 바뀔 때) → done(결과, 답변 작업이면 저장된 답변 포함) / cancelled / error
+@router.get("/jobs/{job_id}/events")
+def stream_generation_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    get_owned_job(db, job_id, current_user.user_uid)
+
+    # 의존성으로 받은 세션은 응답 스트리밍 전에 닫히므로 확인할 때마다 짧은 세션 사용
+    def event_stream():
+        last = None
+        deadline = time.monotonic() + EVENT_MAX_SECONDS
+        while time.monotonic() < deadline:
+            poll_db = SessionLocal()
+            try:
+                job = poll_db.get(GenerationJob, job_id)
+                response = job_to_response(poll_db, job) if job is not None else None
+                reply = None
+                if job is not None and job.status == "done" and job.result and job.result.get("reply_id"):
+                    reply = poll_db.get(Reply, job.result["reply_id"])
+                    reply = ReplyBase.model_validate(reply).model_dump(mode="json") if reply else None
+            finally:
+                poll_db.close()
+
+            if response is None:
+                # 스트리밍 중에 작업이 삭제됨 (민원 삭제 등) — 이미 200 으로 응답을 시작했으므로 error 이벤트로 알림
+                yield sse_event("error", {"detail": "해당 작업이 삭제되었습니다."})
+                return
+
+            state = (response.status, response.position)
+            if state != last:
+                yield sse_event("status", {"status": response.status, "position": response.position})
+                last = state
+
+            if response.status == "done":
+                yield sse_event("done", {"result": response.result, "reply": reply})
+                return
+            if response.status == "cancelled":
+                yield sse_event("cancelled", {})
+                return
+            if response.status == "failed":
+                yield sse_event("error", {"detail": response.error})
+                return
+            time.sleep(EVENT_POLL_INTERVAL)
+
+        yield sse_event("error", {"detail": "작업 대기 시간 초과"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -22,6 +22,8 @@
 
 6. FullReplySummaryResponse
     - 답변 요약 전체 구조 반환 (요약 리스트, 선택된 요약 포함)
+    - 답변 후보 생성(POST /complaints/{id}/generate-reply-candidates): summary = 답변요지,
+      selected_reply = 현재 저장된 답변, generated_replies = 후보 reply.content 목록 (저장 전)
 
 7. ReplySummaryUpdateRequest / ReplySummaryRequest
     - 답변 요약 저장 또는 수정 요청 시 사용
@@ -31,6 +33,9 @@
     - 요약 항목 구성에 사용되는 내부 구조 모델
     - Section은 단일 제목/텍스트, AnswerSummaryItem은 여러 section을 포함하는 블록
 
+9. BatchGenerateRequest / BatchGenerateResponse
+    - 여러 민원의 요약 + 답변 초안 일괄 생성 요청 / 민원별 처리 결과(status) 반환
+
 공통 설정:
 - 모든 응답 모델에 `orm_mode = True` 설정 → SQLAlchemy 모델과 자동 매핑 가능
 '''
@@ -109,4 +114,26 @@ class AnswerSummaryItem(BaseModel):
     
 
 class ReplySummaryRequest(BaseModel):
-    answer_summary: List[AnswerSummaryItem]
\ No newline at end of file
+    answer_summary: List[AnswerSummaryItem]
+
+
+# 여러 민원 일괄 생성 (요약 + 답변 초안)
+class BatchGenerateRequest(BaseModel):
+    complaint_ids: List[int]
+    regenerate: bool = False   # True 면 기존 요약/답변이 있어도 새로 생성
+    adapter: Optional[str] = None   # 답변 문체 LoRA 어댑터 (부서별, GET /llm/adapters)
+
+class BatchGenerateItem(BaseModel):
+    complaint_id: int
+    status: str   # done / skipped / not_found / failed
+    summary: Optional[str] = None
+    long_summary: Optional[str] = None
+    reply_id: Optional[int] = None
+    detail: Optional[str] = None
+
+class BatchGenerateResponse(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    elapsed_seconds: float
+    items: List[BatchGenerateItem]
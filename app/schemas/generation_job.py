@@ -0,0 +1,36 @@
+# app/schemas/generation_job.py
+'''
+✅ LLM 생성 작업(GenerationJob) 응답 스키마
+
+1. GenerationJobResponse
+    - 작업 상태 조회 / 작업 생성(202) 응답
+    - status: queued → running → done / failed (취소: queued → cancelled, running → cancelling → cancelled)
+    - priority: interactive / bulk / backfill
+    - adapter: 답변 문체(LoRA 어댑터), 기본 모델이면 null
+    - position: 대기 중일 때 앞에 있는 작업 수 (그 외 상태에서는 null)
+    - result: summary 작업 → {"summary", "long_summary"}, 답변 작업 → {"reply_id"}
+
+공통 설정:
+- `orm_mode = True`: ORM 모델과 자동 변환 가능
+'''
+
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Any, Optional
+
+class GenerationJobResponse(BaseModel):
+    id: int
+    kind: str
+    complaint_id: int
+    priority: str
+    adapter: Optional[str] = None
+    status: str
+    position: Optional[int] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
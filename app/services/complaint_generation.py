@@ -0,0 +1,340 @@
+# app/services/complaint_generation.py
+'''
+민원 요약 / 답변 생성 + 저장 (라우터, 생성 작업 워커가 함께 사용)
+
+- ensure_complaint_summaries: 요약이 없으면 생성해서 저장
+- reply_summary_text: 답변요지(reply_summary)를 프롬프트에 넣을 문자열로
+- create_reply_once: 답변 생성 후 Reply 저장, reply id 반환
+- save_reply_once: 스트리밍으로 이미 만든 답변 본문을 create_reply_once 와 같은 키 / 같은 규칙으로 저장
+- batch_generate_drafts: 여러 민원의 요약 + 답변 초안을 한 번에 생성하고 한 트랜잭션으로 저장
+- generate_reply_candidates / save_selected_reply: 답변 후보 여러 개를 한 번에 생성(저장 안 함) → 고른 것만 저장
+- 같은 민원에 대한 동시 생성은 llm_flights(single-flight)로 한 번만 실행 (일괄 생성 포함)
+  답변 키는 reply_flight_key — 문체(LoRA 어댑터)가 다르면 결과가 다르므로 키도 따로
+- 세션은 함수 안에서 따로 열기 때문에 요청 스레드 / 워커 스레드 어디서 불러도 된다
+'''
+
+import json
+import os
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, lock_engine
+from app.models.complaint import Complaint
+from app.models.reply import Reply
+from app.services.singleflight import Coalescer
+from llm.cancellation import CancelToken
+from llm.infer import summarize, summarize_both, generate_reply as generate_llm_reply, generate_drafts
+from llm.infer import generate_reply_candidates as generate_llm_reply_candidates
+
+
+def wrap_body_to_json_string(core_text):
+    """
+    프론트가 기대하는 형식:
+    body: '[{"index": "...", "section": [{"title": "...", "text": "..."}]}]'
+    로 맞추기 위한 래퍼.
+    """
+    # 이미 리스트/딕셔너리 구조면 그대로 사용
+    if isinstance(core_text, (list, dict)):
+        body_blocks = core_text
+    else:
+        # 그냥 문자열이면 하나의 섹션으로 감싸기
+        text = str(core_text)
+        body_blocks = [
+            {
+                "index": "",  # 필요하면 "답변 내용" 같은 고정 문구 넣어도 됨
+                "section": [
+                    {
+                        "title": "",  # "가" 같은 타이틀 넣고 싶으면 여기
+                        "text": text,
+                    }
+                ],
+            }
+        ]
+
+    # 프론트가 JSON.parse 할 수 있도록 문자열로 반환
+    return json.dumps(body_blocks, ensure_ascii=False)
+
+
+# 같은 민원에 대한 요약/답변 생성이 동시에 들어오면 (더블클릭, 탭 두 개, 다른 API 노드) 한 번만 생성
+# 프로세스 안에서는 결과를 공유하고, 노드 사이에서는 Postgres advisory lock 으로 순서대로 실행
+# (LLM_ADVISORY_LOCK_TIMEOUT 초 안에 못 잡으면 LockTimeout → 503)
+llm_flights = Coalescer(
+    lock_engine,
+    use_advisory_lock=os.getenv("LLM_ADVISORY_LOCK", "1") != "0",
+    lock_timeout=float(os.getenv("LLM_ADVISORY_LOCK_TIMEOUT", "300")),
+)
+
+
+def ensure_complaint_summaries(complaint, db: Session):
+    """요약(짧은/긴)이 없으면 생성해서 저장 (Kanana)"""
+    if complaint.summary and complaint.long_summary:
+        return
+
+    llm_flights.run(("summary", complaint.id), lambda: fill_complaint_summaries(complaint.id))
+    db.refresh(complaint)
+
+
+def reply_summary_text(complaint) -> str:
+    """
+    답변요지(reply_summary)를 프롬프트용 문자열로 반환.
+    민원 등록 시 {} 로 비워 두거나 JSON 으로 저장하는 경우가 있어 문자열이 아니면 직렬화, 없으면 "".
+    """
+    reply_summary = complaint.reply_summary
+    if reply_summary and not isinstance(reply_summary, str):
+        reply_summary = json.dumps(reply_summary, ensure_ascii=False)
+    return reply_summary or ""
+
+
+def fill_complaint_summaries(complaint_id: int) -> int:
+    """single-flight 안에서 실행. 먼저 끝난 요청이 이미 채웠으면 아무 것도 하지 않음"""
+    db = SessionLocal()
+    try:
+        complaint = db.get(Complaint, complaint_id)
+        if complaint is None or (complaint.summary and complaint.long_summary):
+            return complaint_id
+
+        # 둘 다 없으면 한 배치로 동시에 생성, 하나만 없으면 그것만 생성
+        if not complaint.summary and not complaint.long_summary:
+            complaint.summary, complaint.long_summary = summarize_both(complaint.content)
+        elif not complaint.summary:
+            complaint.summary = summarize(complaint.content, mode="short")
+        else:
+            complaint.long_summary = summarize(complaint.content, mode="long")
+        db.commit()
+        return complaint_id
+    finally:
+        db.close()
+
+
+def reply_flight_key(op: str, complaint_id: int, adapter: Optional[str] = None) -> tuple:
+    """답변 생성 / 저장의 single-flight 키 (op: "reply" / "reply-again"). 어댑터를 쓰면 어댑터 이름까지"""
+    return (op, complaint_id) if adapter is None else (op, complaint_id, adapter)
+
+
+def create_reply_once(complaint_id: int, user_uid: str, requested_at: datetime, regenerate: bool = False,
+                      cancel: Optional[CancelToken] = None, adapter: Optional[str] = None) -> int:
+    """
+    답변 생성 + 저장을 민원별 single-flight 로 한 번만 수행하고 reply id 를 반환.
+    adapter 를 주면 그 부서 문체(LoRA 어댑터)로 생성한다 (single-flight 키에도 포함).
+    requested_at 이후에 만들어진 답변이 이미 있으면 (동시에 들어온 다른 요청이 만든 것) 그것을 돌려준다.
+    regenerate=True 면 기존 답변을 지우고 캐시 없이 새로 생성 (답변 재생성).
+    cancel 이 취소되면 생성을 멈추고 GenerationCancelled — 답변은 저장하지 않는다 (기존 답변도 그대로).
+    """
+    def create() -> int:
+        db = SessionLocal()
+        try:
+            existing = _reply_since(db, complaint_id, requested_at)
+            if existing is not None:
+                return existing
+
+            complaint = db.get(Complaint, complaint_id)
+
+            # ✅ 도메인 분리 / RAG 없이 LLM 단일 호출
+            core_body = generate_llm_reply(
+                complaint.content,
+                reply_summary_text(complaint),
+                use_cache=not regenerate,  # 재생성은 항상 새로 생성
+                adapter=adapter,
+                cancel=cancel,
+            )
+
+            if regenerate:
+                # 기존 답변 삭제 (새 답변과 같은 트랜잭션)
+                db.query(Reply).filter(Reply.complaint_id == complaint_id).delete()
+                # 상태 플래그는 기존 로직 유지
+                complaint.reply_status = "수정중"
+
+            # ✅ 표준 reply.content 구조로 재조립 후 저장
+            reply = Reply(
+                complaint_id=complaint_id,
+                content=build_reply_content(complaint, core_body),
+                user_uid=user_uid
+            )
+            db.add(reply)
+            db.commit()
+            return reply.id
+        finally:
+            db.close()
+
+    op = "reply-again" if regenerate else "reply"
+    return llm_flights.run(reply_flight_key(op, complaint_id, adapter), create)
+
+
+def save_reply_once(complaint_id: int, user_uid: str, requested_at: datetime, core_body,
+                    adapter: Optional[str] = None) -> int:
+    """
+    스트리밍 라우트가 생성한 답변 본문 저장. create_reply_once 와 같은 ("reply", 민원[, 어댑터]) single-flight 키 안에서
+    requested_at 이후의 답변이 이미 있으면 (동시에 들어온 생성 요청 / 작업이 만든 것) 새로 넣지 않고 그 id 를 반환
+    """
+    def save() -> int:
+        db = SessionLocal()
+        try:
+            existing = _reply_since(db, complaint_id, requested_at)
+            if existing is not None:
+                return existing
+
+            complaint = db.get(Complaint, complaint_id)
+            reply = Reply(
+                complaint_id=complaint_id,
+                content=build_reply_content(complaint, core_body),
+                user_uid=user_uid
+            )
+            db.add(reply)
+            db.commit()
+            return reply.id
+        finally:
+            db.close()
+
+    return llm_flights.run(reply_flight_key("reply", complaint_id, adapter), save)
+
+
+def _reply_since(db: Session, complaint_id: int, requested_at: datetime) -> Optional[int]:
+    reply_id = db.query(Reply.id).filter(
+        Reply.complaint_id == complaint_id,
+        Reply.created_at >= requested_at,
+    ).order_by(Reply.id.desc()).limit(1).scalar()
+    return reply_id
+
+
+def generate_reply_candidates(complaint, db: Session, k: int, adapter: Optional[str] = None) -> List[dict]:
+    """
+    답변 후보 k개를 한 번의 LLM 요청으로 생성해 표준 reply.content 구조 목록으로 반환 (저장하지 않음).
+    요약이 없으면 먼저 생성해서 저장한다. 같은 후보는 한 번만 들어가므로 k개보다 적을 수 있다.
+    """
+    ensure_complaint_summaries(complaint, db)
+    cores = generate_llm_reply_candidates(complaint.content, reply_summary_text(complaint), k=k, adapter=adapter)
+    return [build_reply_content(complaint, core) for core in cores]
+
+
+def save_selected_reply(db: Session, complaint, user_uid: str, content) -> Reply:
+    """담당자가 고른 후보를 답변으로 저장. 기존 답변은 지우고 상태는 '수정중' (답변 재생성과 같은 처리)"""
+    db.query(Reply).filter(Reply.complaint_id == complaint.id).delete()
+    complaint.reply_status = "수정중"
+    reply = Reply(complaint_id=complaint.id, content=content, user_uid=user_uid)
+    db.add(reply)
+    db.commit()
+    db.refresh(reply)
+    return reply
+
+
+def build_reply_content(complaint, core_body) -> dict:
+    """LLM 본문을 표준 reply.content 구조로 재조립"""
+    # ✅ 프론트 기대 형식(JSON 문자열)로 변환
+    body_json_str = wrap_body_to_json_string(core_body)
+
+    return {
+        "header": "평소 구정에 관심을 가져주셔서 감사합니다.",
+        "summary": f"귀하의 민원은 '{complaint.summary}'에 관한 것으로 이해됩니다.",
+        "body": body_json_str,  # JSON 문자열
+        "footer": "추가 문의는 담당 부서로 연락 바랍니다.",
+    }
+
+
+def batch_generate_drafts(db: Session, complaint_ids: List[int], user_uid: str, regenerate: bool = False,
+                          adapter: Optional[str] = None) -> List[dict]:
+    """
+    여러 민원의 짧은 요약 / 긴 요약 / 답변 초안을 한 번에 생성 (llm.infer.generate_drafts).
+    - 없는 것만 생성 (regenerate=True 면 전부 새로 생성하고 기존 답변은 삭제)
+    - 답변요지(reply_summary)가 없는 민원은 답변 초안을 만들지 않음
+    - adapter 를 주면 답변 초안을 그 부서 문체(LoRA 어댑터)로 생성
+    - 단건 생성과 같은 single-flight 키를 기다리지 않고 잡는다. 다른 요청(다른 노드 포함)이
+      생성 중인 민원은 건너뛰고, 잡은 민원의 단건 요청은 일괄 생성이 끝날 때까지 기다린다
+    - 생성이 끝나면 요약 갱신 + Reply 추가를 한 번의 commit 으로 저장
+    반환: 요청 순서대로 민원별 처리 결과
+    """
+    ids = list(dict.fromkeys(complaint_ids))
+    complaints = {
+        c.id: c for c in db.query(Complaint).filter(
+            Complaint.id.in_(ids),
+            Complaint.user_uid == user_uid,
+        ).all()
+    }
+    keys = {
+        cid: [("summary", cid), reply_flight_key("reply", cid, adapter), reply_flight_key("reply-again", cid, adapter)]
+        for cid in complaints
+    }
+
+    results = {}
+    with llm_flights.hold(key for cid in complaints for key in keys[cid]) as held:
+        targets = []
+        for cid in ids:
+            complaint = complaints.get(cid)
+            if complaint is None:
+                continue
+            if not all(key in held for key in keys[cid]):
+                results[cid] = {"complaint_id": cid, "status": "skipped", "summary": complaint.summary,
+                                "long_summary": complaint.long_summary, "reply_id": None,
+                                "detail": "다른 요청에서 생성 중이라 건너뜀 (끝난 뒤 다시 요청)"}
+                continue
+            # 락을 잡기 직전에 끝난 다른 요청의 결과를 반영
+            db.refresh(complaint)
+            targets.append(complaint)
+        results.update(_generate_drafts_locked(db, targets, user_uid, regenerate, adapter))
+
+    return [
+        results.get(cid) or {"complaint_id": cid, "status": "not_found", "detail": "해당 민원이 없거나 권한이 없습니다."}
+        for cid in ids
+    ]
+
+
+def _generate_drafts_locked(db: Session, targets: list, user_uid: str, regenerate: bool,
+                            adapter: Optional[str]) -> dict:
+    """batch_generate_drafts 에서 single-flight 키를 잡은 민원만 생성 + 저장. {민원 id: 처리 결과}"""
+    if not targets:
+        return {}
+    has_reply = {
+        cid for (cid,) in db.query(Reply.complaint_id).filter(
+            Reply.complaint_id.in_([c.id for c in targets])
+        ).distinct()
+    }
+
+    items = []
+    for complaint in targets:
+        reply_summary = reply_summary_text(complaint)
+        items.append({
+            "content": complaint.content,
+            "reply_summary": reply_summary or None,
+            "short": regenerate or not complaint.summary,
+            "long": regenerate or not complaint.long_summary,
+            "reply": bool(reply_summary) and (regenerate or complaint.id not in has_reply),
+        })
+
+    # 일괄 생성은 bulk 우선순위: 단건 요청보다 뒤에, 다른 사용자의 일괄 생성과는 번갈아 처리
+    drafts = generate_drafts(items, priority="bulk", user=user_uid, adapter=adapter)
+
+    replies = {}
+    for complaint, item, draft in zip(targets, items, drafts):
+        if draft["summary"] is not None:
+            complaint.summary = draft["summary"]
+        if draft["long_summary"] is not None:
+            complaint.long_summary = draft["long_summary"]
+        if draft["reply"] is not None:
+            if regenerate:
+                db.query(Reply).filter(Reply.complaint_id == complaint.id).delete()
+            reply = Reply(
+                complaint_id=complaint.id,
+                content=build_reply_content(complaint, draft["reply"]),
+                user_uid=user_uid
+            )
+            db.add(reply)
+            replies[complaint.id] = reply
+    db.commit()
+
+    results = {}
+    for complaint, item, draft in zip(targets, items, drafts):
+        generated = [k for k in ("short", "long", "reply") if item[k]]
+        notes = [f"{field}: {error}" for field, error in draft["errors"].items()]
+        if not item["reply"] and not complaint.reply_summary:
+            notes.append("답변요지가 없어 답변 초안은 생성하지 않음")
+        reply = replies.get(complaint.id)
+        results[complaint.id] = {
+            "complaint_id": complaint.id,
+            "status": "failed" if draft["errors"] else ("done" if generated else "skipped"),
+            "summary": complaint.summary,
+            "long_summary": complaint.long_summary,
+            "reply_id": reply.id if reply is not None else None,
+            "detail": "; ".join(notes) or None,
+        }
+    return results
@@ -0,0 +1,181 @@
+# app/services/generation_worker.py
+'''
+LLM 생성 작업 워커 (generation_job 큐 소비)
+
+- 스레드 여러 개가 각자 작업을 claim → 실행 → 결과 기록. 동시에 실행되는 작업들은
+  LLM 배치 스케줄러에서 한 배치로 디코딩되므로 스레드 수는 LLM_MAX_BATCH_SIZE 정도가 적당
+- 실행 중에는 heartbeat_interval 마다 하트비트 갱신 (끊기면 다른 워커가 회수)
+- 모델이 준비되기 전에는 작업을 가져가지 않음, 모델 서버가 Overloaded 면 작업을 되돌리고 잠시 쉼
+- 작업의 priority / user_uid 를 LLM 요청 컨텍스트로 넘겨 배치 스케줄러 대기열 순서에 반영
+- 실행 중에는 cancel_poll_interval 마다 취소 요청(cancelling)을 확인해 답변 생성의 취소 토큰을 취소
+  → 다음 디코드 스텝에서 배치에서 빠지고, 답변은 저장하지 않고 작업은 cancelled
+
+실행 방법:
+- 별도 프로세스 (운영): python -m app.services.generation_worker --threads 8
+  API 쪽은 LLM_JOB_INLINE_WORKERS=0, 필요하면 LLM_BACKEND=remote
+  (스레드마다 claim 폴링과 DB 세션을 쓰므로 API 프로세스마다 띄우면 uvicorn 워커 / 노드 수만큼 곱해진다)
+- API 프로세스 안: LLM_JOB_INLINE_WORKERS=N (기본 1) 이면 startup 때 N 개 스레드 시작 (개발 / 단일 노드용)
+
+테이블: generation_job (alembic/versions 의 마이그레이션, alembic upgrade head)
+'''
+
+import argparse
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Optional
+
+from app.database import SessionLocal
+from app.models.complaint import Complaint
+from app.services import job_queue
+from app.services.complaint_generation import create_reply_once, fill_complaint_summaries, llm_flights
+from llm.admission import Overloaded
+from llm.cancellation import CancelToken, GenerationCancelled
+from llm.context import request_context
+from llm.loader import ModelNotReady, model_loader
+
+logger = logging.getLogger(__name__)
+
+
+def execute_job(kind: str, complaint_id: int, user_uid: str, requested_at, cancel: Optional[CancelToken] = None,
+                adapter: Optional[str] = None) -> dict:
+    """
+    작업 종류별 실행. 반환값이 generation_job.result 로 저장된다.
+    adapter 는 답변 작업의 문체(LoRA 어댑터). 요약은 항상 기본 모델로 만든다.
+    cancel 은 답변 생성에만 건다 (요약은 다른 요청과 single-flight 로 공유되고 저장해 두면 다시 쓰므로 끝까지 만든다)
+    """
+    llm_flights.run(("summary", complaint_id), lambda: fill_complaint_summaries(complaint_id))
+    if kind == "summary":
+        db = SessionLocal()
+        try:
+            complaint = db.get(Complaint, complaint_id)
+            return {"summary": complaint.summary, "long_summary": complaint.long_summary}
+        finally:
+            db.close()
+
+    reply_id = create_reply_once(complaint_id, user_uid, requested_at, regenerate=(kind == "reply-again"),
+                                 cancel=cancel, adapter=adapter)
+    return {"reply_id": reply_id}
+
+
+class GenerationWorker:
+    def __init__(self, session_factory=SessionLocal, threads: int = 4, poll_interval: float = 0.5,
+                 heartbeat_interval: float = 10, lease_seconds: float = 60, cancel_poll_interval: float = 1.0):
+        self.session_factory = session_factory
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.lease_seconds = lease_seconds
+        self.cancel_poll_interval = cancel_poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stopped = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.threads):
+            t = threading.Thread(target=self._loop, name=f"llm-job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        self._stopped.set()
+        for t in self._threads:
+            t.join(timeout=5)
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            if not model_loader.is_ready():
+                self._stopped.wait(self.poll_interval)
+                continue
+            try:
+                job = self._claim()
+            except Exception:
+                logger.exception("[생성 작업] claim 실패")
+                self._stopped.wait(self.poll_interval)
+                continue
+            if job is None:
+                self._stopped.wait(self.poll_interval)
+                continue
+            self._run(job)
+
+    def _claim(self):
+        db = self.session_factory()
+        try:
+            job = job_queue.claim(db, self.worker_id, lease_seconds=self.lease_seconds)
+            if job is None:
+                return None
+            db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+    def _run(self, job):
+        done = threading.Event()
+        cancel = CancelToken()
+        beat = threading.Thread(target=self._heartbeat, args=(job.id, done, cancel), daemon=True)
+        beat.start()
+
+        started = time.monotonic()
+        db = self.session_factory()
+        try:
+            # 작업의 우선순위 / 사용자 그대로 LLM 대기열에 들어가도록
+            with request_context(priority=job.priority, user=job.user_uid):
+                result = execute_job(job.kind, job.complaint_id, job.user_uid, job.created_at, cancel=cancel,
+                                     adapter=job.adapter)
+            job_queue.complete(db, job.id, result)
+            logger.info(f"[생성 작업] {job.id} ({job.kind}) 완료 {time.monotonic() - started:.1f}s")
+        except GenerationCancelled:
+            db.rollback()
+            job_queue.mark_cancelled(db, job.id)
+            logger.info(f"[생성 작업] {job.id} ({job.kind}) 취소 {time.monotonic() - started:.1f}s")
+        except ModelNotReady:
+            job_queue.requeue(db, job.id)
+        except Overloaded as e:
+            # 모델 서버가 가득 참: 작업은 되돌려 놓고 이 스레드는 Retry-After 만큼 쉬었다가 다시 claim
+            job_queue.requeue(db, job.id)
+            self._stopped.wait(e.retry_after)
+        except Exception as e:
+            db.rollback()
+            logger.exception(f"[생성 작업] {job.id} ({job.kind}) 실패")
+            job_queue.fail(db, job.id, str(e))
+        finally:
+            done.set()
+            db.close()
+
+    def _heartbeat(self, job_id: int, done: threading.Event, cancel: CancelToken):
+        """heartbeat_interval 마다 하트비트, cancel_poll_interval 마다 취소 요청 확인"""
+        last_beat = time.monotonic()
+        while not done.wait(self.cancel_poll_interval):
+            db = self.session_factory()
+            try:
+                if not cancel.cancelled and job_queue.is_cancel_requested(db, job_id):
+                    cancel.cancel("job_cancelled")
+                if time.monotonic() - last_beat >= self.heartbeat_interval:
+                    job_queue.heartbeat(db, job_id, self.worker_id)
+                    last_beat = time.monotonic()
+            except Exception:
+                logger.exception(f"[생성 작업] {job_id} 하트비트 실패")
+            finally:
+                db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM 생성 작업 워커")
+    parser.add_argument("--threads", type=int, default=int(os.getenv("LLM_MAX_BATCH_SIZE", "8")))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    model_loader.start()
+    worker = GenerationWorker(threads=args.threads)
+    worker.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        worker.stop()
+
+
+if __name__ == "__main__":
+    main()
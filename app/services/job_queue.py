@@ -0,0 +1,283 @@
+# app/services/job_queue.py
+'''
+Postgres 기반 LLM 생성 작업 큐 (generation_job 테이블)
+
+- enqueue: 같은 민원 + 같은 종류(+ 같은 어댑터)의 작업이 이미 대기/실행 중이면 새로 넣지 않고 그 작업을 반환
+  (요청할 때마다 waiters +1 — 같은 작업을 함께 기다리는 요청 수)
+- claim: FOR UPDATE SKIP LOCKED 로 queued 작업 하나를 가져와 running 으로 바꿈
+  (여러 워커/노드가 동시에 claim 해도 같은 작업을 두 번 가져가지 않음)
+  순서: 우선순위(interactive > bulk > backfill) → 실행 중인 작업이 적은 사용자 → 오래된 작업
+  → 한 사용자가 작업을 수백 개 넣어도 워커 스레드를 모두 차지하지 못한다
+- 하트비트가 lease_seconds 이상 끊긴 running 작업(워커 재시작 등)은 claim 할 때 다시 queued 로
+  (max_attempts 번 넘게 끊긴 작업은 failed)
+- wait_for_job: 동기 라우트용. 작업이 끝날 때까지 짧은 세션으로 상태를 확인하며 대기
+- leave: 기다리던 클라이언트가 떠남 → waiters -1, 아무도 남지 않았을 때만 취소
+  (비동기 API 로 등록한 요청은 떠나지 않으므로 계속 waiters 에 남음 → 명시적인 cancel 로만 취소)
+- cancel: queued 면 바로 cancelled, running 이면 cancelling 으로 표시 → 워커가 확인하고 생성을 멈춘 뒤 cancelled
+  (하트비트가 끊긴 cancelling 작업은 claim 할 때 cancelled 로 정리)
+'''
+
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.orm import Session, aliased
+
+from app.models.generation_job import GenerationJob
+from llm.fair_queue import DEFAULT_PRIORITY, PRIORITIES, check_priority
+
+JOB_KINDS = ("summary", "reply", "reply-again")
+ACTIVE_STATUSES = ("queued", "running")
+FINISHED_STATUSES = ("done", "failed", "cancelled")
+
+
+class JobFailed(Exception):
+    def __init__(self, job_id: int, error: Optional[str]):
+        super().__init__(error or f"생성 작업 {job_id} 실패")
+        self.job_id = job_id
+
+
+class JobTimeout(Exception):
+    pass
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def _priority_rank(priority):
+    return case(
+        {p: i for i, p in enumerate(PRIORITIES)}, value=priority, else_=len(PRIORITIES)
+    )
+
+
+def enqueue(db: Session, kind: str, complaint_id: int, user_uid: str,
+            priority: str = DEFAULT_PRIORITY, adapter: Optional[str] = None) -> GenerationJob:
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    check_priority(priority)
+    if kind == "summary":
+        adapter = None   # 요약은 어댑터를 쓰지 않는다
+
+    active = db.query(GenerationJob).filter(
+        GenerationJob.kind == kind,
+        GenerationJob.complaint_id == complaint_id,
+        GenerationJob.adapter.is_(None) if adapter is None else GenerationJob.adapter == adapter,
+        GenerationJob.status.in_(ACTIVE_STATUSES),
+    ).order_by(GenerationJob.id.asc()).first()
+    if active is not None:
+        # 조회한 뒤 마지막 대기자가 떠나 취소됐을 수 있으므로 아직 대기/실행 중일 때만 합류
+        joined = db.query(GenerationJob).filter(
+            GenerationJob.id == active.id,
+            GenerationJob.status.in_(ACTIVE_STATUSES),
+        ).update({"waiters": GenerationJob.waiters + 1}, synchronize_session=False)
+        db.commit()
+        if joined:
+            db.refresh(active)
+            # 대기 중인 bulk 작업을 누가 직접 요청하면 interactive 로 끌어올린다
+            if active.status == "queued" and PRIORITIES.index(priority) < PRIORITIES.index(active.priority):
+                active.priority = priority
+                db.commit()
+                db.refresh(active)
+            return active
+
+    job = GenerationJob(kind=kind, complaint_id=complaint_id, user_uid=user_uid, priority=priority,
+                        adapter=adapter, status="queued", waiters=1)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def claim(db: Session, worker_id: str, lease_seconds: float = 60, max_attempts: int = 3) -> Optional[GenerationJob]:
+    now = datetime.utcnow()
+
+    # 하트비트가 끊긴 작업 회수 (워커 프로세스가 죽었거나 재시작됨)
+    # 매번 워커를 죽이는 작업(OOM 등)이 무한 반복되지 않도록 max_attempts 번 넘게 끊긴 작업은 실패 처리
+    stale = db.query(GenerationJob).filter(
+        GenerationJob.status == "running",
+        GenerationJob.heartbeat_at < now - timedelta(seconds=lease_seconds),
+    )
+    db.query(GenerationJob).filter(
+        GenerationJob.status == "cancelling",
+        GenerationJob.heartbeat_at < now - timedelta(seconds=lease_seconds),
+    ).update({"status": "cancelled", "finished_at": now}, synchronize_session=False)
+    stale.filter(GenerationJob.attempts >= max_attempts).update(
+        {"status": "failed", "error": "워커 응답 없음 (재시도 횟수 초과)", "finished_at": now},
+        synchronize_session=False,
+    )
+    stale.filter(GenerationJob.attempts < max_attempts).update(
+        {"status": "queued", "worker_id": None}, synchronize_session=False
+    )
+
+    running = aliased(GenerationJob)
+    user_running = select(func.count()).select_from(running).where(
+        running.status == "running",
+        running.user_uid == GenerationJob.user_uid,
+    ).correlate(GenerationJob).scalar_subquery()
+
+    job = db.query(GenerationJob).filter(
+        GenerationJob.status == "queued",
+    ).order_by(
+        _priority_rank(GenerationJob.priority),
+        user_running,
+        GenerationJob.created_at.asc(),
+    ).with_for_update(skip_locked=True).first()
+    if job is None:
+        db.commit()
+        return None
+
+    job.status = "running"
+    job.worker_id = worker_id
+    job.attempts = (job.attempts or 0) + 1
+    job.started_at = now
+    job.heartbeat_at = now
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def heartbeat(db: Session, job_id: int, worker_id: str):
+    db.query(GenerationJob).filter(
+        GenerationJob.id == job_id,
+        GenerationJob.worker_id == worker_id,
+        GenerationJob.status.in_(("running", "cancelling")),
+    ).update({"heartbeat_at": datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+
+
+def cancel(db: Session, job_id: int) -> Optional[str]:
+    """작업 취소 요청. 바뀐(또는 이미 끝난) 상태를 반환, 작업이 없으면 None"""
+    now = datetime.utcnow()
+    updated = db.query(GenerationJob).filter(
+        GenerationJob.id == job_id, GenerationJob.status == "queued",
+    ).update({"status": "cancelled", "finished_at": now}, synchronize_session=False)
+    if not updated:
+        db.query(GenerationJob).filter(
+            GenerationJob.id == job_id, GenerationJob.status == "running",
+        ).update({"status": "cancelling"}, synchronize_session=False)
+    db.commit()
+    job = db.get(GenerationJob, job_id)
+    if job is None:
+        return None
+    db.refresh(job)
+    return job.status
+
+
+def leave(db: Session, job_id: int) -> Optional[str]:
+    """
+    기다리던 요청 하나가 떠남 (동기 라우트의 클라이언트 연결 끊김).
+    waiters 를 하나 줄이고, 남은 대기자가 없을 때만 cancel 과 같이 취소한다 (한 번의 UPDATE 로 처리해
+    그 사이에 enqueue 로 합류한 요청이 취소된 작업을 받지 않도록).
+    바뀐 상태를 반환, 작업이 없으면 None
+    """
+    now = datetime.utcnow()
+    last = GenerationJob.waiters <= 1
+    db.query(GenerationJob).filter(
+        GenerationJob.id == job_id, GenerationJob.status.in_(ACTIVE_STATUSES),
+    ).update({
+        "waiters": case((GenerationJob.waiters > 0, GenerationJob.waiters - 1), else_=0),
+        "status": case(
+            (and_(last, GenerationJob.status == "queued"), "cancelled"),
+            (and_(last, GenerationJob.status == "running"), "cancelling"),
+            else_=GenerationJob.status,
+        ),
+        "finished_at": case(
+            (and_(last, GenerationJob.status == "queued"), now),
+            else_=GenerationJob.finished_at,
+        ),
+    }, synchronize_session=False)
+    db.commit()
+    status = db.query(GenerationJob.status).filter(GenerationJob.id == job_id).scalar()
+    return status
+
+
+def is_cancel_requested(db: Session, job_id: int) -> bool:
+    status = db.query(GenerationJob.status).filter(GenerationJob.id == job_id).scalar()
+    return status in ("cancelling", "cancelled")
+
+
+def mark_cancelled(db: Session, job_id: int):
+    """워커가 취소 요청을 받아 생성을 멈춘 뒤 호출"""
+    _finish(db, job_id, status="cancelled")
+
+
+def complete(db: Session, job_id: int, result: dict):
+    _finish(db, job_id, status="done", result=result)
+
+
+def fail(db: Session, job_id: int, error: str):
+    _finish(db, job_id, status="failed", error=error)
+
+
+def requeue(db: Session, job_id: int):
+    """일시적인 실패(모델 준비 전 등): 다른 워커가 다시 가져가도록 queued 로"""
+    db.query(GenerationJob).filter(GenerationJob.id == job_id).update(
+        {"status": "queued", "worker_id": None}, synchronize_session=False
+    )
+    db.commit()
+
+
+def _finish(db: Session, job_id: int, status: str, result: Optional[dict] = None, error: Optional[str] = None):
+    db.query(GenerationJob).filter(GenerationJob.id == job_id).update(
+        {"status": status, "result": result, "error": error, "finished_at": datetime.utcnow()},
+        synchronize_session=False,
+    )
+    db.commit()
+
+
+def queue_position(db: Session, job: GenerationJob) -> Optional[int]:
+    """
+    대기 중이면 앞에 있는 queued 작업 수 (0 이면 다음 차례), 아니면 None
+    우선순위가 더 높거나 같은 우선순위에서 먼저 들어온 작업 수 (사용자별 분배는 반영하지 않은 근사치)
+    """
+    if job.status != "queued":
+        return None
+    rank = _priority_rank(GenerationJob.priority)
+    job_rank = PRIORITIES.index(job.priority) if job.priority in PRIORITIES else len(PRIORITIES)
+    return db.query(GenerationJob).filter(
+        GenerationJob.status == "queued",
+        or_(
+            rank < job_rank,
+            and_(rank == job_rank, GenerationJob.created_at < job.created_at),
+        ),
+    ).count()
+
+
+def wait_for_job(session_factory, job_id: int, timeout: float = 300, poll_interval: float = 0.25,
+                 should_cancel: Optional[Callable[[], bool]] = None) -> dict:
+    """
+    작업이 끝나면 result 반환. 실패면 JobFailed, 시간 초과면 JobTimeout, 취소되면 JobCancelled.
+    should_cancel() 이 True 가 되면 (기다리던 클라이언트 연결이 끊김 등) 기다리기를 그만두고(leave) JobCancelled.
+    작업은 같은 작업을 기다리는 다른 요청이 없을 때만 취소된다.
+    작업이 삭제됐으면 (민원 삭제 등) JobFailed.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        if should_cancel is not None and should_cancel():
+            db = session_factory()
+            try:
+                leave(db, job_id)
+            finally:
+                db.close()
+            raise JobCancelled(f"생성 작업 {job_id} 취소")
+
+        db = session_factory()
+        try:
+            job = db.get(GenerationJob, job_id)
+            if job is None:
+                raise JobFailed(job_id, f"생성 작업 {job_id} 이(가) 삭제되었습니다")
+            status, result, error = job.status, job.result, job.error
+        finally:
+            db.close()
+
+        if status == "done":
+            return result
+        if status == "failed":
+            raise JobFailed(job_id, error)
+        if status == "cancelled":
+            raise JobCancelled(f"생성 작업 {job_id} 취소")
+        if time.monotonic() >= deadline:
+            raise JobTimeout(f"생성 작업 {job_id} 대기 시간 초과")
+        time.sleep(poll_interval)
@@ -0,0 +1,90 @@
+# app/services/llm_cache_store.py
+'''
+LLM 결과 캐시의 Postgres 저장소 (llm_result_cache 테이블)
+
+- get: 키로 조회, 최대 보관 기간이 지난 행은 miss 로 처리하고 삭제
+- put: upsert (같은 키면 결과/시각 갱신)
+- prune: 나이(max_age) / 크기(max_rows) 기준 정리. put 이 prune_every 번 쌓일 때마다 자동 실행
+'''
+
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models.llm_result_cache import LLMResultCache
+
+
+class PostgresCacheStore:
+    def __init__(self, session_factory, max_rows: int = 50000, max_age_hours: float = 24 * 30,
+                 prune_every: int = 200):
+        self.session_factory = session_factory
+        self.max_rows = max_rows
+        self.max_age = timedelta(hours=max_age_hours)
+        self.prune_every = prune_every
+        self._puts = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        db = self.session_factory()
+        try:
+            row = db.query(LLMResultCache).filter(LLMResultCache.key == key).first()
+            if row is None:
+                return None
+            if row.created_at and row.created_at < datetime.utcnow() - self.max_age:
+                db.delete(row)
+                db.commit()
+                return None
+            row.last_hit_at = datetime.utcnow()
+            row.hit_count = (row.hit_count or 0) + 1
+            db.commit()
+            return row.result
+        finally:
+            db.close()
+
+    def put(self, key: str, mode: str, model_id: str, result: str):
+        now = datetime.utcnow()
+        stmt = insert(LLMResultCache).values(
+            key=key, mode=mode, model_id=model_id, result=result,
+            created_at=now, last_hit_at=now, hit_count=0,
+        ).on_conflict_do_update(
+            index_elements=[LLMResultCache.key],
+            set_={"result": result, "created_at": now, "last_hit_at": now},
+        )
+        db = self.session_factory()
+        try:
+            db.execute(stmt)
+            db.commit()
+        finally:
+            db.close()
+
+        with self._lock:
+            self._puts += 1
+            should_prune = self._puts % self.prune_every == 0
+        if should_prune:
+            self.prune()
+
+    def prune(self) -> int:
+        """오래된 행 삭제 후, 그래도 max_rows 를 넘으면 최근 사용이 오래된 순으로 삭제"""
+        db = self.session_factory()
+        try:
+            deleted = db.query(LLMResultCache).filter(
+                LLMResultCache.created_at < datetime.utcnow() - self.max_age
+            ).delete(synchronize_session=False)
+
+            total = db.query(func.count(LLMResultCache.key)).scalar() or 0
+            overflow = total - self.max_rows
+            if overflow > 0:
+                oldest = db.query(LLMResultCache.key).order_by(
+                    LLMResultCache.last_hit_at.asc()
+                ).limit(overflow).subquery()
+                deleted += db.query(LLMResultCache).filter(
+                    LLMResultCache.key.in_(oldest.select())
+                ).delete(synchronize_session=False)
+
+            db.commit()
+            return deleted
+        finally:
+            db.close()
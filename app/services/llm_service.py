@@ -1,20 +1,23 @@
-from transformers import AutoTokenizer, AutoModelForCausalLM
 from app.schemas.input_schema import InputSchema
+from llm.registry import registry
 BASE_PATH = "./app/models/polyglot_base"
+MODEL_NAME = "polyglot"
 
-tokenizer = None
-model = None
+def load_polyglot():
+    # transformers import 도 첫 로딩 시점으로 미뤄 서버 기동을 막지 않도록 함
+    from transformers import AutoTokenizer, AutoModelForCausalLM
+    tokenizer = AutoTokenizer.from_pretrained(BASE_PATH)
+    model = AutoModelForCausalLM.from_pretrained(BASE_PATH)
+    return tokenizer, model
 
-def generate_text(prompt: str) -> str:
-    global tokenizer, model
-
-    if tokenizer is None or model is None:
-        tokenizer = AutoTokenizer.from_pretrained(BASE_PATH)
-        model = AutoModelForCausalLM.from_pretrained(BASE_PATH)
+# 로딩은 첫 호출 때 레지스트리 lock 안에서 한 번만, 메모리 예산을 넘으면 쓰지 않는 동안 해제될 수 있음
+registry.register(MODEL_NAME, load=load_polyglot)
 
-    inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
-    outputs = model.generate(**inputs, max_new_tokens=256)
-    return tokenizer.decode(outputs[0], skip_special_tokens=True)
+def generate_text(prompt: str) -> str:
+    with registry.use(MODEL_NAME) as (tokenizer, model):
+        inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
+        outputs = model.generate(**inputs, max_new_tokens=256)
+        return tokenizer.decode(outputs[0], skip_special_tokens=True)
 
 def generate_answer(input):
-    return generate_text(input.content)
\ No newline at end of file
+    return generate_text(input.content)
@@ -0,0 +1,196 @@
+# app/services/singleflight.py
+'''
+같은 작업의 동시 중복 실행 방지 (single-flight)
+
+- SingleFlight: 프로세스 안에서 같은 키로 동시에 들어온 호출은 첫 호출(leader)만 실행하고
+  나머지는 그 결과(또는 예외)를 그대로 받는다
+  try_hold 로 여러 키를 잡아 두면 그동안 들어온 호출은 풀릴 때까지 기다렸다가 직접 실행한다
+- advisory_lock: Postgres advisory lock 으로 여러 API 노드 사이에서도 같은 키는 한 번에 하나만 실행
+  pg_try_advisory_lock 을 주기적으로 다시 시도하고 deadline 이 지나면 LockTimeout
+  (기다리는 동안에는 연결을 쥐고 있지 않음). autocommit 전용 엔진(app.database.lock_engine)을 써서
+  락을 쥔 동안 'idle in transaction' 연결이 되지 않고, 일반 요청의 연결 풀도 차지하지 않는다
+- try_advisory_locks: 여러 키를 기다리지 않고 한 연결에서 잡는다 (일괄 생성용, 못 잡은 키는 건너뜀)
+- Coalescer: 둘을 합친 것. 프로세스 안에서는 결과를 공유하고, 노드 사이에서는 순서대로 실행되므로
+  fn 은 "이미 다른 노드가 해 둔 결과가 있으면 그것을 돌려주는" 멱등 함수여야 한다
+
+결과는 프로세스 안의 여러 스레드(세션)가 함께 받으므로 ORM 객체가 아니라 id 같은 단순 값으로 돌려준다.
+'''
+
+import hashlib
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Callable, Dict, Hashable, Iterable, Set, Tuple, TypeVar
+
+from sqlalchemy import text
+
+T = TypeVar("T")
+
+# try_hold 로 잡아 둔 키가 풀렸음 (기다리던 호출은 결과를 공유하지 않고 다시 시도)
+_RELEASED = object()
+
+
+class LockTimeout(TimeoutError):
+    """deadline 안에 advisory lock 을 잡지 못함 (다른 노드의 같은 작업이 아직 진행 중)"""
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> Tuple[T, bool]:
+        """(결과, 다른 호출의 결과를 공유했는지) 반환"""
+        while True:
+            with self._lock:
+                future = self._calls.get(key)
+                leader = future is None
+                if leader:
+                    future = Future()
+                    self._calls[key] = future
+            if leader:
+                break
+            value = future.result()
+            if value is not _RELEASED:
+                return value, True
+
+        try:
+            value = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(value)
+            return value, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    @contextmanager
+    def try_hold(self, keys: Iterable[Hashable]):
+        """실행 중인 호출이 없는 키를 기다리지 않고 잡아 두고, 잡은 키 집합을 넘겨준다"""
+        held: Dict[Hashable, Future] = {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                if key not in self._calls:
+                    held[key] = self._calls[key] = Future()
+        try:
+            yield set(held)
+        finally:
+            with self._lock:
+                for key in held:
+                    del self._calls[key]
+            for future in held.values():
+                future.set_result(_RELEASED)
+
+
+def advisory_lock_id(key: Hashable) -> int:
+    """키 → pg_advisory_lock 용 signed 64bit 정수"""
+    digest = hashlib.sha256(repr(key).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+
+def _try_lock(conn, lock_id: int) -> bool:
+    return bool(conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": lock_id}).scalar())
+
+
+def _release(conn, lock_ids: Iterable[int]):
+    """락을 풀고 연결을 풀에 돌려준다. 풀다가 실패하면 락이 남은 연결을 재사용하지 않도록 버린다"""
+    try:
+        for lock_id in lock_ids:
+            conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": lock_id})
+    except Exception:
+        conn.invalidate()   # 연결이 끊기면 Postgres 가 락을 해제
+    finally:
+        conn.close()
+
+
+@contextmanager
+def advisory_lock(engine, key: Hashable, timeout: float, poll_interval: float = 0.2):
+    """
+    세션 단위 advisory lock. 다른 노드가 같은 키를 잡고 있으면 poll_interval 마다 다시 시도하고
+    timeout 초 안에 못 잡으면 LockTimeout. 잡은 뒤에는 풀 때까지 그 연결 하나를 쥐고 있다.
+    연결이 끊기면 Postgres 가 락을 자동으로 풀어주므로 프로세스가 죽어도 남지 않는다.
+    """
+    lock_id = advisory_lock_id(key)
+    deadline = time.monotonic() + timeout
+    while True:
+        conn = engine.connect()
+        try:
+            locked = _try_lock(conn, lock_id)
+        except BaseException:
+            conn.close()
+            raise
+        if locked:
+            break
+        conn.close()
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise LockTimeout(f"advisory lock 대기 시간 초과: {key!r}")
+        time.sleep(min(poll_interval, remaining))
+
+    try:
+        yield
+    finally:
+        _release(conn, [lock_id])
+
+
+@contextmanager
+def try_advisory_locks(engine, keys: Iterable[Hashable]):
+    """여러 키를 한 연결에서 기다리지 않고 잡고, 잡은 키 집합을 넘겨준다 (못 잡은 키는 다른 곳에서 실행 중)"""
+    conn = engine.connect()
+    held: Dict[Hashable, int] = {}
+    try:
+        for key in dict.fromkeys(keys):
+            lock_id = advisory_lock_id(key)
+            if _try_lock(conn, lock_id):
+                held[key] = lock_id
+    except BaseException:
+        _release(conn, held.values())
+        raise
+
+    try:
+        yield set(held)
+    finally:
+        _release(conn, held.values())
+
+
+class Coalescer:
+    def __init__(self, engine=None, use_advisory_lock: bool = True, lock_timeout: float = 300.0):
+        self.engine = engine   # autocommit 엔진 (advisory lock 전용)
+        self.use_advisory_lock = use_advisory_lock and engine is not None
+        self.lock_timeout = lock_timeout
+        self._flight = SingleFlight()
+        self._stats_lock = threading.Lock()
+        self._stats = {"executed": 0, "shared": 0}
+
+    def run(self, key: Hashable, fn: Callable[[], T]) -> T:
+        def call():
+            if not self.use_advisory_lock:
+                return fn()
+            with advisory_lock(self.engine, key, self.lock_timeout):
+                return fn()
+
+        value, shared = self._flight.do(key, call)
+        with self._stats_lock:
+            self._stats["shared" if shared else "executed"] += 1
+        return value
+
+    @contextmanager
+    def hold(self, keys: Iterable[Hashable]):
+        """
+        여러 키를 기다리지 않고 잡는다 (일괄 생성용). 잡은 키 집합을 넘겨주고,
+        그 키로 들어온 run() 은 노드와 관계없이 풀릴 때까지 기다린다.
+        advisory lock 을 안 쓰면 프로세스 안의 single-flight 자리만 잡는다 (실행 중인 run() 의 키는 건너뜀)
+        """
+        if not self.use_advisory_lock:
+            with self._flight.try_hold(keys) as held:
+                yield held
+            return
+        with try_advisory_locks(self.engine, keys) as held:
+            yield held
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return dict(self._stats)
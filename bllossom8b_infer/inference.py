@@ -1,4 +1,7 @@
-import requests
+from llm.backends.ollama import OllamaBackend, SERVER_DEFAULTS
+
+# python -m bllossom8b_infer.inference 로 실행 (저장소 루트 기준)
+blossom = OllamaBackend(model="azure99/blossom-v6.1:8b", timeout=120)
 
 def generate_llm_reply(user_input: str) -> str:
     """
@@ -115,17 +118,7 @@ def generate_llm_reply(user_input: str) -> str:
     """
 
     try:
-        response = requests.post(
-            "http://localhost:11434/api/generate",
-            json={
-                "model": "azure99/blossom-v6.1:8b",
-                "prompt": prompt,
-                "stream": False
-            },
-            timeout=120
-        )
-        response.raise_for_status()
-        return response.json()["response"].strip()
+        return blossom.generate(prompt, **SERVER_DEFAULTS).strip()
 
     except Exception as e:
         return f"[⚠️ LLM 응답 실패: {str(e)}]"
@@ -1,6 +1,10 @@
-import requests
 import re
 
+from llm.backends.ollama import OllamaBackend, SERVER_DEFAULTS
+
+# python -m blossom_summarizer.summarizer 로 실행 (저장소 루트 기준)
+blossom = OllamaBackend(model="azure99/blossom-v6.1:8b", timeout=30)
+
 def split_summary_items(text: str) -> list:
     """Blossom 응답을 쉼표(,) 기준으로 분리"""
     items = text.strip().split(",")
@@ -27,17 +31,7 @@ def summarize_with_blossom(text: str) -> str:
     """
 
     try:
-        res = requests.post(
-            "http://localhost:11434/api/generate",
-            json={
-                "model": "azure99/blossom-v6.1:8b",
-                "prompt": prompt,
-                "stream": False
-            },
-            timeout=30
-        )
-        res.raise_for_status()
-        output = res.json()["response"].strip()
+        output = blossom.generate(prompt, **SERVER_DEFAULTS).strip()
 
             # 단일 요약 항목으로 포맷
         formatted = f" {output}"
@@ -9,8 +9,7 @@ import psycopg2
 import psycopg2.extras
 from psycopg2.extras import RealDictCursor, Json
 
-import torch
-from transformers import AutoTokenizer, AutoModel
+from llm.embedder import encode_texts
 
 # =========================
 # 설정
@@ -25,37 +24,12 @@ DB_CFG = {
     "password": "116423",
 }
 
-# 임베딩 모델 (필요 시 교체: "Qwen/Qwen3-Embedding-4B-bf16")
-MODEL = "intfloat/multilingual-e5-large-instruct"
+# 임베딩 모델은 llm/embedder.py (EMBED_MODEL 환경변수로 교체: "Qwen/Qwen3-Embedding-4B-bf16" 등)
 EMB_DIM = 1024  # 모델 출력 차원에 맞출 것
 
 BATCH_FLUSH = 500  # 트랜잭션 커밋 주기
 
 
-# =========================
-# 모델 로딩
-# =========================
-tokenizer = AutoTokenizer.from_pretrained(MODEL, trust_remote_code=True)
-model = AutoModel.from_pretrained(
-    MODEL, trust_remote_code=True, torch_dtype=torch.bfloat16, device_map="auto"
-)
-model.eval()
-
-
-def encode_texts(texts, is_query=False):
-    # e5 계열 권장 프리픽스
-    use_e5_prefix = "e5" in MODEL.lower()
-    if use_e5_prefix:
-        texts = [(f"query: {t}" if is_query else f"passage: {t}") for t in texts]
-
-    x = tokenizer(texts, padding=True, truncation=True, return_tensors="pt").to(model.device)
-    with torch.no_grad():
-        y = model(**x)
-        vec = y.last_hidden_state[:, 0, :]  # CLS
-        vec = torch.nn.functional.normalize(vec, p=2, dim=1)
-    return vec.float().cpu().numpy()
-
-
 # =========================
 # 유틸
 # =========================
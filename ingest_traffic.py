@@ -6,8 +6,7 @@ from datetime import datetime
 import pandas as pd
 import psycopg2
 from psycopg2.extras import RealDictCursor, Json
-import torch
-from transformers import AutoTokenizer, AutoModel
+from llm.embedder import encode_texts
 
 # =========================
 # 1. 설정
@@ -20,31 +19,10 @@ DB_CFG = {
     "user": "civiluser",
     "password": "116423",
 }
-MODEL = "intfloat/multilingual-e5-large-instruct"
+# 임베딩 모델은 llm/embedder.py
 EMB_DIM = 1024
 BATCH_FLUSH = 100
 
-# =========================
-# 2. 임베딩 모델 로딩
-# =========================
-print("임베딩 모델을 로딩합니다...")
-tokenizer = AutoTokenizer.from_pretrained(MODEL, trust_remote_code=True)
-model = AutoModel.from_pretrained(
-    MODEL, trust_remote_code=True, torch_dtype=torch.bfloat16, device_map="auto"
-)
-model.eval()
-print("모델 로딩 완료.")
-
-def encode_texts(texts, is_query=False):
-    prefix = 'query: ' if is_query else 'passage: '
-    texts_with_prefix = [f"{prefix}{t}" for t in texts]
-    x = tokenizer(texts_with_prefix, padding=True, truncation=True, return_tensors="pt").to(model.device)
-    with torch.no_grad():
-        y = model(**x)
-        vec = y.last_hidden_state[:, 0, :]
-        vec = torch.nn.functional.normalize(vec, p=2, dim=1)
-    return vec.float().cpu().numpy()
-
 # =========================
 # 3. 유틸리티 함수
 # =========================
@@ -0,0 +1,149 @@
+# llm/admission.py
+'''
+LLM 요청 admission control (backpressure)
+
+- 동시에 LLM 작업을 진행할 수 있는 요청 수를 max_concurrent 로 제한하고,
+  자리가 없으면 최대 max_queue 개까지 queue_timeout 초 동안 줄 세워 기다리게 한다
+- 대기열이 꽉 찼으면 바로 Overloaded(429), 기다리다 시간이 지나면 Overloaded(503)
+  → 라우터/앱에서 Retry-After 헤더와 함께 응답 (타임아웃까지 매달리지 않음)
+- min_free_memory(바이트)를 주면 GPU 여유 메모리가 그보다 적을 때도 자리가 없는 것으로 본다
+  (이미 진행 중인 요청이 있을 때만. torch 가 이 프로세스에 로딩되어 있을 때만 확인)
+- 대기/진행 중인 요청 수 = LLM 라우트가 붙잡을 수 있는 threadpool 스레드 수의 상한 (capacity)
+  앱은 startup 때 threadpool 크기를 (기본 크기 + capacity) 로 늘려 비 LLM 라우트의 몫을 보장한다
+
+    with llm_admission.admit():
+        ...  # LLM 호출
+
+스트리밍처럼 응답 뒤에 끝나는 작업은 acquire() 로 받은 Ticket 을 직접 release() 한다.
+응답 본문이 시작되기 전에 연결이 끊겨도 반납되도록 응답을 보내는 쪽의 try/finally 에서 부른다
+(app/routers/complaint.py 의 AdmittedStreamingResponse).
+'''
+
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+from llm import metrics
+
+
+class Overloaded(Exception):
+    def __init__(self, reason: str, status_code: int, retry_after: int):
+        super().__init__(f"LLM 요청이 많아 처리할 수 없습니다. (reason={reason})")
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def gpu_memory_pressure(min_free_bytes: int) -> bool:
+    """GPU 중 하나라도 여유 메모리가 min_free_bytes 보다 적으면 True (torch 미로딩 / GPU 없음이면 False)"""
+    torch = sys.modules.get("torch")
+    if not min_free_bytes or torch is None or not torch.cuda.is_available():
+        return False
+    for device in range(torch.cuda.device_count()):
+        free, _ = torch.cuda.mem_get_info(device)
+        if free < min_free_bytes:
+            return True
+    return False
+
+
+class Ticket:
+    """admission 자리 하나. release() 는 여러 번 불러도 한 번만 반납된다."""
+
+    def __init__(self, controller: "AdmissionController"):
+        self._controller = controller
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self._controller._release()
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent: int = 16, max_queue: int = 32, queue_timeout: float = 10.0,
+                 retry_after: int = 5, min_free_memory: int = 0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.min_free_memory = min_free_memory
+
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self._stats: Dict[str, int] = {"admitted": 0, "queue_full": 0, "queue_timeout": 0}
+
+    @property
+    def capacity(self) -> int:
+        """동시에 붙잡혀 있을 수 있는 최대 요청(스레드) 수"""
+        return self.max_concurrent + self.max_queue
+
+    def _has_room(self) -> bool:
+        if self._active >= self.max_concurrent:
+            return False
+        return not (self._active and gpu_memory_pressure(self.min_free_memory))
+
+    def acquire(self) -> Ticket:
+        started = time.monotonic()
+        with self._cond:
+            if not self._has_room():
+                if self._waiting >= self.max_queue:
+                    self._reject("queue_full")
+                    raise Overloaded("queue_full", 429, self.retry_after)
+                self._waiting += 1
+                metrics.observe_admission(self._active, self._waiting)
+                try:
+                    admitted = self._cond.wait_for(self._has_room, timeout=self.queue_timeout)
+                finally:
+                    self._waiting -= 1
+                if not admitted:
+                    self._reject("queue_timeout")
+                    raise Overloaded("queue_timeout", 503, self.retry_after)
+            self._active += 1
+            self._stats["admitted"] += 1
+            metrics.observe_admission(self._active, self._waiting, wait=time.monotonic() - started)
+        return Ticket(self)
+
+    @contextmanager
+    def admit(self):
+        ticket = self.acquire()
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    def _release(self):
+        with self._cond:
+            self._active -= 1
+            metrics.observe_admission(self._active, self._waiting)
+            self._cond.notify()
+
+    def _reject(self, reason: str):
+        self._stats[reason] += 1
+        metrics.observe_admission_rejected(reason)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "active": self._active,
+                "waiting": self._waiting,
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                **self._stats,
+            }
+
+
+# 프로세스 전역 admission (모든 LLM 진입점이 공유)
+llm_admission = AdmissionController(
+    max_concurrent=int(os.getenv("LLM_ADMISSION_MAX_CONCURRENT", "16")),
+    max_queue=int(os.getenv("LLM_ADMISSION_MAX_QUEUE", "32")),
+    queue_timeout=float(os.getenv("LLM_ADMISSION_QUEUE_TIMEOUT", "10")),
+    retry_after=int(os.getenv("LLM_ADMISSION_RETRY_AFTER", "5")),
+    min_free_memory=int(float(os.getenv("LLM_MIN_FREE_GPU_MB", "0")) * 1024 * 1024),
+)
@@ -0,0 +1,148 @@
+# llm/assisted.py
+'''
+Assisted (speculative) decoding
+
+- 작은 초안(draft) 모델이 토큰 여러 개를 먼저 제안하고, Kanana 가 한 번의 forward 로 검증
+- 샘플링(do_sample=True)에서는 HF 의 speculative sampling 으로 검증하므로
+  출력 분포는 Kanana 단독 디코딩과 같다 (품질 동일, 디코드 지연만 감소)
+- 초안 모델은 Kanana 와 같은 토크나이저를 쓰는 모델이어야 함 (예: kanana-1.5-2.1b-instruct)
+- HF assisted generation 은 배치 1 만 지원하므로 배치에 합류시키지 않고, 배치 스케줄러 대기열을 거쳐
+  스케줄러 스레드에서 따로 실행한다 (GenerationRequest.runner). 같은 모델을 배치 디코딩과 동시에 쓰지 않고
+  우선순위 / 공정 분배 / 취소도 일반 요청과 같다. 실행하는 동안 배치 디코딩은 멈추므로
+  출력이 짧은 모드(요약)에만 쓰는 것이 좋다
+- 토크나이저는 스케줄러와 별도 인스턴스를 쓴다
+- 취소 토큰은 stopping_criteria(StopOnCancel)로 매 검증 스텝마다 확인
+
+수락률(acceptance rate) 측정:
+- 검증 1회(Kanana forward 1번)마다 '수락된 초안 토큰 수 + 1' 개의 토큰이 확정된다
+- 따라서 수락 토큰 = 생성 토큰 - 검증 횟수, 제안 토큰 = 초안 모델 forward 횟수
+'''
+
+import threading
+import time
+from typing import Dict, List, Optional
+
+import torch
+from transformers import StoppingCriteriaList
+
+from llm import metrics
+from llm.cancellation import CancelToken, GenerationCancelled
+from llm.stopping import StopOnCancel, get_stop_criteria
+
+
+class AssistedDecoder:
+    def __init__(self, model, draft_model, tokenizer):
+        self.model = model
+        self.draft_model = draft_model
+        self.tokenizer = tokenizer
+
+        self._stats_lock = threading.Lock()
+        self._counting = False
+        self._target_calls = 0
+        self._draft_calls = 0
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+        # forward 횟수 카운트 (generate 실행 중에만 — 같은 스레드의 배치 디코딩 forward 는 제외)
+        model.register_forward_hook(self._count_target)
+        draft_model.register_forward_hook(self._count_draft)
+
+    def _count_target(self, module, args, output):
+        if self._counting:
+            self._target_calls += 1
+
+    def _count_draft(self, module, args, output):
+        if self._counting:
+            self._draft_calls += 1
+
+    @torch.no_grad()
+    def generate(
+        self,
+        prompt: str,
+        mode: str,
+        max_new_tokens: int,
+        temperature: float,
+        top_p: float,
+        repetition_penalty: float,
+        stop_words: List[str],
+        cancel: Optional[CancelToken] = None,
+        submitted_at: Optional[float] = None,
+    ) -> str:
+        """
+        생성된 부분만 디코딩한 문자열 반환 (후처리 전). 취소되면 GenerationCancelled
+        배치 스케줄러 스레드에서만 호출한다. submitted_at: 대기열에 들어간 시각 (queue_wait 기록용)
+        """
+        started_at = time.monotonic()
+        inputs = self.tokenizer(prompt, return_tensors="pt", truncation=True).to(self.model.device)
+        stopping_criteria = StoppingCriteriaList([get_stop_criteria(self.tokenizer, stop_words)])
+        if cancel is not None:
+            stopping_criteria.append(StopOnCancel(cancel))
+
+        self._counting = True
+        self._target_calls = 0
+        self._draft_calls = 0
+        try:
+            outputs = self.model.generate(
+                **inputs,
+                assistant_model=self.draft_model,
+                max_new_tokens=max_new_tokens,
+                do_sample=True,
+                temperature=temperature,
+                top_p=top_p,
+                repetition_penalty=repetition_penalty,
+                eos_token_id=self.tokenizer.eos_token_id,
+                pad_token_id=self.tokenizer.pad_token_id,
+                stopping_criteria=stopping_criteria,
+            )
+        finally:
+            self._counting = False
+        target_calls, draft_calls = self._target_calls, self._draft_calls
+
+        finished_at = time.monotonic()
+        if cancel is not None and cancel.cancelled:
+            metrics.observe_failure(mode, "hf", "cancelled")
+            raise GenerationCancelled(cancel.reason)
+
+        new_tokens = outputs[0][inputs.input_ids.shape[1]:]
+        self._record(mode, len(new_tokens), target_calls, draft_calls)
+        if len(new_tokens) and new_tokens[-1].item() == self.tokenizer.eos_token_id:
+            finish_reason = "eos"
+        elif len(new_tokens) >= max_new_tokens:
+            finish_reason = "length"
+        else:
+            finish_reason = "stop"
+        # HF generate 는 첫 토큰 시점을 알려주지 않으므로 TTFT 는 기록하지 않고 전체 시간을 디코드 시간으로
+        metrics.observe_generation(
+            mode,
+            "hf",
+            prompt_tokens=inputs.input_ids.shape[1],
+            generated_tokens=len(new_tokens),
+            queue_wait=started_at - (submitted_at if submitted_at is not None else started_at),
+            decode_time=finished_at - started_at,
+            batch_size=1,
+            finish_reason=finish_reason,
+        )
+        return self.tokenizer.decode(new_tokens, skip_special_tokens=True)
+
+    def _record(self, mode: str, new_tokens: int, target_calls: int, draft_calls: int):
+        accepted = max(new_tokens - target_calls, 0)
+        with self._stats_lock:
+            stat = self._stats.setdefault(mode, {
+                "calls": 0, "new_tokens": 0, "verify_steps": 0, "proposed": 0, "accepted": 0,
+            })
+            stat["calls"] += 1
+            stat["new_tokens"] += new_tokens
+            stat["verify_steps"] += target_calls
+            stat["proposed"] += draft_calls
+            stat["accepted"] += min(accepted, draft_calls)
+
+    def stats(self) -> Dict[str, dict]:
+        with self._stats_lock:
+            result = {}
+            for mode, stat in self._stats.items():
+                stat = dict(stat)
+                stat["acceptance_rate"] = round(stat["accepted"] / stat["proposed"], 4) if stat["proposed"] else 0.0
+                stat["tokens_per_verify_step"] = (
+                    round(stat["new_tokens"] / stat["verify_steps"], 3) if stat["verify_steps"] else 0.0
+                )
+                result[mode] = stat
+            return result
@@ -0,0 +1,37 @@
+# llm/backends/__init__.py
+'''
+LLM 백엔드 선택
+
+    hf      로컬 transformers (Kanana 4bit, GPU)
+    cpu     로컬 transformers (int8 dynamic quantization / bf16, CPU 전용 노드)
+    ollama  Ollama 호환 HTTP 서버
+    remote  같은 호스트의 모델 서버 프로세스 (python -m llm.server)
+    fake    결정적 fake (GPU 없는 부하 테스트/벤치마크용)
+'''
+
+from llm.backends.base import LLMBackend
+from llm.backends.fake import FakeBackend
+
+BACKENDS = ("hf", "cpu", "ollama", "remote", "fake")
+
+
+def create_backend(name: str, **kwargs) -> LLMBackend:
+    """이름으로 백엔드 생성. 무거운 의존성(torch, requests)은 해당 백엔드를 고를 때만 import."""
+    if name == "hf":
+        from llm.backends.hf import HFBackend
+        return HFBackend(**kwargs)
+    if name == "cpu":
+        from llm.backends.cpu import CPUBackend
+        return CPUBackend(**kwargs)
+    if name == "ollama":
+        from llm.backends.ollama import OllamaBackend
+        return OllamaBackend(**kwargs)
+    if name == "remote":
+        from llm.backends.remote import RemoteBackend
+        return RemoteBackend(**kwargs)
+    if name == "fake":
+        return FakeBackend(**kwargs)
+    raise ValueError(f"Unknown LLM backend: {name} (choose from {', '.join(BACKENDS)})")
+
+
+__all__ = ["LLMBackend", "FakeBackend", "BACKENDS", "create_backend"]
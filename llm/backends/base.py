@@ -0,0 +1,154 @@
+# llm/backends/base.py
+'''
+LLM 백엔드 공통 인터페이스
+
+모든 백엔드(transformers / Ollama HTTP / fake)는 같은 submit() 계약을 따른다.
+- submit(prompt, ...) → Future[str]  결과는 '생성된 부분'만의 원문 (후처리 전)
+- on_text 콜백: 지금까지 생성된 원문 전체를 받고, False 를 돌려주면 생성을 멈춘다
+- prefix / mode 는 힌트일 뿐이라 지원하지 않는 백엔드는 무시해도 된다
+- priority (interactive / bulk / backfill) / user: 대기열 순서. 우선순위 클래스 순으로,
+  같은 클래스 안에서는 user 별로 돌아가며 처리한다 (llm.fair_queue)
+- adapter: LoRA 어댑터 이름 (llm.lora). 어댑터를 지원하는 백엔드(hf)는 로딩되지 않은 이름이면
+  ValueError, 지원하지 않는 백엔드(fake / ollama)는 무시한다
+- cancel: 취소 토큰 (llm.cancellation). 취소되면 다음 토큰에서 생성을 멈추고 Future 는 GenerationCancelled
+
+submit_n(prompt, n, ...) → Future[List[str]]  같은 프롬프트의 후보 n개 (답변 후보 고르기)
+- 기본 구현은 submit() 을 n번. hf 는 프롬프트를 한 번만 prefill 하고 KV cache 를 복제해 후보를 디코딩한다
+
+generate / generate_batch / generate_stream / submit_n 은 submit() 위에 구현되어 있으므로
+새 백엔드는 submit() 과 count_tokens() 만 구현하면 된다.
+로컬에 모델을 올리는 백엔드는 unload() / footprint() 도 구현해 llm.registry 가 메모리를 관리하게 한다.
+'''
+
+import queue
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+from llm.cancellation import CancelToken
+from llm.fair_queue import DEFAULT_PRIORITY
+
+
+def gather(futures: List[Future]) -> Future:
+    """모두 끝나면 결과 목록(순서 유지)으로 끝나는 Future. 하나라도 실패하면 그 예외"""
+    result: Future = Future()
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def on_done(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        failed = next((f.exception() for f in futures if f.exception() is not None), None)
+        if failed is not None:
+            result.set_exception(failed)
+        else:
+            result.set_result([f.result() for f in futures])
+
+    if not futures:
+        result.set_result([])
+    for future in futures:
+        future.add_done_callback(on_done)
+    return result
+
+
+class LLMBackend(ABC):
+    name = "base"
+
+    def __init__(self, model_id: str):
+        # 결과 캐시 키에 들어가는 모델 식별자 (백엔드가 다르면 캐시도 섞이지 않도록)
+        self.model_id = model_id
+
+    def load(self):
+        """모델/연결 준비. 여러 번 호출되어도 한 번만 로딩해야 한다."""
+
+    def is_loaded(self) -> bool:
+        return True
+
+    def unload(self):
+        """모델 해제 (llm.registry 가 메모리 예산을 넘었을 때 호출). 다음 load() 에서 다시 로딩한다."""
+
+    def footprint(self) -> Dict[str, int]:
+        """이 프로세스에서 차지하는 메모리 {"ram": 바이트, "vram": 바이트} (원격 백엔드는 0)"""
+        return {"ram": 0, "vram": 0}
+
+    def adapters(self) -> List[str]:
+        """지금 쓸 수 있는 LoRA 어댑터 이름 목록"""
+        return []
+
+    def load_adapter(self, name: str, path: str):
+        """LoRA 어댑터를 얹는다 (서버 재시작 없이)"""
+        raise NotImplementedError(f"{self.name} 백엔드는 LoRA 어댑터를 지원하지 않습니다.")
+
+    def unload_adapter(self, name: str):
+        """LoRA 어댑터를 내린다. 없는 이름이면 KeyError"""
+        raise NotImplementedError(f"{self.name} 백엔드는 LoRA 어댑터를 지원하지 않습니다.")
+
+    @abstractmethod
+    def submit(
+        self,
+        prompt: str,
+        max_new_tokens: int = 400,
+        temperature: float = 0.7,
+        top_p: float = 0.9,
+        repetition_penalty: float = 1.3,
+        stop_words: Sequence[str] = (),
+        prefix: Optional[str] = None,
+        mode: Optional[str] = None,
+        on_text: Optional[Callable[[str], bool]] = None,
+        priority: str = DEFAULT_PRIORITY,
+        user: Optional[str] = None,
+        adapter: Optional[str] = None,
+        cancel: Optional[CancelToken] = None,
+    ) -> Future:
+        ...
+
+    @abstractmethod
+    def count_tokens(self, text: str) -> int:
+        ...
+
+    # -------------------------
+    # submit() 기반 공통 구현
+    # -------------------------
+    def generate(self, prompt: str, **params) -> str:
+        return self.submit(prompt, **params).result()
+
+    def submit_n(self, prompt: str, n: int, **params) -> Future:
+        """같은 프롬프트로 후보 n개 → Future[List[str]] (기본 구현: n번 submit, 같은 배치로 디코딩될 수 있음)"""
+        return gather([self.submit(prompt, **params) for _ in range(n)])
+
+    def generate_batch(self, prompts: List[str], **params) -> List[str]:
+        """한꺼번에 submit 한 뒤 모아서 반환 (배치를 지원하는 백엔드는 같은 배치로 디코딩)"""
+        futures = [self.submit(p, **params) for p in prompts]
+        return [f.result() for f in futures]
+
+    def generate_stream(self, prompt: str, **params) -> Iterator[str]:
+        """새로 생성된 원문 조각을 차례로 yield (후처리 전)"""
+        chunks: "queue.Queue[str | None]" = queue.Queue()
+        state = {"emitted": ""}
+
+        def on_text(raw: str) -> bool:
+            emitted = state["emitted"]
+            if len(raw) > len(emitted) and raw.startswith(emitted):
+                chunks.put(raw[len(emitted):])
+                state["emitted"] = raw
+            return True
+
+        future = self.submit(prompt, on_text=on_text, **params)
+        future.add_done_callback(lambda f: chunks.put(None))
+
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                break
+            yield chunk
+
+        final = future.result()
+        emitted = state["emitted"]
+        if len(final) > len(emitted) and final.startswith(emitted):
+            yield final[len(emitted):]
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "model_id": self.model_id, "loaded": self.is_loaded()}
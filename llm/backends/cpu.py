@@ -0,0 +1,103 @@
+# llm/backends/cpu.py
+'''
+CPU 전용 transformers 백엔드 (GPU 없는 노드용)
+
+- bitsandbytes 4bit 는 CPU 에서 동작하지 않으므로 같은 모델을 CPU 용으로 양자화해 로딩
+    quantize="int8"  torch dynamic quantization (nn.Linear 가중치 int8, 활성값은 실행 시 양자화)
+    quantize="bf16"  양자화 없이 bfloat16 (AMX/AVX512-BF16 지원 CPU)
+- 생성 경로는 GPU 백엔드와 같다 (BatchScheduler continuous batching + prefix KV cache)
+- num_threads: torch intra-op 스레드 수 (없으면 이 프로세스가 쓸 수 있는 코어 수)
+- 코어 고정은 프로세스 전체(uvicorn, DB 드라이버 포함)에 적용되므로 백엔드에서 하지 않는다.
+  한 노드에 여러 replica 를 띄울 때는 배포에서 (taskset / cgroups cpuset) 또는
+  모델 서버의 --cpu-affinity (python -m llm.server, 모델만 있는 프로세스) 로 코어를 나눠 준다
+
+int8 dynamic quantization 은 float32 가중치에서 변환하므로 로딩 중에는 fp32 모델 크기만큼 메모리가 필요하다.
+dynamic quantization 결과는 safetensors 로 저장할 수 없으므로 로컬 체크포인트는 bf16 으로 export 해 두고
+(python -m llm.checkpoint export <모델> --quantize bf16) 로딩 후 변환만 한다.
+'''
+
+import logging
+import os
+from typing import Optional, Set
+
+from llm.backends.hf import HFBackend
+
+logger = logging.getLogger(__name__)
+
+QUANTIZE_MODES = ("int8", "bf16")
+
+
+def parse_cpu_list(spec: str) -> Set[int]:
+    """'0-3,8,10-11' → {0, 1, 2, 3, 8, 10, 11}"""
+    cpus = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            cpus.update(range(int(start), int(end) + 1))
+        else:
+            cpus.add(int(part))
+    return cpus
+
+
+class CPUBackend(HFBackend):
+    name = "cpu"
+    checkpoint_quantize = "bf16"
+
+    def __init__(
+        self,
+        model_id: str,
+        max_batch_size: int = 4,
+        quantize: str = "int8",
+        num_threads: Optional[int] = None,
+        reserved_slots: int = 1,
+    ):
+        if quantize not in QUANTIZE_MODES:
+            raise ValueError(f"Unknown CPU quantize mode: {quantize} (choose from {', '.join(QUANTIZE_MODES)})")
+        super().__init__(model_id, max_batch_size=max_batch_size, reserved_slots=reserved_slots)
+        self.quantize = quantize
+        self.num_threads = num_threads
+
+    def _load_model(self, source: str):
+        import torch
+        from transformers import AutoModelForCausalLM
+
+        self._pin_threads(torch)
+
+        if self.quantize == "bf16":
+            return AutoModelForCausalLM.from_pretrained(
+                source,
+                torch_dtype=torch.bfloat16,
+                low_cpu_mem_usage=True,
+                trust_remote_code=True,
+            )
+
+        model = AutoModelForCausalLM.from_pretrained(
+            source,
+            torch_dtype=torch.float32,
+            low_cpu_mem_usage=True,
+            trust_remote_code=True,
+        )
+        model.eval()
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def _pin_threads(self, torch):
+        # taskset / cpuset 으로 코어가 제한돼 있으면 그 코어 수만큼만 (torch 기본값은 전체 물리 코어)
+        num_threads = self.num_threads
+        if num_threads is None and hasattr(os, "sched_getaffinity"):
+            num_threads = len(os.sched_getaffinity(0))
+        if num_threads:
+            torch.set_num_threads(num_threads)
+            try:
+                # 생성은 스케줄러 스레드 하나에서만 하므로 inter-op 병렬은 거의 필요 없다
+                torch.set_num_interop_threads(1)
+            except RuntimeError:
+                pass   # 이미 병렬 작업이 실행된 뒤에는 바꿀 수 없음
+            logger.info(f"torch threads: {num_threads}")
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats.update(quantize=self.quantize, num_threads=self.num_threads)
+        return stats
@@ -0,0 +1,174 @@
+# llm/backends/fake.py
+'''
+결정적(deterministic) fake 백엔드 — GPU 없는 스테이징/부하 테스트용
+
+- 모드별 준비된 답변 중 하나를 프롬프트 해시로 골라 반환 (같은 프롬프트 → 항상 같은 결과)
+  submit_n 은 후보 번호를 해시에 섞어 후보마다 다른 답변을 고른다 (같은 프롬프트 → 항상 같은 후보 목록)
+- latency: 요청당 고정 지연(초, prefill/TTFT 흉내), token_latency: 토큰당 지연(초)
+- 토큰은 공백 포함 최대 3글자 조각으로 나눈 단위 (count_tokens 도 같은 기준)
+- 실제 모델처럼 종료 마커('끝.')까지 출력하므로 후처리/stop word 경로도 그대로 탄다
+- 작업 대기열은 실제 백엔드와 같은 우선순위/사용자 공정 분배 (FairExecutor)
+- 취소 토큰은 토큰 조각마다 확인
+- LoRA 어댑터는 이름만 관리 (load_adapter / unload_adapter / 없는 이름이면 ValueError), 출력은 같다
+'''
+
+import hashlib
+import re
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Sequence
+
+from llm import metrics
+from llm.backends.base import LLMBackend, gather
+from llm.cancellation import CancelToken, GenerationCancelled
+from llm.fair_queue import DEFAULT_PRIORITY, FairExecutor
+
+NEWLINE = "\n"
+
+DEFAULT_OUTPUTS: Dict[str, List[str]] = {
+    "short": [
+        "불법주정차 단속 요청 끝.",
+        "도로 파손 보수 요청 끝.",
+        "옥외광고물 위반 현수막 끝.",
+    ],
+    "long": [
+        "민원인은 해당 지역의 불법 주정차로 인한 통행 불편을 호소하며 단속 강화를 요청하였습니다. "
+        "관련 법령에 따른 단속 및 계도 조치가 필요한 사안입니다. 끝.",
+        "민원인은 도로 파손으로 인한 안전사고 우려를 제기하며 신속한 보수를 요청하였습니다. "
+        "현장 확인 후 보수 일정 안내가 필요한 사안입니다. 끝.",
+    ],
+    "reply": [
+        "귀하께서 신청하신 민원에 대하여 아래와 같이 답변드립니다. "
+        "해당 사안은 현장 확인을 거쳐 관련 법령에 따라 조치할 예정이며, "
+        "처리 결과는 추후 안내해 드리겠습니다. 끝.",
+        "평소 구정에 관심을 가져 주셔서 감사드립니다. "
+        "말씀하신 사항은 담당 부서에서 현장을 확인한 뒤 필요한 조치를 하겠으며, "
+        "추가로 궁금하신 점은 담당 부서로 문의해 주시기 바랍니다. 끝.",
+    ],
+}
+DEFAULT_OUTPUT = "요청하신 내용을 확인하였습니다. 끝."
+
+_TOKEN_RE = re.compile(r"\s*\S{1,3}|\s+")
+
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text)
+
+
+class FakeBackend(LLMBackend):
+    name = "fake"
+
+    def __init__(
+        self,
+        outputs: Optional[Dict[str, List[str]]] = None,
+        latency: float = 0.0,
+        token_latency: float = 0.0,
+        max_concurrency: int = 8,
+        model_id: str = "fake",
+    ):
+        super().__init__(model_id)
+        self.outputs = outputs or DEFAULT_OUTPUTS
+        self.latency = latency
+        self.token_latency = token_latency
+        self._executor = FairExecutor(max_concurrency, thread_name_prefix="fake-llm")
+        self._adapters: Dict[str, str] = {}
+
+    def submit(
+        self,
+        prompt: str,
+        max_new_tokens: int = 400,
+        temperature: float = 0.7,
+        top_p: float = 0.9,
+        repetition_penalty: float = 1.3,
+        stop_words: Sequence[str] = (),
+        prefix: Optional[str] = None,
+        mode: Optional[str] = None,
+        on_text: Optional[Callable[[str], bool]] = None,
+        priority: str = DEFAULT_PRIORITY,
+        user: Optional[str] = None,
+        adapter: Optional[str] = None,
+        cancel: Optional[CancelToken] = None,
+        variant: int = 0,
+    ) -> Future:
+        """variant: 같은 프롬프트에서 다른 준비 답변을 고르는 번호 (submit_n 의 후보 번호)"""
+        if adapter is not None and adapter not in self._adapters:
+            raise ValueError(f"로딩되지 않은 LoRA 어댑터: {adapter}")
+        submitted_at = time.monotonic()
+        return self._executor.submit(
+            self._generate, prompt, mode, max_new_tokens, list(stop_words), on_text, submitted_at, priority, cancel,
+            variant, priority=priority, user=user,
+        )
+
+    def submit_n(self, prompt: str, n: int, **params) -> Future:
+        return gather([self.submit(prompt, variant=i, **params) for i in range(n)])
+
+    def adapters(self) -> List[str]:
+        return sorted(self._adapters)
+
+    def load_adapter(self, name: str, path: str):
+        self._adapters[name] = path
+
+    def unload_adapter(self, name: str):
+        del self._adapters[name]
+
+    def canned_output(self, prompt: str, mode: Optional[str], variant: int = 0) -> str:
+        candidates = self.outputs.get(mode or "") or [DEFAULT_OUTPUT]
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        return candidates[(int.from_bytes(digest[:4], "big") + variant) % len(candidates)]
+
+    def _generate(self, prompt: str, mode: Optional[str], max_new_tokens: int,
+                  stop_words: List[str], on_text, submitted_at: float, priority: str,
+                  cancel: Optional[CancelToken] = None, variant: int = 0) -> str:
+        started_at = time.monotonic()
+        if self.latency:
+            time.sleep(self.latency)
+
+        markers = [w for w in stop_words if w != NEWLINE]
+        text = ""
+        generated = 0
+        first_token_at = None
+        finish_reason = "eos"
+        tokens = _tokenize(self.canned_output(prompt, mode, variant))
+        for token in tokens[:max_new_tokens]:
+            if self.token_latency:
+                time.sleep(self.token_latency)
+            if cancel is not None and cancel.cancelled:
+                metrics.observe_failure(mode, self.name, "cancelled")
+                raise GenerationCancelled(cancel.reason)
+            text += token
+            generated += 1
+            first_token_at = first_token_at or time.monotonic()
+            if any(text.endswith(w) for w in markers):
+                finish_reason = "stop"
+                break
+            if NEWLINE in stop_words and NEWLINE in text.lstrip():
+                finish_reason = "stop"
+                break
+            if on_text is not None and not on_text(text):
+                finish_reason = "stop"
+                break
+        else:
+            if len(tokens) > max_new_tokens:
+                finish_reason = "length"
+
+        first_token_at = first_token_at or time.monotonic()
+        metrics.observe_generation(
+            mode,
+            self.name,
+            prompt_tokens=self.count_tokens(prompt),
+            generated_tokens=generated,
+            queue_wait=started_at - submitted_at,
+            ttft=first_token_at - submitted_at,
+            decode_time=time.monotonic() - first_token_at,
+            finish_reason=finish_reason,
+            priority=priority,
+        )
+        return text
+
+    def count_tokens(self, text: str) -> int:
+        return len(_tokenize(text))
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["queue"] = self._executor.stats()
+        return stats
@@ -0,0 +1,370 @@
+# llm/backends/hf.py
+'''
+로컬 transformers 백엔드 (Kanana 4bit + continuous batching 스케줄러)
+
+- bitsandbytes NF4 로 GPU 에 로딩하고 BatchScheduler 로 동시 요청을 배치 디코딩
+- assisted_modes 에 있는 모드는 초안 모델로 assisted decoding (스트리밍 요청은 제외)
+  배치 스케줄러 대기열을 거쳐 스케줄러 스레드에서 실행 (BatchScheduler 의 runner 요청)
+- 대기열은 우선순위 클래스 + user 별 공정 분배, reserved_slots 자리는 interactive 전용
+- min_free_memory(바이트): GPU 여유 메모리가 이보다 적으면 새 시퀀스를 배치에 합류시키지 않음
+- {LLM_CHECKPOINT_DIR} 에 미리 양자화해 둔 체크포인트(python -m llm.checkpoint export)가 있으면
+  허브 + 재양자화 대신 그 디렉터리를 바로 읽는다 (safetensors mmap, 토크나이저 포함)
+- LoRA 어댑터(부서별 문체)를 베이스 하나 위에 여러 개 얹고 요청마다 골라 쓴다 (llm.lora)
+  어댑터가 다른 요청도 같은 배치로 디코딩하고, load_adapter / unload_adapter 로 서버 재시작 없이 교체
+  (디스크 읽기는 호출 스레드, 모델에 얹는 것만 스케줄러 스레드 — 그동안만 디코딩이 멈춤)
+  (어댑터가 얹혀 있는 동안에는 assisted decoding 을 쓰지 않는다 — 초안 검증이 베이스 기준이라)
+- submit_n: 답변 후보 n개를 한 요청으로 — 프롬프트 prefill 은 한 번, KV cache 를 후보 수만큼 복제해 디코딩
+- torch / transformers 는 load() 안에서 import 한다
+'''
+
+import contextlib
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from llm import checkpoint, lora
+from llm.backends.base import LLMBackend
+from llm.cancellation import CancelToken
+from llm.fair_queue import DEFAULT_PRIORITY
+
+logger = logging.getLogger(__name__)
+
+
+def nf4_quantization_config():
+    """Kanana 4bit(NF4) 설정 — 로딩과 체크포인트 export 가 같은 설정을 쓰도록 한 곳에 둔다"""
+    import torch
+    from transformers import BitsAndBytesConfig
+
+    return BitsAndBytesConfig(
+        load_in_4bit=True,
+        bnb_4bit_quant_type="nf4",
+        bnb_4bit_use_double_quant=True,
+        bnb_4bit_compute_dtype=torch.bfloat16,
+    )
+
+
+class HFBackend(LLMBackend):
+    name = "hf"
+    # 로컬 체크포인트의 quantize 종류 (llm.checkpoint)
+    checkpoint_quantize = "nf4"
+
+    def __init__(
+        self,
+        model_id: str,
+        max_batch_size: int = 8,
+        assistant_model: Optional[str] = None,
+        assisted_modes: Iterable[str] = (),
+        reserved_slots: int = 1,
+        min_free_memory: int = 0,
+        checkpoint_root: Optional[str] = None,
+        adapters: Optional[Dict[str, str]] = None,
+    ):
+        super().__init__(model_id)
+        self.checkpoint_root = checkpoint_root   # None 이면 LLM_CHECKPOINT_DIR
+        self.max_batch_size = max_batch_size
+        self.reserved_slots = reserved_slots
+        self.min_free_memory = min_free_memory
+        self.assistant_model = assistant_model
+        self.assisted_modes = set(assisted_modes)
+
+        self.tokenizer = None
+        self.model = None
+        self.scheduler = None
+        self.assisted = None   # AssistedDecoder (assisted_modes 가 있을 때만)
+        self._load_lock = threading.Lock()
+        # 스케줄러 스레드와 토크나이저를 같이 쓰지 않도록 토큰 수 계산용은 따로 둔다
+        self._count_tok = None
+        self._count_lock = threading.Lock()
+
+        # LoRA 어댑터 이름 → 경로. 모델이 올라가 있으면 모두 얹혀 있고, 다시 로딩할 때도 이 목록대로 얹는다
+        self.adapter_paths: Dict[str, str] = dict(adapters or {})
+        self._adapter_cond = threading.Condition()
+        self._adapter_refs: Dict[str, int] = {}   # 어댑터별 진행 중인 요청 수
+        self._unloading = set()                   # 해제 대기 중 (새 요청은 받지 않음)
+
+    def is_loaded(self) -> bool:
+        return self.scheduler is not None
+
+    def load(self):
+        with self._load_lock:
+            if self.scheduler is not None:
+                return
+
+            import torch
+            from transformers import AutoModelForCausalLM, AutoTokenizer
+
+            from llm.scheduler import BatchScheduler
+
+            logger.info("LLM 로딩 중...")
+
+            # 검증된 로컬 체크포인트가 있으면 그 디렉터리, 없으면 원래 모델 id
+            source = checkpoint.resolve(self.model_id, self.checkpoint_quantize, self.checkpoint_root) or self.model_id
+            if source != self.model_id:
+                logger.info(f"로컬 체크포인트 사용: {source}")
+
+            tok = AutoTokenizer.from_pretrained(source, trust_remote_code=True)
+            if tok.eos_token is None:
+                tok.eos_token = "</s>"
+            if tok.pad_token is None:
+                tok.pad_token = tok.eos_token
+
+            model = self._load_model(source)
+            model.eval()
+            for name, path in self.adapter_paths.items():
+                logger.info(f"LoRA 어댑터 로딩: {name} ({path})")
+                model = lora.attach(model, name, path)
+
+            if self.assisted_modes and self.assistant_model:
+                from llm.assisted import AssistedDecoder
+
+                logger.info(f"초안 모델 로딩 중... ({self.assistant_model})")
+                draft_source = checkpoint.resolve(self.assistant_model, "bf16", self.checkpoint_root)
+                draft = AutoModelForCausalLM.from_pretrained(
+                    draft_source or self.assistant_model,
+                    torch_dtype=torch.bfloat16,
+                    device_map="auto",
+                    trust_remote_code=True,
+                )
+                draft.eval()
+                # 스케줄러의 토크나이저와 별도 인스턴스 (fast tokenizer 는 스레드 안전하지 않음)
+                draft_tok = AutoTokenizer.from_pretrained(source, trust_remote_code=True)
+                draft_tok.eos_token, draft_tok.pad_token = tok.eos_token, tok.pad_token
+                self.assisted = AssistedDecoder(model, draft, draft_tok)
+
+            # 동시 요청을 하나의 배치로 모아 디코딩하는 스케줄러
+            sched = BatchScheduler(
+                model, tok, max_batch_size=self.max_batch_size, name=self.name, reserved_slots=self.reserved_slots,
+                min_free_memory=self.min_free_memory,
+            )
+            sched.start()
+
+            self._count_tok = AutoTokenizer.from_pretrained(source, trust_remote_code=True)
+            self.tokenizer, self.model, self.scheduler = tok, model, sched
+            logger.info("모델 로딩 완료.")
+
+    def unload(self):
+        """스케줄러를 멈추고 모델/토크나이저를 놓는다 (사용 중인 요청이 없을 때 llm.registry 가 호출)"""
+        with self._load_lock:
+            if self.scheduler is None:
+                return
+            try:
+                self.scheduler.stop()
+            finally:
+                # stop 이 실패해도 다음 load() 가 새 스케줄러를 띄우도록 상태는 항상 비운다
+                self.scheduler = None
+                self.model = None
+                self.tokenizer = None
+                self.assisted = None
+                self._count_tok = None
+            logger.info("모델 해제 완료.")
+
+    def footprint(self) -> Dict[str, int]:
+        from llm.registry import module_footprint
+
+        draft = self.assisted.draft_model if self.assisted is not None else None
+        return module_footprint(self.model, draft)
+
+    # -------------------------
+    # LoRA 어댑터
+    # -------------------------
+    def adapters(self) -> List[str]:
+        with self._adapter_cond:
+            return sorted(name for name in self.adapter_paths if name not in self._unloading)
+
+    def load_adapter(self, name: str, path: str):
+        """
+        어댑터를 얹는다. 같은 이름이 있으면 내리고 다시 얹는다.
+        모델이 아직 안 올라가 있으면 경로만 기록하고 다음 load() 때 함께 얹는다.
+        """
+        if name == lora.BASE_ADAPTER:
+            raise ValueError(f"사용할 수 없는 어댑터 이름: {name}")
+        if name in self.adapters():
+            self.unload_adapter(name)
+        with self._load_lock:
+            if self.scheduler is not None:
+                loaded = lora.read(path)
+                self.scheduler.run_in_loop(
+                    lambda: self._swap_model(lora.attach_loaded(self.scheduler.model, name, loaded))
+                ).result()
+            with self._adapter_cond:
+                self.adapter_paths[name] = path
+
+    def unload_adapter(self, name: str):
+        """새 요청을 막고, 이 어댑터로 진행 중인 요청이 모두 끝나면 내린다"""
+        with self._adapter_cond:
+            if name not in self.adapter_paths or name in self._unloading:
+                raise KeyError(name)
+            self._unloading.add(name)
+            self._adapter_cond.wait_for(lambda: not self._adapter_refs.get(name))
+        try:
+            with self._load_lock:
+                if self.scheduler is not None:
+                    self.scheduler.run_in_loop(lambda: self._detach(name)).result()
+                with self._adapter_cond:
+                    del self.adapter_paths[name]
+        finally:
+            with self._adapter_cond:
+                self._unloading.discard(name)
+
+    def _detach(self, name: str):
+        # 스케줄러 스레드에서 실행
+        self.scheduler.drop_prefixes(name)
+        self._swap_model(lora.detach(self.scheduler.model, name))
+
+    def _swap_model(self, model):
+        # 스케줄러 스레드에서 실행: 다음 스텝부터 새 모델(어댑터 추가/제거)로 forward
+        self.scheduler.model = model
+        self.model = model
+
+    def _hold_adapter(self, name: str):
+        with self._adapter_cond:
+            if name not in self.adapter_paths or name in self._unloading:
+                raise ValueError(f"로딩되지 않은 LoRA 어댑터: {name}")
+            self._adapter_refs[name] = self._adapter_refs.get(name, 0) + 1
+
+    def _release_adapter(self, name: str):
+        with self._adapter_cond:
+            self._adapter_refs[name] -= 1
+            if not self._adapter_refs[name]:
+                del self._adapter_refs[name]
+                self._adapter_cond.notify_all()
+
+    def _load_model(self, source: str):
+        """
+        GPU 4bit(NF4) 로딩. 다른 디바이스/양자화 백엔드는 이 메서드만 바꾼다.
+        source 가 로컬 체크포인트면 이미 양자화된 가중치라 config 의 quantization_config 를 그대로 쓴다.
+        """
+        from transformers import AutoModelForCausalLM
+
+        if source != self.model_id:
+            return AutoModelForCausalLM.from_pretrained(source, device_map="auto", trust_remote_code=True)
+        return AutoModelForCausalLM.from_pretrained(
+            self.model_id,
+            quantization_config=nf4_quantization_config(),
+            device_map="auto",
+            trust_remote_code=True,
+        )
+
+    def submit(
+        self,
+        prompt: str,
+        max_new_tokens: int = 400,
+        temperature: float = 0.7,
+        top_p: float = 0.9,
+        repetition_penalty: float = 1.3,
+        stop_words: Sequence[str] = (),
+        prefix: Optional[str] = None,
+        mode: Optional[str] = None,
+        on_text: Optional[Callable[[str], bool]] = None,
+        priority: str = DEFAULT_PRIORITY,
+        user: Optional[str] = None,
+        adapter: Optional[str] = None,
+        cancel: Optional[CancelToken] = None,
+    ) -> Future:
+        if self.scheduler is None:
+            self.load()
+
+        # assisted decoding 은 토큰 단위 콜백이 없으므로 스트리밍은 항상 배치 디코딩으로
+        # 대기열 순서 / 취소는 배치 요청과 같고, 실행만 스케줄러 스레드에서 따로 (배치 1)
+        if (self.assisted is not None and mode in self.assisted_modes and on_text is None
+                and adapter is None and not lora.is_peft(self.model)):
+            return self.scheduler.submit(
+                prompt,
+                max_new_tokens=max_new_tokens,
+                temperature=temperature,
+                top_p=top_p,
+                repetition_penalty=repetition_penalty,
+                stop_words=list(stop_words),
+                mode=mode,
+                priority=priority,
+                user=user,
+                cancel=cancel,
+                runner=self._run_assisted,
+            )
+
+        # 진행 중인 요청이 있는 어댑터는 unload_adapter 가 끝날 때까지 기다린다
+        if adapter is not None:
+            self._hold_adapter(adapter)
+        try:
+            future = self.scheduler.submit(
+                prompt,
+                max_new_tokens=max_new_tokens,
+                temperature=temperature,
+                top_p=top_p,
+                repetition_penalty=repetition_penalty,
+                stop_words=list(stop_words),
+                prefix=prefix,
+                on_text=on_text,
+                mode=mode,
+                priority=priority,
+                user=user,
+                adapter=adapter,
+                cancel=cancel,
+            )
+        except BaseException:
+            # 대기열에 들어가지 못했으면 Future 콜백이 없으므로 여기서 반납 (unload_adapter 가 멈추지 않도록)
+            if adapter is not None:
+                self._release_adapter(adapter)
+            raise
+        if adapter is not None:
+            future.add_done_callback(lambda f: self._release_adapter(adapter))
+        return future
+
+    def _run_assisted(self, req) -> str:
+        # 스케줄러 스레드에서 실행. 대기하는 사이 어댑터가 얹혔으면 베이스 모델로 돌린다
+        model = self.scheduler.model
+        with model.disable_adapter() if lora.is_peft(model) else contextlib.nullcontext():
+            return self.assisted.generate(
+                req.prompt,
+                mode=req.mode,
+                max_new_tokens=req.max_new_tokens,
+                temperature=req.temperature,
+                top_p=req.top_p,
+                repetition_penalty=req.repetition_penalty,
+                stop_words=req.stop_words,
+                cancel=req.cancel,
+                submitted_at=req.submitted_at,
+            )
+
+    def submit_n(self, prompt: str, n: int, **params) -> Future:
+        """후보 n개: 배치 스케줄러가 prefill 을 한 번만 하고 후보를 같은 배치로 디코딩 (assisted decoding 은 안 씀)"""
+        if n <= 1 or params.get("on_text") is not None:
+            return super().submit_n(prompt, n, **params)
+        if self.scheduler is None:
+            self.load()
+
+        adapter = params.get("adapter")
+        if adapter is not None:
+            self._hold_adapter(adapter)
+        params["stop_words"] = list(params.get("stop_words", ()))
+        try:
+            future = self.scheduler.submit(prompt, num_return_sequences=n, **params)
+        except BaseException:
+            if adapter is not None:
+                self._release_adapter(adapter)
+            raise
+        if adapter is not None:
+            future.add_done_callback(lambda f: self._release_adapter(adapter))
+        return future
+
+    def count_tokens(self, text: str) -> int:
+        if self._count_tok is None:
+            self.load()
+        with self._count_lock:
+            return len(self._count_tok(text, add_special_tokens=False).input_ids)
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        if self.scheduler is not None:
+            stats["queue"] = self.scheduler.queue_stats()
+        stats["adapters"] = self.adapters()
+        return stats
+
+    def assisted_stats(self) -> dict:
+        """모드별 assisted decoding 수락률 통계"""
+        return {
+            "enabled_modes": sorted(self.assisted_modes),
+            "draft_model": self.assistant_model if self.assisted is not None else None,
+            "modes": self.assisted.stats() if self.assisted is not None else {},
+        }
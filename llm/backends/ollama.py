@@ -0,0 +1,181 @@
+# llm/backends/ollama.py
+'''
+Ollama 호환 HTTP 서버 백엔드 (POST {base_url}/api/generate)
+
+- 요청마다 스레드 풀에서 스트리밍(stream=true)으로 호출 → on_text 로 중간 결과 전달
+- 동시 요청 수는 max_concurrency 로 제한 (서버 쪽 OLLAMA_NUM_PARALLEL 과 맞추면 됨)
+  자리가 없을 때의 대기 순서는 우선순위 클래스 + user 별 공정 분배 (FairExecutor)
+- 샘플링 파라미터에 None 을 주면 서버 기본값 사용 (SERVER_DEFAULTS)
+- raw=True 면 모델 채팅 템플릿 없이 프롬프트를 그대로 보냄 (Kanana 용 '### Response:' 프롬프트)
+- "\n" stop word 는 본문이 나온 뒤의 줄바꿈에서만 멈추도록 클라이언트에서 판정
+- Ollama 는 토크나이즈 API 가 없으므로 tokenizer(HF 모델 id) 를 주면 그것으로 세고,
+  없으면 바이트 수 기반 근사치를 돌려준다
+'''
+
+import json
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Optional, Sequence
+
+import requests
+
+from llm import metrics
+from llm.backends.base import LLMBackend
+from llm.cancellation import CancelToken, GenerationCancelled
+from llm.fair_queue import DEFAULT_PRIORITY, FairExecutor
+
+NEWLINE = "\n"
+
+# 샘플링 값을 보내지 않고 서버(Modelfile) 기본값을 그대로 쓰고 싶을 때 submit 에 넘기는 값
+SERVER_DEFAULTS = dict(max_new_tokens=None, temperature=None, top_p=None, repetition_penalty=None)
+
+
+class OllamaBackend(LLMBackend):
+    name = "ollama"
+
+    def __init__(
+        self,
+        model: str,
+        base_url: str = "http://localhost:11434",
+        timeout: float = 120,
+        max_concurrency: int = 4,
+        raw: bool = False,
+        tokenizer: Optional[str] = None,
+    ):
+        super().__init__(model)
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.raw = raw
+        self.tokenizer = tokenizer
+        self._executor = FairExecutor(max_concurrency, thread_name_prefix="ollama")
+        self._session = requests.Session()
+        self._tok = None
+        self._tok_lock = threading.Lock()
+
+    def is_loaded(self) -> bool:
+        try:
+            res = self._session.get(f"{self.base_url}/api/tags", timeout=5)
+            return res.ok
+        except requests.RequestException:
+            return False
+
+    def submit(
+        self,
+        prompt: str,
+        max_new_tokens: int = 400,
+        temperature: float = 0.7,
+        top_p: float = 0.9,
+        repetition_penalty: float = 1.3,
+        stop_words: Sequence[str] = (),
+        prefix: Optional[str] = None,
+        mode: Optional[str] = None,
+        on_text: Optional[Callable[[str], bool]] = None,
+        priority: str = DEFAULT_PRIORITY,
+        user: Optional[str] = None,
+        adapter: Optional[str] = None,
+        cancel: Optional[CancelToken] = None,
+    ) -> Future:
+        options = {
+            "num_predict": max_new_tokens,
+            "temperature": temperature,
+            "top_p": top_p,
+            "repeat_penalty": repetition_penalty,
+        }
+        options = {k: v for k, v in options.items() if v is not None}
+        stops = [w for w in stop_words if w != NEWLINE]
+        if stops:
+            options["stop"] = stops
+        return self._executor.submit(
+            self._generate, prompt, options, NEWLINE in stop_words, stops, on_text, mode, time.monotonic(), priority,
+            cancel, priority=priority, user=user,
+        )
+
+    def _generate(self, prompt: str, options: dict, stop_on_newline: bool, stops, on_text,
+                  mode: Optional[str], submitted_at: float, priority: str,
+                  cancel: Optional[CancelToken] = None) -> str:
+        try:
+            return self._stream(prompt, options, stop_on_newline, stops, on_text, mode, submitted_at, priority, cancel)
+        except GenerationCancelled:
+            metrics.observe_failure(mode, self.name, "cancelled")
+            raise
+        except Exception:
+            metrics.observe_failure(mode, self.name)
+            raise
+
+    def _stream(self, prompt: str, options: dict, stop_on_newline: bool, stops, on_text,
+                mode: Optional[str], submitted_at: float, priority: str,
+                cancel: Optional[CancelToken] = None) -> str:
+        started_at = time.monotonic()
+        payload = {
+            "model": self.model_id,
+            "prompt": prompt,
+            "stream": True,
+            "raw": self.raw,
+            "options": options,
+        }
+        text = ""
+        done_reason = None
+        final = {}
+        chunks = 0
+        first_token_at = None
+        with self._session.post(
+            f"{self.base_url}/api/generate", json=payload, stream=True, timeout=self.timeout
+        ) as res:
+            res.raise_for_status()
+            for line in res.iter_lines():
+                # 연결을 닫으면 Ollama 도 생성을 멈춘다
+                if cancel is not None:
+                    cancel.raise_if_cancelled()
+                if not line:
+                    continue
+                data = json.loads(line)
+                if data.get("error"):
+                    raise RuntimeError(data["error"])
+                if data.get("response"):
+                    text += data["response"]
+                    chunks += 1
+                    first_token_at = first_token_at or time.monotonic()
+                if data.get("done"):
+                    done_reason = data.get("done_reason")
+                    final = data
+                    break
+                if stop_on_newline and NEWLINE in text.lstrip():
+                    break
+                if on_text is not None and not on_text(text):
+                    break
+
+        # 스트림 조각은 대개 토큰 1개. 끝까지 받았으면 서버가 센 값(eval_count)을 쓴다
+        first_token_at = first_token_at or time.monotonic()
+        metrics.observe_generation(
+            mode,
+            self.name,
+            prompt_tokens=final.get("prompt_eval_count"),
+            generated_tokens=final.get("eval_count", chunks),
+            queue_wait=started_at - submitted_at,
+            ttft=first_token_at - submitted_at,
+            decode_time=time.monotonic() - first_token_at,
+            finish_reason=done_reason or "stop",
+            priority=priority,
+        )
+
+        # Ollama 는 stop word 를 출력에서 빼므로 (HF 백엔드처럼) 종료 마커를 되붙인다.
+        # done_reason "stop" 은 EOS 일 수도 있지만 후처리가 마커 앞에서 자르므로 결과는 같다.
+        if done_reason == "stop" and stops:
+            text += stops[0]
+        return text
+
+    def count_tokens(self, text: str) -> int:
+        if self.tokenizer:
+            with self._tok_lock:
+                if self._tok is None:
+                    from transformers import AutoTokenizer
+                    self._tok = AutoTokenizer.from_pretrained(self.tokenizer, trust_remote_code=True)
+                return len(self._tok(text, add_special_tokens=False).input_ids)
+        # 근사치: 한국어 BPE 는 대략 3바이트(한 글자)당 1토큰 안팎
+        return max(1, len(text.encode("utf-8")) // 3) if text else 0
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["queue"] = self._executor.stats()
+        return stats
@@ -0,0 +1,201 @@
+# llm/backends/remote.py
+'''
+별도 프로세스의 모델 서버(python -m llm.server)를 쓰는 클라이언트 백엔드
+
+- 모델은 서버 프로세스 하나만 GPU 에 올리고, uvicorn API 워커는 몇 개든 이 백엔드로 요청만 보낸다
+- submit 계약은 다른 백엔드와 같다 (서버가 받은 요청을 자기 백엔드의 submit 으로 그대로 넘김)
+- 스트리밍은 NDJSON ({"text": 새 조각} ... {"done": true}). on_text 가 False 를 돌려주면
+  연결을 끊고, 서버는 다음 토큰에서 생성을 멈춘다
+- 취소 토큰이 있으면 스트리밍으로 받으면서 조각마다 확인하고, 취소되면 연결을 끊는다 (서버도 바로 중단)
+- 서버가 아직 로딩 중이면(503) ModelNotReady 를 올려 API 쪽에서 그대로 503 + Retry-After 로 응답
+- 서버 admission 이 넘치면(429 / reason 이 있는 503) Overloaded 를 올림
+- LoRA 어댑터 목록/로딩/해제는 서버의 /adapters 로 그대로 전달 (없는 어댑터 400 → ValueError, 404 → KeyError)
+- load() 는 서버가 준비될 때까지 기다린다 (API 의 ModelLoader 백그라운드 스레드에서 호출됨)
+'''
+
+import json
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence
+
+import requests
+
+from llm.admission import Overloaded
+from llm.backends.base import LLMBackend
+from llm.cancellation import CancelToken, GenerationCancelled
+from llm.fair_queue import DEFAULT_PRIORITY
+from llm.loader import DEFAULT_RETRY_AFTER, ModelNotReady
+
+logger = logging.getLogger(__name__)
+
+
+class RemoteBackend(LLMBackend):
+    name = "remote"
+
+    def __init__(
+        self,
+        model_id: str,
+        base_url: str = "http://127.0.0.1:8100",
+        timeout: float = 300,
+        max_concurrency: int = 64,
+        poll_interval: float = 2.0,
+    ):
+        super().__init__(model_id)
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        # 서버 응답을 기다리기만 하는 스레드 (실제 배치 크기는 서버의 LLM_MAX_BATCH_SIZE 가 정함)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm-remote")
+        self._session = requests.Session()
+        self._ready = False
+
+    def load(self):
+        """모델 서버가 ready 가 될 때까지 대기"""
+        while not self._ready:
+            try:
+                res = self._session.get(f"{self.base_url}/healthz", timeout=5)
+                if res.ok:
+                    self._ready = True
+                    break
+                state = res.json().get("state")
+            except requests.RequestException as e:
+                state = f"unreachable: {e}"
+            logger.info(f"[LLM] 모델 서버 대기 중 ({self.base_url}, {state})")
+            time.sleep(self.poll_interval)
+
+    def is_loaded(self) -> bool:
+        return self._ready
+
+    def submit(
+        self,
+        prompt: str,
+        max_new_tokens: int = 400,
+        temperature: float = 0.7,
+        top_p: float = 0.9,
+        repetition_penalty: float = 1.3,
+        stop_words: Sequence[str] = (),
+        prefix: Optional[str] = None,
+        mode: Optional[str] = None,
+        on_text: Optional[Callable[[str], bool]] = None,
+        priority: str = DEFAULT_PRIORITY,
+        user: Optional[str] = None,
+        adapter: Optional[str] = None,
+        cancel: Optional[CancelToken] = None,
+    ) -> Future:
+        payload = {
+            "prompt": prompt,
+            "max_new_tokens": max_new_tokens,
+            "temperature": temperature,
+            "top_p": top_p,
+            "repetition_penalty": repetition_penalty,
+            "stop_words": list(stop_words),
+            "prefix": prefix,
+            "mode": mode,
+            "priority": priority,
+            "user": user,
+            "adapter": adapter,
+            "stream": on_text is not None or cancel is not None,
+        }
+        return self._executor.submit(self._generate, payload, on_text, cancel)
+
+    def submit_n(self, prompt: str, n: int, **params) -> Future:
+        """
+        후보 n개를 요청 한 번으로 (모델 서버의 백엔드가 hf 면 prefill 도 한 번)
+        cancel 을 주면 stream 으로 요청해 keep-alive 줄마다 취소를 확인하고, 취소되면 연결을 닫아
+        모델 서버에서도 생성을 멈춘다 (submit 의 스트리밍 경로와 같은 방식)
+        """
+        if n <= 1 or params.get("on_text") is not None:
+            return super().submit_n(prompt, n, **params)
+        cancel = params.pop("cancel", None)
+        payload = dict(params, prompt=prompt, num_return_sequences=n, stream=cancel is not None)
+        payload["stop_words"] = list(payload.get("stop_words", ()))
+        return self._executor.submit(self._generate_n, payload, cancel)
+
+    def _post(self, path: str, payload: dict, stream: bool = False) -> requests.Response:
+        return self._request("POST", path, payload, stream=stream)
+
+    def _request(self, method: str, path: str, payload: Optional[dict] = None,
+                 stream: bool = False) -> requests.Response:
+        res = self._session.request(method, f"{self.base_url}{path}", json=payload, stream=stream,
+                                    timeout=self.timeout)
+        if res.status_code in (400, 404):
+            try:
+                detail = res.json().get("detail", res.text)
+            except ValueError:
+                detail = res.text
+            res.close()
+            raise (ValueError if res.status_code == 400 else KeyError)(detail)
+        if res.status_code in (429, 503):
+            retry_after = int(res.headers.get("Retry-After", DEFAULT_RETRY_AFTER))
+            try:
+                body = res.json()
+            except ValueError:
+                body = {}
+            res.close()
+            # 모델 서버 admission 초과 (429 대기열 가득 참 / 503 대기 시간 초과)
+            if res.status_code == 429 or "reason" in body:
+                raise Overloaded(body.get("reason", "server_queue_full"), res.status_code, retry_after)
+            raise ModelNotReady(body.get("state", "unavailable"), retry_after)
+        res.raise_for_status()
+        return res
+
+    def _generate(self, payload: dict, on_text, cancel: Optional[CancelToken] = None) -> str:
+        if not payload["stream"]:
+            return self._post("/generate", payload).json()["text"]
+
+        text = ""
+        with self._post("/generate", payload, stream=True) as res:
+            for line in res.iter_lines():
+                if cancel is not None and cancel.cancelled:
+                    raise GenerationCancelled(cancel.reason)   # with 블록을 나가며 연결을 닫는다
+                if not line:
+                    continue
+                data = json.loads(line)
+                if data.get("error"):
+                    raise RuntimeError(data["error"])
+                if data.get("done"):
+                    break
+                text += data.get("text", "")
+                if on_text is not None and not on_text(text):
+                    break   # 연결을 닫으면 서버가 생성을 멈춘다
+        return text
+
+    def _generate_n(self, payload: dict, cancel: Optional[CancelToken] = None) -> List[str]:
+        if not payload["stream"]:
+            return self._post("/generate", payload).json()["texts"]
+
+        cancel.raise_if_cancelled()
+        texts = None
+        with self._post("/generate", payload, stream=True) as res:
+            for line in res.iter_lines():
+                if cancel.cancelled:
+                    raise GenerationCancelled(cancel.reason)   # with 블록을 나가며 연결을 닫는다
+                if not line:
+                    continue   # keep-alive
+                data = json.loads(line)
+                if data.get("error"):
+                    raise RuntimeError(data["error"])
+                if data.get("done"):
+                    break
+                texts = data.get("texts", texts)
+        if texts is None:
+            raise RuntimeError("모델 서버가 후보 없이 응답을 끝냈습니다.")
+        return texts
+
+    def count_tokens(self, text: str) -> int:
+        return self._post("/count_tokens", {"text": text}).json()["tokens"]
+
+    def adapters(self) -> List[str]:
+        return self._request("GET", "/adapters").json()["adapters"]
+
+    def load_adapter(self, name: str, path: str):
+        self._request("PUT", f"/adapters/{name}", {"path": path})
+
+    def unload_adapter(self, name: str):
+        self._request("DELETE", f"/adapters/{name}")
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["server"] = self.base_url
+        return stats
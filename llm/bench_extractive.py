@@ -0,0 +1,178 @@
+# llm/bench_extractive.py
+'''
+추출 압축(llm.extractive) 효과 측정 — 크롤링한 구청 민원 데이터 기준
+
+    python -m llm.bench_extractive                          # 토큰 절감 / 내용 보존 (모델 생성 없음)
+    python -m llm.bench_extractive --generate --limit 50    # + 원문 / 압축본으로 실제 생성해 결과 비교
+
+데이터: Crawling/data/final/{구}_crawling_data.csv (민원내용, 답변내용 열)
+         — 사하구는 Crawling/crawling/crawling.py 로 saha_crawling_data.csv 를 만들면 함께 측정
+토큰 수: --tokenizer 를 주면 그 토크나이저(transformers), 아니면 LLM_BACKEND 백엔드의 count_tokens
+
+지표 (구별, 예산을 넘어 실제로 압축된 민원만):
+- tokens raw / compressed / saved   본문 토큰 평균과 절감률 (= prefill 절감, 지침 prefix 는 KV cache 재사용이라 제외)
+- compress ms                       압축에 걸린 시간 평균
+- coverage                          원문 글자 bigram 중 압축본에 남은 비율
+- ref recall raw / compressed       담당자 답변의 '내 용 :' 줄(민원 요지)의 bigram 이 본문에 있는 비율
+- --generate: 모드별 (short / long / reply)
+    agree      압축본으로 만든 결과와 원문으로 만든 결과의 bigram overlap
+    grounded   압축본 결과가 원문에 근거한 비율 (llm.cascade.overlap)
+    latency    원문 / 압축본 생성 시간 평균 (초)
+'''
+
+import argparse
+import csv
+import glob
+import os
+import re
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+from llm import cascade, extractive
+
+DEFAULT_DATA = "Crawling/data/final/*_crawling_data.csv"
+_REFERENCE = re.compile(r"내\s*용\s*[:：]\s*(.+)")
+
+
+def load_rows(pattern: str, limit: Optional[int]) -> Dict[str, List[dict]]:
+    """{구 이름: [{"content", "reference"}]}"""
+    districts = {}
+    for path in sorted(glob.glob(pattern)):
+        district = os.path.basename(path).split("_")[0]
+        rows = []
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                content = (row.get("민원내용") or "").strip()
+                if not content:
+                    continue
+                match = _REFERENCE.search(row.get("답변내용") or "")
+                rows.append({"content": content, "reference": match.group(1).strip() if match else None})
+                if limit and len(rows) >= limit:
+                    break
+        districts[district] = rows
+    return districts
+
+
+def token_counter(tokenizer: Optional[str]) -> Callable[[str], int]:
+    if tokenizer:
+        from transformers import AutoTokenizer
+
+        tok = AutoTokenizer.from_pretrained(tokenizer, trust_remote_code=True)
+        return lambda text: len(tok(text, add_special_tokens=False).input_ids)
+
+    from llm import infer
+    return infer.count_tokens
+
+
+def _mean(values: List[float]) -> float:
+    return sum(values) / len(values) if values else 0.0
+
+
+def measure(rows: List[dict], budget: int, count: Callable[[str], int]) -> dict:
+    stats = defaultdict(list)
+    compressed_rows = []
+    for row in rows:
+        text = row["content"]
+        total = count(text)
+        started = time.perf_counter()
+        short = extractive.compress(text, budget, total)
+        stats["compress_ms"].append((time.perf_counter() - started) * 1000)
+        if short == text:
+            continue
+
+        stats["raw"].append(total)
+        stats["compressed"].append(count(short))
+        stats["coverage"].append(cascade.overlap(text, short))
+        if row["reference"]:
+            stats["ref_raw"].append(cascade.overlap(row["reference"], text))
+            stats["ref_compressed"].append(cascade.overlap(row["reference"], short))
+        compressed_rows.append(dict(row, compressed=short))
+
+    raw, compressed = sum(stats["raw"]), sum(stats["compressed"])
+    return {
+        "rows": len(rows),
+        "compressed_rows": len(compressed_rows),
+        "tokens_raw": _mean(stats["raw"]),
+        "tokens_compressed": _mean(stats["compressed"]),
+        "saved": 1 - compressed / raw if raw else 0.0,
+        "compress_ms": _mean(stats["compress_ms"]),
+        "coverage": _mean(stats["coverage"]),
+        "ref_rows": len(stats["ref_raw"]),
+        "ref_recall_raw": _mean(stats["ref_raw"]),
+        "ref_recall_compressed": _mean(stats["ref_compressed"]),
+        "_compressed_rows": compressed_rows,
+    }
+
+
+def compare_generation(rows: List[dict], modes: List[str]) -> Dict[str, dict]:
+    """원문 / 압축본으로 같은 프롬프트를 생성해 비교 (결과 캐시를 거치지 않음)"""
+    from llm import infer
+    from llm.context import request_context
+
+    builders = {
+        "short": lambda text, row: (infer.build_prompt_short(text), infer.SHORT_GEN_KWARGS),
+        "long": lambda text, row: (infer.build_prompt_long(text), infer.LONG_GEN_KWARGS),
+        # 답변의 주요 내용은 담당자 답변의 '내 용' 줄 (없으면 빈 값)
+        "reply": lambda text, row: (infer.build_prompt_reply(text, row["reference"] or ""), infer.REPLY_GEN_KWARGS),
+    }
+    results = {}
+    for mode in modes:
+        stats = defaultdict(list)
+        for row in rows:
+            outputs = {}
+            for variant in ("raw", "compressed"):
+                text = row["content"] if variant == "raw" else row["compressed"]
+                prompt, gen_kwargs = builders[mode](text, row)
+                started = time.perf_counter()
+                with request_context(priority="bulk"):
+                    outputs[variant] = infer.llm_generate(prompt, **gen_kwargs)
+                stats[f"latency_{variant}"].append(time.perf_counter() - started)
+            stats["agree"].append(cascade.overlap(outputs["compressed"], outputs["raw"]))
+            stats["grounded"].append(cascade.overlap(outputs["compressed"], row["content"]))
+        results[mode] = {name: _mean(values) for name, values in stats.items()}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="추출 압축 prefill 절감 / 품질 벤치마크")
+    parser.add_argument("--data", default=DEFAULT_DATA, help=f"CSV glob (기본값: {DEFAULT_DATA})")
+    parser.add_argument("--budget", type=int, default=None, help="압축 예산 토큰 (기본값: LLM_EXTRACTIVE_TOKENS)")
+    parser.add_argument("--limit", type=int, default=None, help="구별 최대 민원 수")
+    parser.add_argument("--tokenizer", default=None, help="토큰 수를 셀 토크나이저 (기본값: LLM_BACKEND 백엔드)")
+    parser.add_argument("--generate", action="store_true", help="원문 / 압축본으로 실제 생성해 비교")
+    parser.add_argument("--modes", default="short,long,reply", help="--generate 에서 비교할 프롬프트")
+    args = parser.parse_args()
+
+    from llm import infer
+
+    # 벤치마크가 압축을 직접 적용하므로 프롬프트 빌더의 자동 압축은 끈다
+    infer.EXTRACTIVE_MODES = set()
+    budget = args.budget or infer.EXTRACTIVE_TOKENS
+    count = token_counter(args.tokenizer)
+    districts = load_rows(args.data, args.limit)
+    if not districts:
+        raise SystemExit(f"데이터가 없습니다: {args.data}")
+
+    print(f"예산 {budget} 토큰")
+    for district, rows in districts.items():
+        result = measure(rows, budget, count)
+        print(f"\n[{district}] 민원 {result['rows']}건 중 압축 {result['compressed_rows']}건")
+        if not result["compressed_rows"]:
+            continue
+        print(f"  tokens raw {result['tokens_raw']:.0f} → compressed {result['tokens_compressed']:.0f}"
+              f" (saved {result['saved']:.1%}), compress {result['compress_ms']:.1f}ms")
+        print(f"  coverage {result['coverage']:.3f}")
+        if result["ref_rows"]:
+            print(f"  ref recall raw {result['ref_recall_raw']:.3f} / compressed {result['ref_recall_compressed']:.3f}"
+                  f" ({result['ref_rows']}건)")
+
+        if args.generate:
+            modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+            for mode, stats in compare_generation(result["_compressed_rows"], modes).items():
+                print(f"  {mode:<5} agree {stats['agree']:.3f}, grounded {stats['grounded']:.3f},"
+                      f" latency raw {stats['latency_raw']:.2f}s / compressed {stats['latency_compressed']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
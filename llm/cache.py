@@ -0,0 +1,152 @@
+# llm/cache.py
+'''
+LLM 결과 캐시 (content-addressed)
+
+- 키: (모델 id, 프롬프트 템플릿 버전, 모드, 샘플링 파라미터, 정규화한 입력) 의 sha256
+- 1차: 프로세스 내 LRU (메모리)
+- 2차: 영속 저장소 (예: Postgres, 모든 API 노드가 공유) — attach_store() 로 연결
+- 같은 민원 본문이 다시 들어오면 (엑셀 재업로드, 중복 민원 등) GPU 를 쓰지 않고 바로 반환
+- hit / miss 카운터를 stats() 로 노출
+
+영속 저장소는 다음 메서드를 가진 객체면 된다.
+    get(key) -> Optional[str]
+    put(key, mode, model_id, result) -> None
+'''
+
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text) -> str:
+    """유니코드 정규화 + 공백 정리 (줄바꿈/띄어쓰기 차이만 있는 입력은 같은 키)"""
+    text = unicodedata.normalize("NFC", str(text or ""))
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def template_version(template: str) -> str:
+    """프롬프트 템플릿이 바뀌면 자동으로 바뀌는 버전 문자열"""
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()[:12]
+
+
+def make_key(model_id: str, template_ver: str, mode: str, params: dict, *inputs) -> str:
+    payload = json.dumps(
+        {
+            "model": model_id,
+            "template": template_ver,
+            "mode": mode,
+            "params": params,
+            "inputs": [normalize_text(x) for x in inputs],
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, max_entries: int = 1024, max_age_seconds: float = 7 * 24 * 3600, enabled: bool = True):
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.enabled = enabled
+        self.store = None
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()  # key → (저장 시각, 결과)
+        self._lock = threading.Lock()
+        self._stats: Dict[str, int] = {
+            "memory_hits": 0,
+            "store_hits": 0,
+            "misses": 0,
+            "store_errors": 0,
+        }
+
+    def attach_store(self, store):
+        self.store = store
+
+    # -------------------------
+    # 조회 / 저장
+    # -------------------------
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if time.time() - stored_at <= self.max_age_seconds:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+        if self.store is not None:
+            try:
+                value = self.store.get(key)
+            except Exception as e:
+                value = None
+                self._count("store_errors")
+                logger.warning(f"[LLM 캐시] 저장소 조회 실패(무시): {e}")
+            if value is not None:
+                self._remember(key, value)
+                self._count("store_hits")
+                return value
+
+        self._count("misses")
+        return None
+
+    def put(self, key: str, mode: str, model_id: str, value: str):
+        if not self.enabled or not value:
+            return
+        self._remember(key, value)
+        if self.store is not None:
+            try:
+                self.store.put(key, mode, model_id, value)
+            except Exception as e:
+                self._count("store_errors")
+                logger.warning(f"[LLM 캐시] 저장소 기록 실패(무시): {e}")
+
+    def get_or_compute(self, key: str, mode: str, model_id: str, compute: Callable[[], str],
+                       use_cache: bool = True) -> str:
+        """
+        캐시에 있으면 바로 반환, 없으면 compute() 실행 후 저장.
+        use_cache=False 면 조회는 건너뛰고 새로 생성한 결과로 캐시를 갱신한다.
+        """
+        if use_cache:
+            cached = self.get(key)
+            if cached is not None:
+                return cached
+        value = compute()
+        self.put(key, mode, model_id, value)
+        return value
+
+    # -------------------------
+    # 내부 / 통계
+    # -------------------------
+    def _remember(self, key: str, value: str):
+        with self._lock:
+            self._memory[key] = (time.time(), value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        hits = stats["memory_hits"] + stats["store_hits"]
+        total = hits + stats["misses"]
+        stats["hit_rate"] = round(hits / total, 4) if total else 0.0
+        return stats
@@ -0,0 +1,37 @@
+# llm/cancellation.py
+'''
+생성 취소 토큰
+
+담당자가 화면을 떠나거나(클라이언트 연결 끊김) 작업을 취소하면 토큰을 cancel() 한다.
+- 배치 스케줄러: 매 디코드 스텝 종료 판정(stop words)과 함께 확인 → 그 스텝에서 바로 배치에서 빠지고
+  KV cache 자리를 반납. 아직 대기열에 있던 요청은 prefill 하지 않고 버린다
+- assisted decoding: HF generate 의 stopping_criteria 로 매 스텝 확인 (llm.stopping.StopOnCancel)
+- fake / ollama / remote: 토큰(스트림 조각)마다 확인, remote 는 연결을 끊어 모델 서버도 멈춘다
+취소된 요청의 Future 는 GenerationCancelled 로 끝나므로 호출 쪽은 결과 저장(DB 쓰기)을 건너뛴다.
+'''
+
+import threading
+from typing import Optional
+
+
+class GenerationCancelled(Exception):
+    """취소 토큰으로 중단된 생성"""
+
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason: Optional[str] = None
+
+    def cancel(self, reason: str = "cancelled"):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise GenerationCancelled(self.reason)
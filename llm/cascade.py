@@ -0,0 +1,78 @@
+# llm/cascade.py
+'''
+요약 cascade 검증 (작은 모델 결과를 그대로 쓸지, Kanana 로 다시 만들지)
+
+짧은 요약("화명1동 불법주차")은 작은 모델(polyglot 등)로도 충분한 경우가 많으므로
+llm.infer 가 먼저 작은 모델로 생성하고, 여기 check() 를 통과하지 못한 것만 Kanana 로 다시 생성한다.
+생성 확률(confidence)은 백엔드마다 얻을 수 없으므로 출력 형식/근거 검사로 판정한다.
+
+공통:
+- 비어 있지 않을 것
+- 프롬프트 지침이 새어 나오지 않을 것 ("[지침]", "### Response" 등)
+- 원문 근거: 요약의 글자 bigram(공백 제외) 중 원문에 있는 비율이 min_overlap 이상
+  → 원문에 없는 지명/대상을 지어내면 Kanana 로 넘긴다
+
+짧은 요약: max_short_chars 이하의 명사구 (서술형 어미로 끝나면 탈락)
+긴 요약: 종료 마커('끝.')로 끝났을 것, 1~max_long_sentences 문장, 목록/번호 없음, 같은 문장 반복 없음
+'''
+
+import os
+import re
+from typing import Optional, Set
+
+MAX_SHORT_CHARS = int(os.getenv("LLM_CASCADE_MAX_SHORT_CHARS", "40"))
+MAX_LONG_SENTENCES = int(os.getenv("LLM_CASCADE_MAX_LONG_SENTENCES", "6"))
+MIN_OVERLAP = float(os.getenv("LLM_CASCADE_MIN_OVERLAP", "0.5"))
+
+_LEAK_MARKERS = ("[지침]", "[입력 민원]", "[출력 형식]", "###", "요약하십시오", "AI입니다")
+_SENTENCE_ENDING = re.compile(r"(다|요|니다|습니까|세요)[.!?]?$")
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+_LIST_LINE = re.compile(r"^\s*([-*•·]|\d+[.)])\s*", re.MULTILINE)
+_NON_WORD = re.compile(r"[^0-9A-Za-z가-힣]")
+
+
+def _bigrams(text: str) -> Set[str]:
+    text = _NON_WORD.sub("", text)
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def overlap(summary: str, source: str) -> float:
+    """요약의 글자 bigram 중 원문에도 있는 비율 (띄어쓰기/문장부호 차이는 무시)"""
+    grams = _bigrams(summary)
+    if not grams:
+        return 0.0
+    return len(grams & _bigrams(source)) / len(grams)
+
+
+def check(mode: str, text: str, stopped: bool, source: str, min_overlap: float = MIN_OVERLAP) -> Optional[str]:
+    """
+    작은 모델 출력(후처리 후) 검증. 통과하면 None, 아니면 탈락 사유.
+    stopped: 종료 마커('끝.' / 'end.')가 나왔는지 (llm.infer._clean_output 의 두 번째 값)
+    """
+    text = text.strip()
+    if not text:
+        return "empty"
+    if any(marker in text for marker in _LEAK_MARKERS):
+        return "prompt_leak"
+
+    if mode == "short":
+        line = text.splitlines()[0].strip()
+        if len(line) > MAX_SHORT_CHARS:
+            return "too_long"
+        if _SENTENCE_ENDING.search(line):
+            return "not_noun_phrase"
+        text = line
+    elif mode == "long":
+        if not stopped:
+            return "no_end_marker"
+        if _LIST_LINE.search(text):
+            return "list_format"
+        sentences = [s for s in _SENTENCE_SPLIT.split(text) if s.strip()]
+        if len(sentences) > MAX_LONG_SENTENCES:
+            return "too_many_sentences"
+        if len(set(sentences)) != len(sentences):
+            return "repetition"
+
+    if overlap(text, source) < min_overlap:
+        return "ungrounded"
+    return None
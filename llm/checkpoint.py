@@ -0,0 +1,231 @@
+# llm/checkpoint.py
+'''
+미리 양자화한 로컬 체크포인트 캐시 (safetensors + manifest)
+
+매번 허브에서 모델을 받아/찾아 NF4 로 다시 양자화하는 대신, 한 번 export 해 둔 디렉터리를
+from_pretrained 로 바로 읽는다. safetensors 는 mmap 으로 열리므로 재시작/오토스케일 시 로딩이 빠르다.
+
+    python -m llm.checkpoint export kakaocorp/kanana-1.5-8b-instruct-2505 --quantize nf4
+    python -m llm.checkpoint export intfloat/multilingual-e5-large-instruct --kind embedder
+    python -m llm.checkpoint verify checkpoints/kakaocorp--kanana-1.5-8b-instruct-2505-nf4 --mode full
+
+- 위치: {LLM_CHECKPOINT_DIR}/{모델 id 의 '/' → '--'}-{quantize}
+- quantize: nf4 (bitsandbytes 4bit, GPU) / bf16 (양자화 없음 — CPU 백엔드, 초안 모델, 임베더)
+- manifest.json: 원본 모델 id, quantize, 종류, 라이브러리 버전, 파일별 크기 + sha256 + quick hash
+- 로딩 전 무결성 확인 (LLM_CHECKPOINT_VERIFY)
+    quick  파일 존재 + 크기 + 앞뒤 1MB 해시 (기본, 수 ms)
+    full   전체 sha256 (수 GB 를 읽으므로 느림)
+    off    확인 안 함
+  확인에 실패하면 경고를 남기고 원래 모델 id 로 (허브 + 양자화) 로딩한다
+- export 는 임시 디렉터리에 쓴 뒤 rename 하므로 중간에 실패해도 반쯤 쓴 캐시가 남지 않는다
+'''
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_ROOT = os.getenv("LLM_CHECKPOINT_DIR", "./checkpoints")
+VERIFY_MODE = os.getenv("LLM_CHECKPOINT_VERIFY", "quick")
+MANIFEST = "manifest.json"
+QUANTIZE_MODES = ("nf4", "bf16")
+VERIFY_MODES = ("quick", "full", "off")
+
+_QUICK_CHUNK = 1024 * 1024
+
+
+class CheckpointError(Exception):
+    pass
+
+
+def checkpoint_path(model_id: str, quantize: str, root: Optional[str] = None) -> str:
+    return os.path.join(root or CHECKPOINT_ROOT, f"{model_id.replace('/', '--')}-{quantize}")
+
+
+# =========================
+# 해시 / manifest
+# =========================
+def _full_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(16 * _QUICK_CHUNK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _quick_hash(path: str) -> str:
+    """크기 + 앞 1MB + 뒤 1MB (잘린 파일 / 다른 파일로 바뀐 경우를 빠르게 잡는다)"""
+    size = os.path.getsize(path)
+    h = hashlib.sha256(str(size).encode())
+    with open(path, "rb") as f:
+        h.update(f.read(_QUICK_CHUNK))
+        if size > _QUICK_CHUNK:
+            f.seek(max(size - _QUICK_CHUNK, _QUICK_CHUNK))
+            h.update(f.read(_QUICK_CHUNK))
+    return h.hexdigest()
+
+
+def _versions() -> Dict[str, str]:
+    versions = {}
+    for name in ("torch", "transformers", "bitsandbytes", "safetensors"):
+        try:
+            versions[name] = __import__(name).__version__
+        except Exception:
+            pass
+    return versions
+
+
+def write_manifest(directory: str, model_id: str, quantize: str, kind: str):
+    files = {}
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if name == MANIFEST or not os.path.isfile(path):
+            continue
+        files[name] = {
+            "size": os.path.getsize(path),
+            "sha256": _full_hash(path),
+            "quick": _quick_hash(path),
+        }
+    manifest = {
+        "model_id": model_id,
+        "quantize": quantize,
+        "kind": kind,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "versions": _versions(),
+        "files": files,
+    }
+    with open(os.path.join(directory, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def read_manifest(directory: str) -> dict:
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.isfile(path):
+        raise CheckpointError(f"manifest 없음: {path}")
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def verify(directory: str, mode: str = "quick") -> dict:
+    """manifest 와 파일이 맞으면 manifest 반환, 아니면 CheckpointError"""
+    if mode not in VERIFY_MODES:
+        raise ValueError(f"Unknown verify mode: {mode} (choose from {', '.join(VERIFY_MODES)})")
+    manifest = read_manifest(directory)
+    if mode == "off":
+        return manifest
+    for name, info in manifest["files"].items():
+        path = os.path.join(directory, name)
+        if not os.path.isfile(path):
+            raise CheckpointError(f"파일 없음: {path}")
+        if os.path.getsize(path) != info["size"]:
+            raise CheckpointError(f"크기 불일치: {path}")
+        if mode == "quick" and _quick_hash(path) != info["quick"]:
+            raise CheckpointError(f"해시 불일치: {path}")
+        if mode == "full" and _full_hash(path) != info["sha256"]:
+            raise CheckpointError(f"해시 불일치: {path}")
+    return manifest
+
+
+def resolve(model_id: str, quantize: str, root: Optional[str] = None, mode: Optional[str] = None) -> Optional[str]:
+    """
+    검증된 로컬 체크포인트 디렉터리, 없거나 검증에 실패하면 None.
+    manifest 의 모델 id / quantize 가 다르면 (디렉터리를 잘못 복사한 경우 등) 쓰지 않는다.
+    """
+    directory = checkpoint_path(model_id, quantize, root)
+    if not os.path.isdir(directory):
+        return None
+    started = time.monotonic()
+    try:
+        manifest = verify(directory, mode or VERIFY_MODE)
+    except (CheckpointError, OSError, ValueError) as e:
+        logger.warning(f"[체크포인트] {directory} 사용 안 함: {e}")
+        return None
+    if manifest.get("model_id") != model_id or manifest.get("quantize") != quantize:
+        logger.warning(f"[체크포인트] {directory} 사용 안 함: manifest 가 {model_id} ({quantize}) 와 다름")
+        return None
+    logger.info(f"[체크포인트] {directory} 확인 ({time.monotonic() - started:.2f}s)")
+    return directory
+
+
+# =========================
+# export
+# =========================
+def export(model_id: str, quantize: str = "nf4", kind: str = "causal", root: Optional[str] = None,
+           max_shard_size: str = "2GB") -> str:
+    """모델을 (양자화해서) 로딩한 뒤 safetensors + 토크나이저 + manifest 로 저장. 저장 경로 반환"""
+    if quantize not in QUANTIZE_MODES:
+        raise ValueError(f"Unknown quantize mode: {quantize} (choose from {', '.join(QUANTIZE_MODES)})")
+    if kind == "embedder" and quantize != "bf16":
+        raise ValueError("임베더는 bf16 으로만 export 합니다.")
+
+    import torch
+    from transformers import AutoModel, AutoModelForCausalLM, AutoTokenizer
+
+    out_dir = checkpoint_path(model_id, quantize, root)
+    tmp_dir = f"{out_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    try:
+        started = time.monotonic()
+        tokenizer = AutoTokenizer.from_pretrained(model_id, trust_remote_code=True)
+        model_cls = AutoModel if kind == "embedder" else AutoModelForCausalLM
+        if quantize == "nf4":
+            from llm.backends.hf import nf4_quantization_config
+
+            model = model_cls.from_pretrained(
+                model_id, quantization_config=nf4_quantization_config(), device_map="auto", trust_remote_code=True,
+            )
+        else:
+            model = model_cls.from_pretrained(
+                model_id, torch_dtype=torch.bfloat16, low_cpu_mem_usage=True, trust_remote_code=True,
+            )
+        print(f"[체크포인트] {model_id} 로딩/양자화 {time.monotonic() - started:.1f}s")
+
+        model.save_pretrained(tmp_dir, safe_serialization=True, max_shard_size=max_shard_size)
+        tokenizer.save_pretrained(tmp_dir)
+        write_manifest(tmp_dir, model_id, quantize, kind)
+
+        shutil.rmtree(out_dir, ignore_errors=True)
+        os.replace(tmp_dir, out_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    print(f"[체크포인트] 저장 완료: {out_dir}")
+    return out_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="미리 양자화한 로컬 체크포인트 export / 검증")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_export = sub.add_parser("export", help="모델을 양자화해 safetensors 로 저장")
+    p_export.add_argument("model_id")
+    p_export.add_argument("--quantize", choices=QUANTIZE_MODES, default="nf4")
+    p_export.add_argument("--kind", choices=("causal", "embedder"), default="causal")
+    p_export.add_argument("--root", default=None, help="기본값: LLM_CHECKPOINT_DIR")
+    p_export.add_argument("--max-shard-size", default="2GB")
+
+    p_verify = sub.add_parser("verify", help="체크포인트 디렉터리 무결성 확인")
+    p_verify.add_argument("directory")
+    p_verify.add_argument("--mode", choices=VERIFY_MODES, default="full")
+
+    args = parser.parse_args()
+    if args.command == "export":
+        quantize = "bf16" if args.kind == "embedder" else args.quantize
+        export(args.model_id, quantize=quantize, kind=args.kind, root=args.root, max_shard_size=args.max_shard_size)
+    else:
+        manifest = verify(args.directory, args.mode)
+        print(f"OK: {manifest['model_id']} ({manifest['quantize']}, 파일 {len(manifest['files'])}개)")
+
+
+if __name__ == "__main__":
+    main()
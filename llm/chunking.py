@@ -0,0 +1,47 @@
+# llm/chunking.py
+'''
+긴 민원 본문을 토큰 예산 안의 청크로 나누기 (map-reduce 요약용)
+
+- 문장 경계(. ! ? 뒤 공백, 줄바꿈)에서 자르고, 문장을 순서대로 채워 넣어 청크마다 budget 토큰 이하
+- 토큰 수는 전체를 한 번만 세고 문장별로는 글자 수 비율로 추정한다
+  (remote 백엔드는 count_tokens 가 HTTP 요청이라 문장마다 셀 수 없음) → 추정 오차를 margin 으로 흡수
+- 한 문장이 혼자 budget 을 넘으면 (줄바꿈 없는 붙여넣기 등) 글자 수로 잘라 나눈다
+'''
+
+import re
+from typing import List
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?。])\s+|\s*\n+\s*")
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_SPLIT.split(text) if s and s.strip()]
+
+
+def split(text: str, total_tokens: int, budget: int, margin: float = 0.9) -> List[str]:
+    """
+    text(전체 total_tokens 토큰)를 청크당 budget 토큰 이하로 나눈다. 이미 budget 이하면 [text].
+    """
+    text = text.strip()
+    if total_tokens <= budget or not text:
+        return [text]
+
+    tokens_per_char = total_tokens / len(text)
+    # 청크당 글자 수 한도 (토큰 추정 오차 여유 margin)
+    max_chars = max(1, int(budget * margin / tokens_per_char))
+
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for sentence in split_sentences(text):
+        pieces = [sentence[i:i + max_chars] for i in range(0, len(sentence), max_chars)]
+        for piece in pieces:
+            # 이어붙일 때 들어가는 공백 1글자 포함
+            if current and size + 1 + len(piece) > max_chars:
+                chunks.append(" ".join(current))
+                current, size = [], 0
+            size += len(piece) + (1 if current else 0)
+            current.append(piece)
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
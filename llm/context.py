@@ -0,0 +1,47 @@
+# llm/context.py
+'''
+LLM 요청 컨텍스트 (우선순위 클래스 + 요청한 사용자)
+
+라우트/워커에서 한 번 지정하면 그 안에서 부르는 summarize / generate_reply 등이
+llm_submit 까지 인자를 넘기지 않아도 같은 우선순위/사용자로 대기열에 들어간다.
+
+    with request_context(priority="bulk", user=current_user.user_uid):
+        generate_drafts(items)
+
+contextvars 기반이라 스레드/요청별로 분리된다. 단, StreamingResponse 의 제너레이터처럼
+yield 사이에 컨텍스트가 바뀌는 곳에서는 llm_submit(priority=..., user=...) 로 직접 넘긴다.
+'''
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, replace
+from typing import Optional
+
+from llm.fair_queue import DEFAULT_PRIORITY, check_priority
+
+
+@dataclass(frozen=True)
+class RequestContext:
+    priority: str = DEFAULT_PRIORITY
+    user: Optional[str] = None
+
+
+_current: ContextVar[RequestContext] = ContextVar("llm_request_context", default=RequestContext())
+
+
+def current() -> RequestContext:
+    return _current.get()
+
+
+@contextmanager
+def request_context(priority: Optional[str] = None, user: Optional[str] = None):
+    ctx = current()
+    if priority is not None:
+        ctx = replace(ctx, priority=check_priority(priority))
+    if user is not None:
+        ctx = replace(ctx, user=user)
+    token = _current.set(ctx)
+    try:
+        yield ctx
+    finally:
+        _current.reset(token)
@@ -0,0 +1,51 @@
+# llm/embedder.py
+'''
+RAG 임베딩 모델 (multilingual-e5-large-instruct) — ingest_permit.py / ingest_traffic.py 공용
+
+- 모델 레지스트리(llm.registry)에 "e5" 로 등록: 처음 encode 할 때 한 번만 로딩하고,
+  같은 프로세스의 다른 모델과 함께 메모리 예산 안에서 관리된다
+- python -m llm.checkpoint export <EMBED_MODEL> --kind embedder 로 만든 로컬 체크포인트가 있으면 그것을 읽음
+- e5 계열 권장 프리픽스: 문서는 "passage: ", 질의는 "query: "
+- 문장 벡터는 CLS 위치의 hidden state 를 L2 정규화한 값
+'''
+
+import os
+
+from llm import checkpoint
+from llm.registry import registry
+
+EMBED_MODEL = os.getenv("EMBED_MODEL", "intfloat/multilingual-e5-large-instruct")
+REGISTRY_NAME = "e5"
+
+
+def load_embedder():
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    print("임베딩 모델을 로딩합니다...")
+    source = checkpoint.resolve(EMBED_MODEL, "bf16") or EMBED_MODEL
+    tokenizer = AutoTokenizer.from_pretrained(source, trust_remote_code=True)
+    model = AutoModel.from_pretrained(
+        source, trust_remote_code=True, torch_dtype=torch.bfloat16, device_map="auto"
+    )
+    model.eval()
+    print("모델 로딩 완료.")
+    return tokenizer, model
+
+
+registry.register(REGISTRY_NAME, load=load_embedder)
+
+
+def encode_texts(texts, is_query=False):
+    import torch
+
+    if "e5" in EMBED_MODEL.lower():
+        texts = [(f"query: {t}" if is_query else f"passage: {t}") for t in texts]
+
+    with registry.use(REGISTRY_NAME) as (tokenizer, model):
+        x = tokenizer(texts, padding=True, truncation=True, return_tensors="pt").to(model.device)
+        with torch.no_grad():
+            y = model(**x)
+            vec = y.last_hidden_state[:, 0, :]  # CLS
+            vec = torch.nn.functional.normalize(vec, p=2, dim=1)
+    return vec.float().cpu().numpy()
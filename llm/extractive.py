@@ -0,0 +1,131 @@
+# llm/extractive.py
+'''
+LLM 프롬프트에 넣기 전 민원 본문 추출 압축 (LLM 없이, 순수 파이썬)
+
+민원 본문 토큰의 상당수는 인사말, 첨부파일 목록, 반복되는 법령 인용 같은 상투 문장이다.
+예산(budget 토큰)을 넘는 본문만 다음 순서로 줄인다.
+
+1. 문장 분리 (llm.chunking.split_sentences) 후 상투 문장(인사말 / 첨부파일)과 중복 문장 제거
+2. 글자 bigram TF-IDF 벡터의 코사인 유사도 그래프로 TextRank 점수 (다른 문장과 많이 겹치는 = 중심 내용)
+   + 앞 문장 가산점 (민원은 첫 문장에 요지가 오는 경우가 많음)
+3. 점수 순으로 예산이 찰 때까지 고르되, 이미 고른 문장과 거의 같은 문장(반복 인용)은 건너뜀
+4. 고른 문장을 원래 순서대로 이어붙임
+
+토큰 수는 전체를 한 번만 세고 문장별로는 글자 수 비율로 추정한다 (llm.chunking 과 같은 방식).
+어떤 프롬프트(short / long / reply)에 쓸지는 llm.infer 의 LLM_EXTRACTIVE_MODES 로 정한다.
+효과 측정: python -m llm.bench_extractive
+'''
+
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional
+
+from llm.chunking import split_sentences
+
+_NON_WORD = re.compile(r"[^0-9A-Za-z가-힣]")
+_BOILERPLATE = (
+    re.compile(r"^(안녕하(세요|십니까)|수고(하십니다|하세요|많으십니다)|감사합니다|고맙습니다)[\s.!~^]*$"),
+    re.compile(r"첨부\s*파일"),
+    re.compile(r"\.(jpe?g|png|gif|bmp|pdf|hwpx?|docx?|xlsx?|zip)$", re.IGNORECASE),
+)
+# 앞 문장 가산점 (첫 문장 LEAD_BONUS, 이후 문장마다 절반씩)
+LEAD_BONUS = 0.3
+# 이미 고른 문장과 코사인 유사도가 이 이상이면 반복으로 보고 건너뜀
+DUPLICATE_SIMILARITY = 0.8
+# 문장이 너무 많으면 (붙여넣은 법령 전문 등) 앞에서부터 이만큼만 순위를 매긴다
+MAX_SENTENCES = 300
+
+
+def is_boilerplate(sentence: str) -> bool:
+    return any(pattern.search(sentence) for pattern in _BOILERPLATE)
+
+
+def _bigrams(sentence: str) -> Counter:
+    text = _NON_WORD.sub("", sentence)
+    return Counter(text[i:i + 2] for i in range(len(text) - 1))
+
+
+def _tfidf(sentences: List[str]) -> List[Dict[str, float]]:
+    counts = [_bigrams(s) for s in sentences]
+    df = Counter(gram for c in counts for gram in c)
+    n = len(sentences)
+    vectors = []
+    for c in counts:
+        vec = {gram: tf * (math.log((1 + n) / (1 + df[gram])) + 1) for gram, tf in c.items()}
+        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        vectors.append({gram: v / norm for gram, v in vec.items()})
+    return vectors
+
+
+def _cosine(a: Dict[str, float], b: Dict[str, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(gram, 0.0) for gram, v in a.items())
+
+
+def textrank(sentences: List[str], damping: float = 0.85, iterations: int = 30) -> List[float]:
+    """문장별 중요도 (TF-IDF 코사인 유사도 그래프의 PageRank + 앞 문장 가산점)"""
+    n = len(sentences)
+    if n == 0:
+        return []
+    vectors = _tfidf(sentences)
+    sim = [[_cosine(vectors[i], vectors[j]) if i != j else 0.0 for j in range(n)] for i in range(n)]
+    out_weight = [sum(row) or 1.0 for row in sim]
+
+    scores = [1.0 / n] * n
+    for _ in range(iterations):
+        updated = [
+            (1 - damping) / n + damping * sum(sim[j][i] * scores[j] / out_weight[j] for j in range(n))
+            for i in range(n)
+        ]
+        converged = max(abs(u - s) for u, s in zip(updated, scores)) < 1e-6
+        scores = updated
+        if converged:
+            break
+
+    mean = sum(scores) / n
+    return [s / mean * (1 + LEAD_BONUS / (2 ** i)) for i, s in enumerate(scores)]
+
+
+def compress(text: str, budget: int, total_tokens: Optional[int] = None, margin: float = 0.95) -> str:
+    """
+    text 를 budget 토큰 이하로 줄인 추출 요약. 이미 예산 안이면 그대로 반환.
+    total_tokens: text 의 토큰 수 (모르면 글자 수로 추정), margin: 문장별 토큰 추정 오차 여유
+    """
+    text = text.strip()
+    total_tokens = len(text) if total_tokens is None else total_tokens
+    if budget <= 0 or total_tokens <= budget or not text:
+        return text
+    tokens_per_char = total_tokens / len(text)
+
+    seen = set()
+    sentences = []
+    for sentence in split_sentences(text):
+        key = _NON_WORD.sub("", sentence)
+        if not key or key in seen or is_boilerplate(sentence):
+            continue
+        seen.add(key)
+        sentences.append(sentence)
+    sentences = sentences[:MAX_SENTENCES]
+    if not sentences:
+        return text
+
+    scores = textrank(sentences)
+    vectors = _tfidf(sentences)
+    chosen: List[int] = []
+    used = 0.0
+    limit = budget * margin
+    for i in sorted(range(len(sentences)), key=lambda k: -scores[k]):
+        cost = (len(sentences[i]) + 1) * tokens_per_char
+        if used + cost > limit:
+            continue
+        if any(_cosine(vectors[i], vectors[j]) >= DUPLICATE_SIMILARITY for j in chosen):
+            continue
+        chosen.append(i)
+        used += cost
+
+    if not chosen:
+        # 첫 문장 하나도 예산을 넘으면 예산만큼 앞부분을 자른다
+        return sentences[0][:max(1, int(budget / tokens_per_char))]
+    return "\n".join(sentences[i] for i in sorted(chosen))
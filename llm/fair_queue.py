@@ -0,0 +1,138 @@
+# llm/fair_queue.py
+'''
+우선순위 + 사용자별 공정 분배 대기열
+
+- 우선순위 클래스: interactive(단건 답변/요약) > bulk(일괄 생성) > backfill(백그라운드 채우기)
+  높은 클래스에 대기 중인 요청이 있으면 항상 먼저 꺼낸다
+- 같은 클래스 안에서는 사용자(user_uid)별로 돌아가며 하나씩 꺼낸다 (round-robin)
+  → 한 사용자가 500건을 넣어도 다른 사용자의 요청은 최대 (사용자 수) 번째 안에 나간다
+- 같은 사용자 안에서는 FIFO
+- queue.Queue 처럼 get(timeout) / get_nowait() 가 비어 있으면 queue.Empty 를 올린다
+- get_nowait(fits=...) 는 다음 차례 항목을 꺼내기 전에 확인해, 맞지 않으면 꺼내지 않고 queue.Empty
+  (순서는 그대로 — 다음에 다시 꺼낼 때 같은 항목이 먼저 나온다)
+'''
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Iterable, Optional
+
+PRIORITIES = ("interactive", "bulk", "backfill")
+DEFAULT_PRIORITY = "interactive"
+ANONYMOUS = ""
+
+
+def check_priority(priority: str) -> str:
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority: {priority} (choose from {', '.join(PRIORITIES)})")
+    return priority
+
+
+class FairQueue:
+    def __init__(self):
+        self._cond = threading.Condition()
+        # 클래스 → (사용자 → [(넣은 시각, item)]) — OrderedDict 의 순서가 round-robin 순서
+        self._classes: Dict[str, "OrderedDict[str, deque]"] = {p: OrderedDict() for p in PRIORITIES}
+        self._depth = {p: 0 for p in PRIORITIES}
+
+    def put(self, item, priority: str = DEFAULT_PRIORITY, user: Optional[str] = None):
+        check_priority(priority)
+        with self._cond:
+            users = self._classes[priority]
+            users.setdefault(user or ANONYMOUS, deque()).append((time.monotonic(), item))
+            self._depth[priority] += 1
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None, priorities: Optional[Iterable[str]] = None):
+        """priorities 를 주면 그 클래스들에서만 꺼낸다 (예: 예약 슬롯은 interactive 만)"""
+        allowed = tuple(priorities or PRIORITIES)
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._available(allowed), timeout=timeout):
+                raise queue.Empty
+            return self._pop(allowed)
+
+    def get_nowait(self, priorities: Optional[Iterable[str]] = None,
+                   fits: Optional[Callable[[Any, str], bool]] = None):
+        """fits(item, priority) 가 False 면 다음 차례 항목을 대기열에 그대로 두고 queue.Empty"""
+        allowed = tuple(priorities or PRIORITIES)
+        with self._cond:
+            if not self._available(allowed):
+                raise queue.Empty
+            return self._pop(allowed, fits)
+
+    def _available(self, allowed) -> bool:
+        return any(self._depth[p] for p in allowed)
+
+    def _pop(self, allowed, fits=None):
+        for priority in PRIORITIES:
+            if priority not in allowed or not self._depth[priority]:
+                continue
+            users = self._classes[priority]
+            user, items = next(iter(users.items()))
+            if fits is not None and not fits(items[0][1], priority):
+                raise queue.Empty
+            _, item = items.popleft()
+            if items:
+                users.move_to_end(user)   # 다음 차례는 다른 사용자
+            else:
+                del users[user]
+            self._depth[priority] -= 1
+            return item
+        raise queue.Empty
+
+    def depth(self) -> Dict[str, int]:
+        with self._cond:
+            return dict(self._depth)
+
+    def stats(self) -> Dict[str, dict]:
+        """클래스별 대기 수 / 대기 사용자 수 / 가장 오래 기다린 요청의 대기 시간(초)"""
+        now = time.monotonic()
+        with self._cond:
+            result = {}
+            for priority, users in self._classes.items():
+                oldest = min((items[0][0] for items in users.values()), default=None)
+                result[priority] = {
+                    "depth": self._depth[priority],
+                    "users": len(users),
+                    "oldest_wait_seconds": round(now - oldest, 3) if oldest is not None else 0.0,
+                }
+            return result
+
+
+class FairExecutor:
+    """
+    FairQueue 순서로 작업을 꺼내 실행하는 스레드 풀 (ThreadPoolExecutor 대신 사용)
+    HTTP/fake 백엔드처럼 배치 스케줄러가 없는 백엔드도 같은 우선순위/공정 분배를 따르게 한다.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str = "llm-worker"):
+        self._queue = FairQueue()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"{thread_name_prefix}-{i}", daemon=True)
+            for i in range(max_workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, fn, *args, priority: str = DEFAULT_PRIORITY, user: Optional[str] = None) -> Future:
+        future = Future()
+        self._queue.put((future, fn, args), priority, user)
+        return future
+
+    def _work(self):
+        while True:
+            future, fn, args = self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def stats(self) -> Dict[str, dict]:
+        return self._queue.stats()
+
+    def depth(self) -> Dict[str, int]:
+        return self._queue.depth()
@@ -1,202 +1,869 @@
 import datetime as dt
-from typing import List, Literal
-
-import torch
-from transformers import (
-    AutoModelForCausalLM,
-    AutoTokenizer,
-    BitsAndBytesConfig,
-    StoppingCriteria,
-    StoppingCriteriaList,
-)
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Literal, Optional, Tuple
+
+from llm import cascade, chunking, extractive, lora, metrics
+from llm.backends import LLMBackend, create_backend
+from llm.backends.hf import HFBackend
+from llm.cache import ResultCache, make_key, template_version
+from llm.cancellation import CancelToken
+from llm.context import current as current_request_context
+from llm.registry import registry
+
+logger = logging.getLogger(__name__)
+
+# torch / transformers 는 load_model() 안에서 import 한다.
+# (이 모듈을 import 하는 API 서버가 모델 로딩을 기다리지 않고 바로 뜰 수 있도록)
 
 # =========================
 # 0) 전역 설정
 # =========================
 BASE_MODEL = "kakaocorp/kanana-1.5-8b-instruct-2505"
+STOP_WORDS = ["끝.", "end."]
+# 짧은 요약은 첫 줄만 쓰므로 줄바꿈에서도 생성을 멈춤
+SHORT_STOP_WORDS = STOP_WORDS + ["\n"]
+
+# 동시에 디코딩할 최대 시퀀스 수 (continuous batching)
+MAX_BATCH_SIZE = int(os.getenv("LLM_MAX_BATCH_SIZE", "8"))
+# 배치 자리 중 interactive(단건 답변/요약) 요청 전용으로 남겨 둘 수
+# → 일괄 생성(bulk)이 배치를 채우고 있어도 단건 요청은 다음 디코드 스텝에 합류
+INTERACTIVE_RESERVED_SLOTS = int(os.getenv("LLM_INTERACTIVE_RESERVED_SLOTS", "1"))
+# GPU 여유 메모리가 이 값(MB)보다 적으면 새 시퀀스를 배치에 합류시키지 않음 (0 이면 확인 안 함)
+MIN_FREE_GPU_MB = float(os.getenv("LLM_MIN_FREE_GPU_MB", "0"))
 
-print("LLM 로딩 중...")
+# Assisted decoding: 작은 초안 모델이 토큰을 제안하고 Kanana 가 검증 (같은 토크나이저 필요)
+# LLM_ASSISTED_MODES 에 적용할 모드를 쉼표로 지정 (short,long,reply). 비어 있으면 사용 안 함
+ASSISTANT_MODEL = os.getenv("LLM_ASSISTANT_MODEL", "kakaocorp/kanana-1.5-2.1b-instruct-2505")
+ASSISTED_MODES = {m.strip() for m in os.getenv("LLM_ASSISTED_MODES", "").split(",") if m.strip()}
 
-llm_tok = AutoTokenizer.from_pretrained(BASE_MODEL, trust_remote_code=True)
-if llm_tok.eos_token is None:
-    llm_tok.eos_token = "</s>"
-if llm_tok.pad_token is None:
-    llm_tok.pad_token = llm_tok.eos_token
+# 부서별 답변 문체 LoRA 어댑터: "이름=경로" 를 쉼표로. 예: "traffic=/models/lora/traffic,permit=/models/lora/permit"
+# 4bit Kanana 하나 위에 모두 얹고 요청마다 adapter 로 고른다 (어댑터가 다른 요청도 같은 배치로 디코딩)
+# 실행 중에는 load_adapter / unload_adapter 로 추가/교체/해제. 결과 캐시는 어댑터 이름별로 나뉘므로
+# 같은 이름으로 가중치를 바꿀 때는 이름에 버전을 붙인다 (예: traffic-v2)
+LORA_ADAPTERS = lora.parse_adapters(os.getenv("LLM_LORA_ADAPTERS", ""))
+# 실행 중 로딩(load_adapter)은 이 디렉터리 아래의 safetensors 어댑터만 (설정하지 않으면 실행 중 로딩 불가)
+ADAPTER_DIR = os.getenv("LLM_ADAPTER_DIR") or None
 
-bnb_config = BitsAndBytesConfig(
-    load_in_4bit=True,
-    bnb_4bit_quant_type="nf4",
-    bnb_4bit_use_double_quant=True,
-    bnb_4bit_compute_dtype=torch.bfloat16,
+# 요약 cascade: LLM_SMALL_MODEL_MODES 에 있는 모드(short / long)는 작은 모델로 먼저 생성하고
+# 검증(llm.cascade)을 통과하지 못한 것만 Kanana 로 다시 생성 → Kanana 배치 자리는 답변 초안에 쓴다
+# 작은 모델은 app/services/llm_service.py 의 polyglot 체크포인트가 기본. 백엔드는 hf(GPU 4bit) / cpu / fake
+SMALL_MODEL = os.getenv("LLM_SMALL_MODEL", "./app/models/polyglot_base")
+SMALL_BACKEND = os.getenv("LLM_SMALL_BACKEND", "hf")
+SMALL_MODEL_MODES = {m.strip() for m in os.getenv("LLM_SMALL_MODEL_MODES", "").split(",") if m.strip()}
+
+# 요약 입력 토큰 예산: 민원 본문이 이보다 길면 문장 경계에서 청크로 나눠 청크별 긴 요약을 한 번에 제출하고(map)
+# 부분 요약을 이어붙인 것을 다시 요약(reduce) → 본문 길이와 관계없이 요청당 prefill 길이 / KV cache 가 일정
+# 0 이면 나누지 않음 (스케줄러 토크나이저의 truncation 에 맡김)
+SUMMARY_INPUT_TOKENS = int(os.getenv("LLM_SUMMARY_INPUT_TOKENS", "1536"))
+# 부분 요약을 이어붙여도 예산을 넘으면 다시 map-reduce 하는 최대 단계
+SUMMARY_MAX_REDUCE_DEPTH = 3
+
+# 추출 압축 (llm.extractive): LLM_EXTRACTIVE_MODES 에 있는 프롬프트(short,long,reply)는 민원 본문이
+# LLM_EXTRACTIVE_TOKENS 를 넘으면 인사말 / 첨부파일 / 반복 인용을 걷어내고 중요한 문장만 남겨 넣는다 (prefill 절감)
+# 비어 있으면 사용 안 함. 효과 측정: python -m llm.bench_extractive
+EXTRACTIVE_MODES = {m.strip() for m in os.getenv("LLM_EXTRACTIVE_MODES", "").split(",") if m.strip()}
+EXTRACTIVE_TOKENS = int(os.getenv("LLM_EXTRACTIVE_TOKENS", "512"))
+
+# 답변 후보 (generate_reply_candidates): 기본 후보 수 / 최대 / 샘플링 온도 (후보끼리 달라지도록 기본 답변보다 높게)
+REPLY_CANDIDATES = int(os.getenv("LLM_REPLY_CANDIDATES", "3"))
+REPLY_CANDIDATES_MAX = int(os.getenv("LLM_REPLY_CANDIDATES_MAX", "5"))
+REPLY_CANDIDATE_TEMPERATURE = float(os.getenv("LLM_REPLY_CANDIDATE_TEMPERATURE", "0.8"))
+
+# 같은 입력 → 같은 결과를 재사용하는 결과 캐시 (메모리 LRU + 공유 저장소)
+result_cache = ResultCache(
+    max_entries=int(os.getenv("LLM_CACHE_MEMORY_SIZE", "1024")),
+    max_age_seconds=float(os.getenv("LLM_CACHE_MAX_AGE_HOURS", "720")) * 3600,
+    enabled=os.getenv("LLM_CACHE_ENABLED", "1") != "0",
 )
 
-llm = AutoModelForCausalLM.from_pretrained(
-    BASE_MODEL,
-    quantization_config=bnb_config,
-    device_map="auto",
-    trust_remote_code=True,
+# -------------------------
+# 프롬프트 고정 앞부분 (지침 블록)
+# 매 요청마다 동일하므로 스케줄러가 KV cache 를 한 번만 계산해 재사용한다.
+# 반드시 줄바꿈으로 끝나야 뒤에 붙는 민원 본문과 토큰 경계가 섞이지 않는다.
+# -------------------------
+SHORT_PROMPT_PREFIX = """
+당신은 민원 내용을 '핵심 주제'로만 요약하는 AI입니다.
+
+[지침]
+- 반드시 민원의 핵심 사안을 요약하십시오.
+- 지역명이나 도로명이 있다면 포함하십시오.
+- 가능한 한 짧은 명사구(문장 X)로 작성하십시오.
+- 불필요한 수식어는 제거하고, 핵심 사건/대상 위주로 표현하십시오.
+- 예: "화명1동 불법주차", "신호등 고장", "도로 파손", "옥외광고물 위반 현수막"
+- 설명 문장, 접속사, 존댓말 문장은 쓰지 마십시오.
+- 마지막에 반드시 '끝.'으로 마무리하십시오.
+
+[입력 민원]
+"""
+
+LONG_PROMPT_PREFIX = """
+당신은 공공 민원 내용을 행정문서체로 요약하는 AI입니다.
+
+[지침]
+- 아래 민원 내용을 2~4문장으로 요약하십시오.
+- 핵심 배경, 요청 사항, 관련 법/제도 쟁점을 포함해 간결히 정리하십시오.
+- 문체는 공공기관 행정문서체(서술형 존댓말)를 사용하십시오.
+- 목록, 번호, 불릿 없이 일반 문장만 작성하십시오.
+- 마지막 문장은 반드시 '끝.'으로 마무리하십시오.
+
+[입력 민원]
+"""
+
+REPLY_PROMPT_PREFIX = """
+당신은 공공기관 민원 답변을 작성하는 AI입니다.
+이 서비스를 사용하는 사람은 민원공무원입니다.
+공무원이 민원 내용을 토대로 [답변에 들어갈 주요내용]을 작성합니다.
+당신은 공무원이 작성한 [답변에 들어갈 주요내용]을 기반으로 아래 지침에 따라 공무원 스타일의 답변을 생성합니다.
+
+
+[지침]
+- 확실하지 않은 내용은 기술하지 마십시오.
+- 문체는 공공기관 행정문서체(존댓말 서술형)를 사용하십시오.
+- 전체 구조는 다음 세 부분으로만 구성하십시오.
+  1. 민원 요지 확인 (1~2문장)
+  2. 확인된 사실 및 안내 (2~5문장)
+- 숫자 "1. 2. 3." 같은 번호는 실제로 쓰지 말고 문단만 나누지 말고 자연스러운 한 문단으로 이어서 작성하십시오.
+- 마지막 문장은 반드시 '끝.' 또는 'end.' 로 마무리하고 그 이후에는 아무 것도 출력하지 마십시오.
+
+[민원 내용]
+"""
+
+# 백엔드 선택 (hf | cpu | ollama | remote | fake) — llm/backends 참고
+# API 워커를 여러 개 띄울 때는 모델 서버(python -m llm.server)를 따로 두고 remote 로 연결
+BACKEND = os.getenv("LLM_BACKEND", "hf")
+# 모드별로 다른 백엔드를 쓸 때 "모드=백엔드" 를 쉼표로 지정. 예: "short=cpu,long=cpu"
+# (요약은 CPU 노드에서, 답변은 GPU 에서) 지정하지 않은 모드는 LLM_BACKEND 를 쓴다
+MODE_BACKENDS = dict(
+    item.strip().split("=", 1)
+    for item in os.getenv("LLM_MODE_BACKENDS", "").split(",")
+    if "=" in item
 )
-llm.eval()
 
-print("모델 로딩 완료.")
+
+def _build_backend(name: str) -> LLMBackend:
+    if name == "hf":
+        return create_backend(
+            "hf",
+            model_id=BASE_MODEL,
+            max_batch_size=MAX_BATCH_SIZE,
+            assistant_model=ASSISTANT_MODEL,
+            assisted_modes=ASSISTED_MODES,
+            reserved_slots=INTERACTIVE_RESERVED_SLOTS,
+            min_free_memory=int(MIN_FREE_GPU_MB * 1024 * 1024),
+            adapters=LORA_ADAPTERS,
+        )
+    if name == "cpu":
+        num_threads = os.getenv("LLM_CPU_THREADS")
+        return create_backend(
+            "cpu",
+            model_id=os.getenv("LLM_CPU_MODEL", BASE_MODEL),
+            max_batch_size=int(os.getenv("LLM_CPU_MAX_BATCH_SIZE", "4")),
+            quantize=os.getenv("LLM_CPU_QUANTIZE", "int8"),
+            num_threads=int(num_threads) if num_threads else None,
+            reserved_slots=INTERACTIVE_RESERVED_SLOTS,
+        )
+    if name == "ollama":
+        return create_backend(
+            "ollama",
+            model=os.getenv("LLM_OLLAMA_MODEL", "kanana-1.5-8b-instruct"),
+            base_url=os.getenv("LLM_OLLAMA_URL", "http://localhost:11434"),
+            max_concurrency=MAX_BATCH_SIZE,
+            raw=True,
+            tokenizer=os.getenv("LLM_OLLAMA_TOKENIZER", BASE_MODEL),
+        )
+    if name == "remote":
+        return create_backend(
+            "remote",
+            model_id=os.getenv("LLM_REMOTE_MODEL_ID", BASE_MODEL),
+            base_url=os.getenv("LLM_SERVER_URL", "http://127.0.0.1:8100"),
+            timeout=float(os.getenv("LLM_REMOTE_TIMEOUT", "300")),
+        )
+    if name == "fake":
+        return create_backend(
+            "fake",
+            latency=float(os.getenv("LLM_FAKE_LATENCY_MS", "0")) / 1000,
+            token_latency=float(os.getenv("LLM_FAKE_TOKEN_MS", "0")) / 1000,
+            max_concurrency=MAX_BATCH_SIZE,
+        )
+    if name == "small":
+        if SMALL_BACKEND == "fake":
+            small = create_backend("fake", model_id=SMALL_MODEL, max_concurrency=MAX_BATCH_SIZE)
+        else:
+            small = create_backend(
+                SMALL_BACKEND,
+                model_id=SMALL_MODEL,
+                max_batch_size=MAX_BATCH_SIZE,
+                reserved_slots=INTERACTIVE_RESERVED_SLOTS,
+            )
+        small.name = "small"   # 텔레메트리 backend 라벨 (Kanana 와 구분)
+        return small
+    return create_backend(name)   # 알 수 없는 이름이면 ValueError
+
+
+# 생성만 하고 로딩은 load_model() 에서 (torch 등은 이때 import)
+backends: Dict[str, LLMBackend] = {
+    name: _build_backend(name) for name in sorted({BACKEND, *MODE_BACKENDS.values()})
+}
+if SMALL_MODEL_MODES:
+    backends["small"] = _build_backend("small")
+backend = backends[BACKEND]
+
+
+# 백엔드 로딩/해제는 모델 레지스트리가 관리 (메모리 예산 초과 시 유휴 모델부터 해제, 다음 사용 때 다시 로딩)
+# 모드에 라우팅되는 백엔드(Kanana 등)는 pinned: model_loader 가 준비 완료로 보고하는 모델이므로
+# 해제하면 /readyz 는 그대로인데 다음 요청이 요청 스레드에서 몇 분씩 다시 로딩하게 된다.
+# 해제 대상은 보조 모델(작은 요약 모델 등)뿐
+PRIMARY_BACKENDS = {BACKEND, *MODE_BACKENDS.values()}
+
+
+def _registry_name(name: str) -> str:
+    return f"llm:{name}"
+
+
+def _load_backend(b: LLMBackend) -> LLMBackend:
+    b.load()
+    return b
+
+
+for _name, _b in backends.items():
+    registry.register(_registry_name(_name), load=lambda b=_b: _load_backend(b), unload=LLMBackend.unload,
+                      pinned=_name in PRIMARY_BACKENDS)
+
+
+def backend_for(mode: Optional[str]) -> LLMBackend:
+    """모드의 백엔드 객체 (로딩 여부와 무관, 설정 조회용). 생성에는 acquire_backend / use_backend 를 쓴다"""
+    return backends[MODE_BACKENDS.get(mode or "", BACKEND)]
+
+
+def acquire_backend(mode: Optional[str]) -> Tuple[LLMBackend, Callable[[], None]]:
+    """(백엔드, release). 필요하면 로딩하고, release() 전까지는 레지스트리가 해제하지 않는다"""
+    return registry.acquire(_registry_name(MODE_BACKENDS.get(mode or "", BACKEND)))
+
+
+def use_backend(mode: Optional[str]):
+    """with use_backend(mode) as b: ... — acquire_backend 의 컨텍스트 버전"""
+    return registry.use(_registry_name(MODE_BACKENDS.get(mode or "", BACKEND)))
+
+
+def submit_to_backend(mode: Optional[str], prompt: str, backend_name: Optional[str] = None,
+                      num_return_sequences: int = 1, **params) -> Future:
+    """
+    모드의 백엔드(backend_name 을 주면 그 백엔드)에 submit.
+    num_return_sequences > 1 이면 submit_n (Future 결과는 후보 목록)
+    Future 가 끝날 때까지 그 백엔드는 사용 중으로 표시된다
+    """
+    b, release = registry.acquire(_registry_name(backend_name or MODE_BACKENDS.get(mode or "", BACKEND)))
+    try:
+        if num_return_sequences > 1:
+            future = b.submit_n(prompt, num_return_sequences, mode=mode, **params)
+        else:
+            future = b.submit(prompt, mode=mode, **params)
+    except BaseException:
+        release()
+        raise
+    future.add_done_callback(lambda f: release())
+    return future
+
+
+def model_id_for(mode: Optional[str], adapter: Optional[str] = None) -> str:
+    """결과 캐시 키에 쓰는 모델 id (모드별 백엔드 기준, 어댑터를 쓰면 어댑터 이름까지)"""
+    model_id = backend_for(mode).model_id
+    return f"{model_id}+lora:{adapter}" if adapter else model_id
+
+
+def list_adapters(mode: Optional[str] = "reply") -> List[str]:
+    """모드의 백엔드에서 쓸 수 있는 LoRA 어댑터 이름"""
+    return backend_for(mode).adapters()
+
+
+def load_adapter(name: str, path: Optional[str] = None, mode: Optional[str] = "reply"):
+    """
+    LoRA 어댑터를 얹는다 (같은 이름이면 교체). 모델이 아직 안 올라가 있으면 로딩할 때 함께 얹는다
+    path 는 LLM_ADAPTER_DIR 기준 상대 경로 (없으면 name). 밖을 가리키면 ValueError
+    remote 백엔드는 모델 서버가 자기 LLM_ADAPTER_DIR 기준으로 확인하므로 그대로 넘긴다
+    """
+    b = backend_for(mode)
+    if b.name == "remote":
+        lora.check_name(name)
+        b.load_adapter(name, path or name)
+        return
+    b.load_adapter(name, lora.resolve_path(ADAPTER_DIR, name, path))
+
+
+def unload_adapter(name: str, mode: Optional[str] = "reply"):
+    """그 어댑터로 진행 중인 요청이 끝나면 내린다. 없는 이름이면 KeyError"""
+    backend_for(mode).unload_adapter(name)
 
 
 # =========================
-# 1) StoppingCriteria: '끝.'에서 강제 종료
+# 1) 모델 로딩 / 워밍업
 # =========================
-class StopOnAnyStopWords(StoppingCriteria):
-    """
-    stop_words 안의 어느 문자열이라도 출력되면 즉시 중단.
-    예: ["끝.", "end."]
-    """
-    def __init__(self, tokenizer, stop_words: List[str]):
-        self.stop_ids_list = []
-        for w in stop_words:
-            ids = tokenizer(
-                w,
-                add_special_tokens=False,
-                return_tensors="pt"
-            ).input_ids[0].tolist()
-            self.stop_ids_list.append(ids)
-
-    def __call__(self, input_ids, scores, **kwargs):
-        # input_ids: (batch, seq_len)
-        generated = input_ids[0].tolist()
-        for stop_ids in self.stop_ids_list:
-            n = len(stop_ids)
-            if n <= len(generated) and generated[-n:] == stop_ids:
-                return True
-        return False
+def is_loaded() -> bool:
+    return all(b.is_loaded() for b in backends.values())
+
+
+def load_model():
+    """
+    사용하는 백엔드를 모두 준비한다 (hf: Kanana 4bit 로딩 + 배치 스케줄러 시작).
+    여러 번 호출되어도 한 번만 로딩한다. 로딩은 모델 레지스트리를 거친다 (footprint 기록).
+    """
+    for name in backends:
+        registry.load(_registry_name(name))
+
+
+def assisted_stats() -> dict:
+    """모드별 assisted decoding 수락률 통계"""
+    hf = backends.get("hf")
+    if isinstance(hf, HFBackend):
+        return hf.assisted_stats()
+    return {"enabled_modes": [], "draft_model": None, "modes": {}}
+
+
+def backend_stats() -> dict:
+    """모드 → 백엔드 라우팅과 백엔드별 상태"""
+    return {
+        "default": BACKEND,
+        "modes": {mode: MODE_BACKENDS.get(mode, BACKEND) for mode in ("short", "long", "reply")},
+        "small_model_modes": sorted(SMALL_MODEL_MODES),
+        "backends": {name: b.stats() for name, b in backends.items()},
+    }
+
+
+def warm_up():
+    """
+    CUDA 커널 / 메모리 풀을 미리 데워두기 위한 짧은 생성 1회 (백엔드마다).
+    """
+    for name in backends:
+        with registry.use(_registry_name(name)) as b:
+            b.generate("안녕하세요.\n\n### Response:\n", max_new_tokens=8, temperature=0.3, stop_words=STOP_WORDS)
 
 
 # =========================
 # 2) 공통 LLM 호출 유틸
 # =========================
+def llm_submit(
+    prompt: str,
+    max_new_tokens: int = 400,
+    temperature: float = 0.7,
+    stop_words: List[str] = STOP_WORDS,
+    prefix: Optional[str] = None,
+    mode: Optional[str] = None,
+    priority: Optional[str] = None,
+    user: Optional[str] = None,
+    adapter: Optional[str] = None,
+    backend_name: Optional[str] = None,
+    cancel: Optional[CancelToken] = None,
+    num_return_sequences: int = 1,
+) -> Future:
+    """
+    백엔드에 생성 요청만 넣고 바로 Future 를 반환 (결과는 후처리 전 원문).
+    num_return_sequences > 1 이면 같은 프롬프트의 후보 목록 (hf 는 prefill 한 번으로 함께 디코딩).
+    여러 프롬프트를 연달아 submit 하면 같은 배치에서 함께 디코딩된다.
+    prefix 가 주어지면 prompt 는 prefix 로 시작해야 하며, prefix 부분의 KV cache 를 재사용한다.
+    mode 가 ASSISTED_MODES 에 있으면 assisted decoding 으로 (호출 스레드에서) 생성한다.
+    priority / user 를 주지 않으면 llm.context.request_context() 로 지정한 값을 쓴다.
+    adapter 를 주면 그 LoRA 어댑터로 생성한다 (로딩되지 않은 이름이면 ValueError).
+    backend_name 을 주면 모드 라우팅 대신 그 백엔드로 보낸다 (요약 cascade 의 "small").
+    cancel 토큰이 취소되면 다음 디코드 스텝에서 멈추고 Future 는 GenerationCancelled (이미 취소됐으면 바로 예외).
+    """
+    if cancel is not None:
+        cancel.raise_if_cancelled()
+    ctx = current_request_context()
+    return submit_to_backend(
+        mode,
+        prompt,
+        backend_name=backend_name,
+        max_new_tokens=max_new_tokens,
+        temperature=temperature,
+        top_p=0.9,
+        repetition_penalty=1.3,
+        stop_words=stop_words,
+        prefix=prefix,
+        priority=priority or ctx.priority,
+        user=user or ctx.user,
+        adapter=adapter,
+        cancel=cancel,
+        num_return_sequences=num_return_sequences,
+    )
+
+
 def llm_generate(
     prompt: str,
     max_new_tokens: int = 400,
     temperature: float = 0.7,
+    stop_words: List[str] = STOP_WORDS,
+    prefix: Optional[str] = None,
+    mode: Optional[str] = None,
+    adapter: Optional[str] = None,
+    cancel: Optional[CancelToken] = None,
 ) -> str:
     """
     LLM 호출 후 '### Response:' 뒤만 잘라서 반환.
     '끝.' 또는 'end.'가 등장하면 즉시 중단하고,
     해당 단어 자체도 최종 결과에서 제거한다.
     """
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    inputs = llm_tok(
+    # 실제 디코딩은 백엔드가 (hf 면 다른 요청들과 함께 배치로) 수행
+    full_text = llm_submit(
         prompt,
-        return_tensors="pt",
-        padding=True,
-        truncation=True
-    ).to(device)
-
-    stopping_criteria = StoppingCriteriaList([
-        StopOnAnyStopWords(llm_tok, stop_words=["끝.", "end."])
-    ])
-
-    with torch.no_grad():
-        outputs = llm.generate(
-            **inputs,
-            max_new_tokens=max_new_tokens,
-            do_sample=True,
-            temperature=temperature,
-            top_p=0.9,
-            repetition_penalty=1.3,
-            eos_token_id=llm_tok.eos_token_id,
-            pad_token_id=llm_tok.pad_token_id,
-            stopping_criteria=stopping_criteria,
-        )
+        max_new_tokens=max_new_tokens,
+        temperature=temperature,
+        stop_words=stop_words,
+        prefix=prefix,
+        mode=mode,
+        adapter=adapter,
+        cancel=cancel,
+    ).result()
+
+    return _clean_output(full_text, final=True)[0]
 
-    full_text = llm_tok.decode(outputs[0], skip_special_tokens=True)
 
+def _clean_output(text: str, final: bool) -> Tuple[str, bool]:
+    """
+    생성 텍스트 후처리. (정리된 텍스트, 종료 마커 등장 여부) 반환.
+    final=False(스트리밍 중)이면 종료 마커의 앞부분일 수 있는 꼬리는 아직 내보내지 않는다.
+    """
     # "### Response:" 이후만 사용
-    if "### Response:" in full_text:
-        result = full_text.split("### Response:")[-1].strip()
+    if "### Response:" in text:
+        result = text.split("### Response:")[-1].strip()
     else:
-        result = full_text.strip()
+        result = text.strip()
 
     # '끝.' 또는 'end.'가 있다면 해당 단어 이전까지만 남김
     cut_positions = []
-    for marker in ["끝.", "end."]:
+    for marker in STOP_WORDS:
         idx = result.find(marker)
         if idx != -1:
             cut_positions.append(idx)
     if cut_positions:
         cut_at = min(cut_positions)
-        result = result[:cut_at].rstrip()  # 공백까지 제거
+        return result[:cut_at].rstrip(), True  # 공백까지 제거
 
-    return result
+    if not final:
+        for marker in STOP_WORDS:
+            for n in range(len(marker) - 1, 0, -1):
+                if result.endswith(marker[:n]):
+                    result = result[:-n].rstrip()
+                    break
+    return result, False
+
+
+def llm_generate_stream(
+    prompt: str,
+    max_new_tokens: int = 400,
+    temperature: float = 0.7,
+    prefix: Optional[str] = None,
+    mode: Optional[str] = None,
+    priority: Optional[str] = None,
+    user: Optional[str] = None,
+    adapter: Optional[str] = None,
+    cancel: Optional[CancelToken] = None,
+) -> Iterator[str]:
+    """
+    llm_generate 의 스트리밍 버전. 디코딩되는 대로 새로 확정된 텍스트 조각을 yield 한다.
+    '끝.' 또는 'end.'가 나오면 그 앞까지만 내보내고 생성을 멈춘다.
+    yield 된 조각을 모두 이어붙이면 llm_generate 와 같은 형태의 결과가 된다.
+    제너레이터는 yield 마다 컨텍스트가 바뀔 수 있으므로 (StreamingResponse) priority / user 는 직접 넘긴다.
+    """
+    if cancel is not None:
+        cancel.raise_if_cancelled()
+    ctx = current_request_context()
+    chunks: "queue.Queue[str | None]" = queue.Queue()
+    state = {"emitted": ""}
+
+    # 백엔드 생성 스레드에서 매 토큰마다 호출됨
+    def on_text(raw: str) -> bool:
+        visible, stopped = _clean_output(raw, final=False)
+        emitted = state["emitted"]
+        if len(visible) > len(emitted) and visible.startswith(emitted):
+            chunks.put(visible[len(emitted):])
+            state["emitted"] = visible
+        return not stopped
+
+    future = submit_to_backend(
+        mode,
+        prompt,
+        max_new_tokens=max_new_tokens,
+        temperature=temperature,
+        top_p=0.9,
+        repetition_penalty=1.3,
+        stop_words=STOP_WORDS,
+        prefix=prefix,
+        on_text=on_text,
+        priority=priority or ctx.priority,
+        user=user or ctx.user,
+        adapter=adapter,
+        cancel=cancel,
+    )
+    future.add_done_callback(lambda f: chunks.put(None))
+
+    while True:
+        chunk = chunks.get()
+        if chunk is None:
+            break
+        yield chunk
+
+    # 마지막으로 보류했던 꼬리(종료 마커 후보 등)를 확정해서 내보냄
+    final = _clean_output(future.result(), final=True)[0]
+    emitted = state["emitted"]
+    if len(final) > len(emitted) and final.startswith(emitted):
+        yield final[len(emitted):]
+
+
+def _cache_key(mode: str, template: str, gen_kwargs: dict, *inputs, adapter: Optional[str] = None) -> str:
+    """결과 캐시 키: 모델(+어댑터) + 템플릿 버전 + 모드 + 샘플링 파라미터 + 정규화 입력"""
+    params = {k: v for k, v in gen_kwargs.items() if k not in ("prefix", "mode")}
+    params.update(top_p=0.9, repetition_penalty=1.3)
+    if mode in EXTRACTIVE_MODES:
+        params.update(extractive=EXTRACTIVE_TOKENS)
+    return make_key(model_id_for(mode, adapter), template_version(template), mode, params, *inputs)
 
 
 # =========================
 # 3) 요약 함수 (짧은 / 긴)
 # =========================
-def summarize_short(text: str) -> str:
-    """
-    짧은 요약: 민원 핵심 주제를 짧게 요약.
-    예: "옥외광고물 위반 현수막", "불법주정차 과태료 민원"
-    """
-    prompt = f"""
-당신은 민원 내용을 '핵심 주제'로만 요약하는 AI입니다.
+# 모드별 생성 파라미터
+SHORT_GEN_KWARGS = dict(
+    max_new_tokens=64,
+    temperature=0.3,
+    stop_words=SHORT_STOP_WORDS,
+    prefix=SHORT_PROMPT_PREFIX,
+    mode="short",
+)
+LONG_GEN_KWARGS = dict(
+    max_new_tokens=200,
+    temperature=0.4,
+    prefix=LONG_PROMPT_PREFIX,
+    mode="long",
+)
 
-[지침]
-- 반드시 민원의 핵심 사안을 요약하십시오.
-- 지역명이나 도로명이 있다면 포함하십시오.
-- 가능한 한 짧은 명사구(문장 X)로 작성하십시오.
-- 불필요한 수식어는 제거하고, 핵심 사건/대상 위주로 표현하십시오.
-- 예: "화명1동 불법주차", "신호등 고장", "도로 파손", "옥외광고물 위반 현수막"
-- 설명 문장, 접속사, 존댓말 문장은 쓰지 마십시오.
-- 마지막에 반드시 '끝.'으로 마무리하십시오.
 
-[입력 민원]
-{text.strip()}
+def build_prompt_short(text: str) -> str:
+    prompt = SHORT_PROMPT_PREFIX + f"""{text.strip()}
 
 [출력 형식]
 - 민원 핵심 한 줄 (명사구)만 작성하고 끝에 '끝.'을 붙입니다.
 
 ### Response:
 """
-    out = llm_generate(
-        prompt,
-        max_new_tokens=64,
-        temperature=0.3,
-    )
+    return prompt
+
+
+def build_prompt_long(text: str) -> str:
+    prompt = LONG_PROMPT_PREFIX + f"""{text.strip()}
+
+[출력 형식]
+- 2~4문장 행정문서체 요약을 작성하고 마지막에 '끝.'을 붙입니다.
+
+### Response:
+"""
+    return prompt
 
+
+def _first_line(out: str) -> str:
     # 혹시 여러 줄이 나오면 첫 줄만 사용
-    summary = out.strip().splitlines()[0].strip()
-    return summary
+    lines = out.strip().splitlines()
+    return lines[0].strip() if lines else ""
+
+
+def _summary_pipeline(mode: str) -> dict:
+    """
+    요약 결과를 바꾸는 파이프라인 설정 (캐시 키에 포함): 입력 예산 / reduce 단계 수 / map 단계 모델,
+    cascade 를 쓰는 모드면 작은 모델과 검증 기준. map 단계는 long 프롬프트로 만든다
+    """
+    params = {"budget": SUMMARY_INPUT_TOKENS}
+    stages = {mode}
+    if SUMMARY_INPUT_TOKENS > 0:
+        params.update(max_reduce_depth=SUMMARY_MAX_REDUCE_DEPTH, map_model=model_id_for("long"))
+        stages.add("long")
+    for stage in sorted(stages & SMALL_MODEL_MODES):
+        params[f"cascade_{stage}"] = [
+            backends["small"].model_id, cascade.MAX_SHORT_CHARS, cascade.MAX_LONG_SENTENCES, cascade.MIN_OVERLAP,
+        ]
+    return params
+
+
+def _short_key(text: str) -> str:
+    return _cache_key("short", build_prompt_short(""), dict(SHORT_GEN_KWARGS, **_summary_pipeline("short")), text)
+
+
+def _long_key(text: str) -> str:
+    return _cache_key("long", build_prompt_long(""), dict(LONG_GEN_KWARGS, **_summary_pipeline("long")), text)
+
+
+def _map_key(text: str) -> str:
+    return _cache_key("map", build_prompt_long(""), dict(LONG_GEN_KWARGS, **_summary_pipeline("long")), text)
+
+
+class _Produced(str):
+    """요약 파이프라인의 원문 결과 + 실제로 만든 모델 id (cascade 의 작은 모델 / map-reduce 를 캐시에 그대로 기록)"""
+    model_id = ""
+
+
+def _produced(text: str, model_id: str) -> _Produced:
+    out = _Produced(text)
+    out.model_id = model_id
+    return out
+
+
+def _produced_by(raw: str, default: str) -> str:
+    return getattr(raw, "model_id", "") or default
+
+
+def _tag(src: Future, model_id, dst: Optional[Future] = None) -> Future:
+    """src 의 결과에 만든 모델 id 를 붙여 dst(없으면 새 Future)로 옮긴다. model_id 는 문자열 또는 raw → 문자열 함수"""
+    dst = dst if dst is not None else Future()
+
+    def done(f: Future):
+        if f.exception() is not None:
+            dst.set_exception(f.exception())
+            return
+        raw = f.result()
+        dst.set_result(_produced(raw, model_id(raw) if callable(model_id) else model_id))
+
+    src.add_done_callback(done)
+    return dst
+
+
+# 완료 콜백 다음 단계의 submit(작은 모델 → Kanana 재생성, map → reduce)은 registry 로딩으로 오래 걸릴 수 있으므로
+# 스케줄러 스레드(완료 콜백)가 아니라 이 스레드에서 한다
+_cascade_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="llm-cascade")
+
+# 진행 중인 map 단계 (map 캐시 키 → 부분 요약 Future). 같은 본문의 짧은/긴 요약이 청크 요약을 함께 쓴다
+_map_flights: Dict[str, Future] = {}
+_map_lock = threading.Lock()
+
+
+def count_tokens(text: str, mode: Optional[str] = None) -> int:
+    """모드의 백엔드 토크나이저 기준 토큰 수"""
+    with use_backend(mode) as b:
+        return b.count_tokens(text)
+
+
+def compress_input(mode: str, text: str) -> str:
+    """mode 프롬프트에 넣을 민원 본문. 추출 압축 대상 모드이고 EXTRACTIVE_TOKENS 를 넘을 때만 줄인다"""
+    if mode not in EXTRACTIVE_MODES or EXTRACTIVE_TOKENS <= 0:
+        return text
+    text = text.strip()
+    # byte-level BPE 는 한 글자가 토큰 3개를 넘지 않으므로 짧은 본문은 세지 않는다
+    if len(text) * 3 <= EXTRACTIVE_TOKENS:
+        return text
+    return extractive.compress(text, EXTRACTIVE_TOKENS, count_tokens(text, mode))
+
+
+def _summary_chunks(mode: str, text: str) -> Optional[List[str]]:
+    """요약 입력이 SUMMARY_INPUT_TOKENS 를 넘으면 문장 경계로 나눈 청크 목록, 아니면 None"""
+    text = text.strip()
+    # byte-level BPE 는 한 글자(UTF-8 최대 3바이트)가 토큰 3개를 넘지 않으므로 짧은 본문은 세지 않는다
+    if SUMMARY_INPUT_TOKENS <= 0 or len(text) * 3 <= SUMMARY_INPUT_TOKENS:
+        return None
+    total = count_tokens(text, mode)
+    if total <= SUMMARY_INPUT_TOKENS:
+        return None
+    chunks = chunking.split(text, total, SUMMARY_INPUT_TOKENS)
+    return chunks if len(chunks) > 1 else None
+
+
+def summary_submit(mode: str, text: str, priority: Optional[str] = None, user: Optional[str] = None,
+                   _depth: int = 0) -> Future:
+    """
+    요약 생성 요청만 넣고 Future 를 반환 (결과는 후처리 전 원문).
+    추출 압축(EXTRACTIVE_MODES)을 먼저 적용하고, 그래도 SUMMARY_INPUT_TOKENS 를 넘으면
+    map-reduce: 청크별 긴 요약(map)을 이어붙여 같은 mode 로 다시 요약.
+    """
+    # 완료 콜백은 다른 스레드에서 불리므로 컨텍스트 값은 지금 확정
+    ctx = current_request_context()
+    priority, user = priority or ctx.priority, user or ctx.user
+    if _depth == 0:
+        text = compress_input(mode, text)
+
+    chunks = _summary_chunks(mode, text) if _depth < SUMMARY_MAX_REDUCE_DEPTH else None
+    if chunks is None:
+        return _summary_submit_once(mode, text, priority, user)
+
+    partial = _map_submit(text, chunks, priority, user)
+
+    def reduce(joined: str) -> Future:
+        mapped_by = _produced_by(joined, "cache")
+        return _tag(summary_submit(mode, joined, priority, user, _depth + 1),
+                    lambda raw: f"map-reduce({mapped_by} -> {_produced_by(raw, model_id_for(mode))})")
+
+    return _then(partial, reduce)
+
+
+def _map_submit(text: str, chunks: List[str], priority: str, user: Optional[str]) -> Future:
+    """
+    map 단계: 청크별 긴 요약을 한꺼번에 제출 (스케줄러가 같은 배치로 prefill / 디코딩)하고
+    부분 요약을 순서대로 이어붙인 텍스트로 끝나는 Future 를 반환. 결과는 캐시하고 진행 중이면 공유한다.
+    """
+    key = _map_key(text)
+    result: Future = Future()
+    cached = result_cache.get(key)
+    if cached is not None:
+        result.set_result(cached)
+        return result
+    with _map_lock:
+        if key in _map_flights:
+            return _map_flights[key]
+        _map_flights[key] = result
+
+    logger.info(f"[요약 map-reduce] 청크 {len(chunks)}개 (예산 {SUMMARY_INPUT_TOKENS} 토큰)")
+    parts: List[Future] = []
+    remaining = [len(chunks)]
+
+    def finish(joined: Optional[str], error: Optional[BaseException]):
+        with _map_lock:
+            _map_flights.pop(key, None)
+        if error is not None:
+            result.set_exception(error)
+            return
+        mapped_by = "+".join(dict.fromkeys(_produced_by(p.result(), model_id_for("long")) for p in parts))
+        result_cache.put(key, "map", mapped_by, joined)
+        result.set_result(_produced(joined, mapped_by))
+
+    def on_part_done(_):
+        with _map_lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        try:
+            texts = [_clean_output(p.result(), final=True)[0].strip() for p in parts]
+        except Exception as e:
+            finish(None, e)
+            return
+        finish("\n".join(t for t in texts if t), None)
+
+    try:
+        for chunk in chunks:
+            parts.append(_summary_submit_once("long", chunk, priority, user))
+    except Exception as e:
+        finish(None, e)
+        return result
+    for p in parts:
+        p.add_done_callback(on_part_done)
+    return result
+
+
+def _then(future: Future, next_submit: Callable[[str], Future]) -> Future:
+    """future 가 끝나면 그 결과로 next_submit 을 호출하고, 그 Future 의 결과로 끝나는 Future"""
+    result: Future = Future()
+
+    def run(f: Future):
+        try:
+            following = next_submit(f.result())
+        except Exception as e:
+            result.set_exception(e)
+            return
+        following.add_done_callback(lambda g: _copy_future(g, result))
+
+    future.add_done_callback(lambda f: _cascade_executor.submit(run, f))
+    return result
+
+
+def _summary_submit_once(mode: str, text: str, priority: str, user: Optional[str]) -> Future:
+    """
+    요약 프롬프트 하나를 제출.
+    mode 가 SMALL_MODEL_MODES 에 있으면 작은 모델로 먼저 생성하고, llm.cascade.check 를 통과하지 못하거나
+    작은 모델이 실패하면 같은 프롬프트로 Kanana 에 다시 넣는다.
+    """
+    build, gen_kwargs = (build_prompt_short, SHORT_GEN_KWARGS) if mode == "short" else (build_prompt_long, LONG_GEN_KWARGS)
+    prompt = build(text)
+    if mode not in SMALL_MODEL_MODES:
+        return _tag(llm_submit(prompt, priority=priority, user=user, **gen_kwargs), model_id_for(mode))
+
+    result: Future = Future()
+
+    def fallback(outcome: str):
+        metrics.observe_cascade(mode, outcome)
+        try:
+            main = llm_submit(prompt, priority=priority, user=user, **gen_kwargs)
+        except Exception as e:
+            result.set_exception(e)
+            return
+        _tag(main, model_id_for(mode), result)
+
+    def on_small_done(f: Future):
+        try:
+            raw = f.result()
+        except Exception as e:
+            logger.warning(f"[요약 cascade] 작은 모델 실패 → Kanana ({mode}): {e}")
+            _cascade_executor.submit(fallback, "error")
+            return
+        reason = cascade.check(mode, *_clean_output(raw, final=True), source=text)
+        if reason is None:
+            metrics.observe_cascade(mode, "accepted")
+            result.set_result(_produced(raw, backends["small"].model_id))
+        else:
+            logger.debug(f"[요약 cascade] 검증 실패({reason}) → Kanana ({mode})")
+            _cascade_executor.submit(fallback, "rejected")
+
+    try:
+        small = llm_submit(prompt, priority=priority, user=user, backend_name="small", **gen_kwargs)
+    except Exception as e:
+        logger.warning(f"[요약 cascade] 작은 모델 submit 실패 → Kanana ({mode}): {e}")
+        metrics.observe_cascade(mode, "error")
+        return _tag(llm_submit(prompt, priority=priority, user=user, **gen_kwargs), model_id_for(mode))
+    small.add_done_callback(on_small_done)
+    return result
+
+
+def _copy_future(src: Future, dst: Future):
+    if src.exception() is not None:
+        dst.set_exception(src.exception())
+    else:
+        dst.set_result(src.result())
+
+
+def summarize_short(text: str) -> str:
+    """
+    짧은 요약: 민원 핵심 주제를 짧게 요약.
+    예: "옥외광고물 위반 현수막", "불법주정차 과태료 민원"
+    """
+    return _summarize_cached("short", text, _short_key(text), _first_line)
 
 
 def summarize_long(text: str) -> str:
     """
     긴 요약: 민원 내용을 2~4문장 정도의 행정문서체 요약으로 생성.
     """
-    prompt = f"""
-당신은 공공 민원 내용을 행정문서체로 요약하는 AI입니다.
+    return _summarize_cached("long", text, _long_key(text), str.strip)
 
-[지침]
-- 아래 민원 내용을 2~4문장으로 요약하십시오.
-- 핵심 배경, 요청 사항, 관련 법/제도 쟁점을 포함해 간결히 정리하십시오.
-- 문체는 공공기관 행정문서체(서술형 존댓말)를 사용하십시오.
-- 목록, 번호, 불릿 없이 일반 문장만 작성하십시오.
-- 마지막 문장은 반드시 '끝.'으로 마무리하십시오.
 
-[입력 민원]
-{text.strip()}
+def _summarize_cached(mode: str, text: str, key: str, post: Callable[[str], str]) -> str:
+    """캐시에 없으면 요약을 만들고, 실제로 만든 모델 id(cascade / map-reduce 포함)로 캐시에 기록"""
+    cached = result_cache.get(key)
+    if cached is not None:
+        return cached
+    return _finish_summary(mode, key, summary_submit(mode, text).result(), post)
 
-[출력 형식]
-- 2~4문장 행정문서체 요약을 작성하고 마지막에 '끝.'을 붙입니다.
 
-### Response:
-"""
-    out = llm_generate(
-        prompt,
-        max_new_tokens=200,
-        temperature=0.4,
-    )
+def _finish_summary(mode: str, key: str, raw: str, post: Callable[[str], str]) -> str:
+    value = post(_clean_output(raw, final=True)[0])
+    result_cache.put(key, mode, _produced_by(raw, model_id_for(mode)), value)
+    return value
+
 
-    summary = out.strip()
-    return summary
+def summarize_both(text: str) -> Tuple[str, str]:
+    """
+    짧은 요약 + 긴 요약을 한 번에 생성해 (short, long) 으로 반환.
+    캐시에 없는 것만 스케줄러에 동시에 넣으므로 같은 배치에서 함께 prefill/디코딩된다.
+    예산을 넘는 긴 본문이면 청크 요약(map)은 한 번만 만들어 두 요약이 함께 쓴다.
+    """
+    short_key, long_key = _short_key(text), _long_key(text)
+    short_sum = result_cache.get(short_key)
+    long_sum = result_cache.get(long_key)
+
+    short_future = summary_submit("short", text) if short_sum is None else None
+    long_future = summary_submit("long", text) if long_sum is None else None
+
+    if short_future is not None:
+        short_sum = _finish_summary("short", short_key, short_future.result(), _first_line)
+    if long_future is not None:
+        long_sum = _finish_summary("long", long_key, long_future.result(), str.strip)
+    return short_sum, long_sum
 
 
 def summarize(text: str, mode: Literal["short", "long"] = "short") -> str:
@@ -220,25 +887,10 @@ def build_prompt_reply(content: str, summary: str) -> str:
     """
     RAG / 도메인 라우팅 없이,
     '민원 내용 + 답변에 들어갈 주요 내용'만 가지고 일반적인 행정문서체 답변 생성.
+    content 는 EXTRACTIVE_MODES 에 reply 가 있으면 추출 압축해서 넣는다.
     """
-    prompt = f"""
-당신은 공공기관 민원 답변을 작성하는 AI입니다.
-이 서비스를 사용하는 사람은 민원공무원입니다.
-공무원이 민원 내용을 토대로 [답변에 들어갈 주요내용]을 작성합니다.
-당신은 공무원이 작성한 [답변에 들어갈 주요내용]을 기반으로 아래 지침에 따라 공무원 스타일의 답변을 생성합니다.
-
-
-[지침]
-- 확실하지 않은 내용은 기술하지 마십시오.
-- 문체는 공공기관 행정문서체(존댓말 서술형)를 사용하십시오.
-- 전체 구조는 다음 세 부분으로만 구성하십시오.
-  1. 민원 요지 확인 (1~2문장)
-  2. 확인된 사실 및 안내 (2~5문장)
-- 숫자 "1. 2. 3." 같은 번호는 실제로 쓰지 말고 문단만 나누지 말고 자연스러운 한 문단으로 이어서 작성하십시오.
-- 마지막 문장은 반드시 '끝.' 또는 'end.' 로 마무리하고 그 이후에는 아무 것도 출력하지 마십시오.
-
-[민원 내용]
-{summary.strip()}
+    content = compress_input("reply", content)
+    prompt = REPLY_PROMPT_PREFIX + f"""{summary.strip()}
 
 [답변에 들어갈 주요 내용]
 {content.strip()}
@@ -250,18 +902,169 @@ def build_prompt_reply(content: str, summary: str) -> str:
     return prompt
 
 
-def generate_reply(content: str, summary: str) -> str:
+REPLY_GEN_KWARGS = dict(
+    max_new_tokens=400,
+    temperature=0.5,
+    prefix=REPLY_PROMPT_PREFIX,
+    mode="reply",
+)
+
+
+def _reply_key(content: str, summary: str, adapter: Optional[str] = None) -> str:
+    return _cache_key("reply", build_prompt_reply("", ""), REPLY_GEN_KWARGS, content, summary, adapter=adapter)
+
+
+def generate_reply(content: str, summary: str, use_cache: bool = True, adapter: Optional[str] = None,
+                   cancel: Optional[CancelToken] = None) -> str:
+    """
+    use_cache=False 면 캐시를 건너뛰고 새로 생성 (답변 재생성용). 새 결과로 캐시는 갱신된다.
+    adapter 를 주면 그 부서 문체(LoRA 어댑터)로 생성한다.
+    cancel 이 취소되면 생성을 멈추고 GenerationCancelled (캐시에도 넣지 않음).
+    """
+    def compute():
+        prompt = build_prompt_reply(content, summary)
+        return llm_generate(prompt, adapter=adapter, cancel=cancel, **REPLY_GEN_KWARGS)
+
+    return result_cache.get_or_compute(
+        _reply_key(content, summary, adapter), "reply", model_id_for("reply", adapter), compute,
+        use_cache=use_cache,
+    )
+
+
+def generate_reply_stream(content: str, summary: str, use_cache: bool = True,
+                          user: Optional[str] = None, adapter: Optional[str] = None,
+                          cancel: Optional[CancelToken] = None) -> Iterator[str]:
+    """generate_reply 의 토큰 스트리밍 버전 (캐시에 있으면 한 번에 내보냄). 항상 interactive 우선순위"""
+    key = _reply_key(content, summary, adapter)
+    if use_cache:
+        cached = result_cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
     prompt = build_prompt_reply(content, summary)
-    return llm_generate(prompt, max_new_tokens=400, temperature=0.5)
+    chunks = []
+    for chunk in llm_generate_stream(prompt, priority="interactive", user=user, adapter=adapter, cancel=cancel,
+                                     **REPLY_GEN_KWARGS):
+        chunks.append(chunk)
+        yield chunk
+    result_cache.put(key, "reply", model_id_for("reply", adapter), "".join(chunks))
+
+
+def generate_reply_candidates(content: str, summary: str, k: int = REPLY_CANDIDATES, adapter: Optional[str] = None,
+                              cancel: Optional[CancelToken] = None) -> List[str]:
+    """
+    답변 후보 k개를 한 번의 요청으로 생성 (담당자가 골라 쓰도록 — 재생성을 k번 반복하지 않음).
+    hf 백엔드는 프롬프트를 한 번만 prefill 하고 후보들을 같은 배치에서 디코딩한다.
+    후보가 다양하도록 REPLY_CANDIDATE_TEMPERATURE 로 샘플링하고, 결과 캐시는 쓰지 않는다. 같은 후보는 한 번만.
+    """
+    k = max(1, min(k, REPLY_CANDIDATES_MAX))
+    prompt = build_prompt_reply(content, summary)
+    gen_kwargs = dict(REPLY_GEN_KWARGS, temperature=REPLY_CANDIDATE_TEMPERATURE)
+    raw = llm_submit(prompt, adapter=adapter, cancel=cancel, num_return_sequences=k, **gen_kwargs).result()
+    if k == 1:
+        raw = [raw]
+    candidates = [_clean_output(text, final=True)[0].strip() for text in raw]
+    return list(dict.fromkeys(c for c in candidates if c))
+
+
+# =========================
+# 5) 여러 민원 일괄 생성 (요약 + 답변 초안)
+# =========================
+def generate_drafts(items: List[dict], window: Optional[int] = None, priority: str = "bulk",
+                    user: Optional[str] = None, adapter: Optional[str] = None) -> List[dict]:
+    """
+    여러 민원의 짧은 요약 / 긴 요약 / 답변 초안을 한 번에 생성.
+
+    items: [{"content": str, "reply_summary": str | None,
+             "short": bool, "long": bool, "reply": bool,
+             "adapter": str | None}]  (생성할 것만 True, adapter 가 없으면 인자 adapter 로 답변 생성)
+    반환: 같은 순서로 {"summary", "long_summary", "reply", "errors"}  (생성하지 않은 값은 None)
+
+    - 캐시에 있는 것은 바로 사용하고, 나머지는 (모드, 프롬프트 길이) 순으로 정렬해서 제출
+      → 같은 배치에 max_new_tokens 와 길이가 비슷한 시퀀스끼리 모여 패딩/꼬리 낭비가 줄어든다
+    - 동시에 제출하는 수는 window(기본 MAX_BATCH_SIZE) 로 제한. 하나가 끝나면 다음 것을 넣으므로
+      배치는 계속 차 있고, 대화형 요청도 대기열 뒤로 한참 밀리지 않는다
+    - 기본 우선순위는 bulk: 대기열에서 interactive 요청이 항상 먼저 나가고,
+      다른 사용자의 bulk 요청과는 user 별로 번갈아 배치에 들어간다
+    - 부서(어댑터)가 다른 답변도 한 번에 제출하므로 같은 배치에서 함께 디코딩된다
+    """
+    window = window or MAX_BATCH_SIZE
+    results = [{"summary": None, "long_summary": None, "reply": None, "errors": {}} for _ in items]
+
+    # (모드, 결과 필드, 프롬프트, 캐시 키, 생성 파라미터, 후처리, item 번호)
+    tasks = []
+    for i, item in enumerate(items):
+        content = item["content"] or ""
+        if item.get("short"):
+            tasks.append(("short", "summary", build_prompt_short(content), _short_key(content),
+                          SHORT_GEN_KWARGS, _first_line, i))
+        if item.get("long"):
+            tasks.append(("long", "long_summary", build_prompt_long(content), _long_key(content),
+                          LONG_GEN_KWARGS, str.strip, i))
+        if item.get("reply"):
+            summary = item.get("reply_summary") or ""
+            reply_adapter = item.get("adapter", adapter)
+            tasks.append(("reply", "reply", build_prompt_reply(content, summary),
+                          _reply_key(content, summary, reply_adapter),
+                          dict(REPLY_GEN_KWARGS, adapter=reply_adapter), str.strip, i))
+
+    pending = []
+    for task in tasks:
+        mode, field, _, key, _, _, i = task
+        cached = result_cache.get(key)
+        if cached is not None:
+            results[i][field] = cached
+        else:
+            pending.append(task)
+
+    order = {"short": 0, "long": 1, "reply": 2}
+    pending.sort(key=lambda t: (order[t[0]], len(t[2])))
+
+    in_flight: Dict[Future, tuple] = {}
+    queue_iter = iter(pending)
+
+    def fill():
+        for task in queue_iter:
+            try:
+                if task[0] == "reply":
+                    future = llm_submit(task[2], priority=priority, user=user, **task[4])
+                else:   # 요약은 작은 모델 cascade 를 거칠 수 있다
+                    future = summary_submit(task[0], items[task[6]]["content"] or "", priority=priority, user=user)
+                in_flight[future] = task
+            except Exception as e:   # 로딩되지 않은 어댑터, 멈춘 스케줄러, 모델 서버 오류 등: 그 항목만 실패 처리
+                # 이미 제출한 항목은 그대로 끝까지 받는다
+                logger.warning(f"[초안 일괄 생성] {task[1]} 제출 실패: {e}")
+                results[task[6]]["errors"][task[1]] = str(e)
+                continue
+            if len(in_flight) >= window:
+                return
+
+    fill()
+    while in_flight:
+        done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+        for future in done:
+            mode, field, _, key, gen_kwargs, post, i = in_flight.pop(future)
+            try:
+                raw = future.result()
+                value = post(_clean_output(raw, final=True)[0])
+            except Exception as e:
+                results[i]["errors"][field] = str(e)
+                continue
+            results[i][field] = value
+            # 요약은 cascade / map-reduce 에서 실제로 만든 모델 id
+            result_cache.put(key, mode, _produced_by(raw, model_id_for(mode, gen_kwargs.get("adapter"))), value)
+        fill()
+
+    return results
 
 
 # =========================
-# 5) 메인 실행 예시
+# 6) 메인 실행 예시
 # =========================
 if __name__ == "__main__":
     content = "하단동 498-19 허가가 안 난 건가요? 몇 개월째 방치돼 있어 미관상 안 좋습니다."
-    short_sum = summarize(content, mode="short")
-    long_sum = summarize(content, mode="long")
+    short_sum, long_sum = summarize_both(content)
 
     print("[Short summary]")
     print(short_sum)
@@ -0,0 +1,86 @@
+# llm/loader.py
+'''
+LLM 백그라운드 로더
+
+- 앱 시작(startup) 시 별도 스레드에서 모델 로딩 + 워밍업 생성 1회 수행
+- 로딩이 끝나기 전에도 /, /login, /complaints 등 비 LLM 엔드포인트는 바로 응답
+- LLM 라우트는 ensure_ready() 로 상태를 확인하고, 준비 전이면 ModelNotReady 발생
+  (라우터에서 503 + Retry-After 로 변환)
+
+상태 흐름: idle → loading → warming_up → ready   (실패 시 failed)
+'''
+
+import logging
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# 준비 전 LLM 요청에 돌려줄 Retry-After (초)
+DEFAULT_RETRY_AFTER = 30
+
+
+class ModelNotReady(Exception):
+    def __init__(self, state: str, retry_after: int = DEFAULT_RETRY_AFTER):
+        super().__init__(f"LLM 모델이 아직 준비되지 않았습니다. (state={state})")
+        self.state = state
+        self.retry_after = retry_after
+
+
+class ModelLoader:
+    def __init__(self, retry_after: int = DEFAULT_RETRY_AFTER):
+        self.retry_after = retry_after
+        self.state = "idle"
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.ready_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """백그라운드 로딩 시작 (이미 시작했으면 무시)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.started_at = time.monotonic()
+            self._thread = threading.Thread(target=self._run, name="llm-loader", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        try:
+            self.state = "loading"
+            from llm import infer
+            infer.load_model()
+
+            self.state = "warming_up"
+            infer.warm_up()
+
+            self.ready_at = time.monotonic()
+            self.state = "ready"
+            logger.info(f"[LLM] 준비 완료 ({self.ready_at - self.started_at:.1f}s)")
+        except Exception as e:
+            self.error = str(e)
+            self.state = "failed"
+            logger.exception("[LLM] 모델 로딩 실패")
+
+    def is_ready(self) -> bool:
+        return self.state == "ready"
+
+    def ensure_ready(self):
+        if not self.is_ready():
+            raise ModelNotReady(self.state, self.retry_after)
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "error": self.error,
+            "load_seconds": (
+                round(self.ready_at - self.started_at, 1)
+                if self.ready_at and self.started_at else None
+            ),
+        }
+
+
+# 프로세스 전역 로더
+model_loader = ModelLoader()
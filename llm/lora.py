@@ -0,0 +1,123 @@
+# llm/lora.py
+'''
+LoRA 어댑터 (부서별 답변 문체: 교통 / 건축 인허가 / 청소 등)
+
+- 4bit Kanana 베이스 하나 위에 여러 어댑터를 peft 로 얹는다 (어댑터당 수십 MB, 8B 모델 재로딩 없음)
+- peft mixed-batch 추론: forward 에 adapter_names=[행별 어댑터] 를 넘기면
+  한 배치 안에서 행마다 다른 어댑터(또는 BASE_ADAPTER = 베이스 그대로)를 적용한다
+  → 부서가 다른 요청도 같은 continuous batching 배치로 디코딩
+- attach / detach 는 모델 모듈을 바꾸므로 반드시 배치 스케줄러 스레드에서 스텝 사이에 호출
+  (BatchScheduler.run_in_loop)
+- 실행 중 로딩은 read() 로 디스크에서 먼저 읽고(호출 스레드) attach_loaded() 로 얹기만 스케줄러 스레드에서 한다
+  → 진행 중인 디코딩은 모듈 교체 + 가중치 복사 동안만 멈춘다
+- 실행 중 로딩 경로는 resolve_path() 로 LLM_ADAPTER_DIR 아래의 safetensors 어댑터 디렉터리로 제한한다
+  (허브 id / 임의 경로 / pickle 가중치 불가)
+'''
+
+import os
+import re
+from typing import Dict, List, Optional, Sequence
+
+# peft 가 '어댑터 없이 베이스 모델로' 계산하는 행에 쓰는 이름
+BASE_ADAPTER = "__base__"
+_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]*$")
+
+
+def parse_adapters(spec: str) -> Dict[str, str]:
+    """"traffic=/models/lora/traffic,permit=/models/lora/permit" → {이름: 경로}"""
+    adapters = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        name, path = item.split("=", 1)
+        if name.strip() and path.strip():
+            adapters[name.strip()] = path.strip()
+    return adapters
+
+
+def is_peft(model) -> bool:
+    return model is not None and hasattr(model, "peft_config")
+
+
+def adapter_names(model) -> List[str]:
+    return sorted(model.peft_config) if is_peft(model) else []
+
+
+def forward_kwargs(model, adapters: Sequence[Optional[str]]) -> dict:
+    """
+    model(...) 에 더할 인자. 어댑터가 얹힌 모델이면 행별 어댑터 이름을 항상 넘긴다
+    (넘기지 않으면 peft 의 active adapter 가 베이스 요청에도 적용되므로)
+    """
+    if not is_peft(model):
+        return {}
+    return {"adapter_names": [a or BASE_ADAPTER for a in adapters]}
+
+
+def check_name(name: str):
+    """실행 중 로딩할 어댑터 이름 확인 (영문 / 숫자 / _ . -)"""
+    if not _NAME.match(name) or name == BASE_ADAPTER:
+        raise ValueError(f"사용할 수 없는 어댑터 이름: {name}")
+
+
+def resolve_path(root: Optional[str], name: str, path: Optional[str] = None) -> str:
+    """
+    실행 중 로딩할 어댑터의 실제 경로. path(없으면 name)는 root(LLM_ADAPTER_DIR) 기준 상대 경로이고
+    root 밖이거나 safetensors 어댑터 디렉터리가 아니면 ValueError
+    """
+    check_name(name)
+    if not root:
+        raise ValueError("LLM_ADAPTER_DIR 가 설정되지 않아 실행 중 어댑터 로딩을 사용할 수 없습니다.")
+    root = os.path.realpath(root)
+    resolved = os.path.realpath(os.path.join(root, path or name))
+    if os.path.commonpath([root, resolved]) != root or resolved == root:
+        raise ValueError(f"LLM_ADAPTER_DIR 밖의 경로는 로딩할 수 없습니다: {path or name}")
+    if not os.path.isfile(os.path.join(resolved, "adapter_model.safetensors")):
+        raise ValueError(f"safetensors 어댑터 디렉터리가 아닙니다: {path or name}")
+    return resolved
+
+
+def read(path: str):
+    """어댑터 설정 + 가중치를 디스크에서 읽는다 (모델을 건드리지 않으므로 어느 스레드에서나)"""
+    from peft import PeftConfig
+    from peft.utils import load_peft_weights
+
+    config = PeftConfig.from_pretrained(path)
+    config.inference_mode = True
+    return config, load_peft_weights(path, device="cpu")
+
+
+def attach_loaded(model, name: str, loaded):
+    """read() 결과를 얹은 모델을 반환 (LoRA 모듈 추가 + 가중치 복사만, 스케줄러 스레드에서)"""
+    from peft import PeftModel, set_peft_model_state_dict
+
+    config, weights = loaded
+    if is_peft(model):
+        model.add_adapter(name, config)
+    else:
+        model = PeftModel(model, config, adapter_name=name)
+        model.eval()
+    set_peft_model_state_dict(model, weights, adapter_name=name)
+    return model
+
+
+def attach(model, name: str, path: str):
+    """어댑터를 얹은 모델을 반환 (처음이면 PeftModel 로 감싸고, 이미 감싼 모델이면 추가 로딩)"""
+    if is_peft(model):
+        model.load_adapter(path, adapter_name=name)
+        return model
+
+    from peft import PeftModel
+
+    model = PeftModel.from_pretrained(model, path, adapter_name=name)
+    model.eval()
+    return model
+
+
+def detach(model, name: str):
+    """어댑터를 내린 모델을 반환. 마지막 어댑터면 LoRA 레이어를 걷어내고 원래 베이스 모델로 돌아간다"""
+    if not is_peft(model) or name not in model.peft_config:
+        return model
+    if len(model.peft_config) == 1:
+        return model.base_model.unload()
+    model.delete_adapter(name)
+    return model
@@ -0,0 +1,149 @@
+# llm/metrics.py
+'''
+LLM 생성 텔레메트리 (Prometheus)
+
+- 생성 1건마다: 프롬프트 토큰, 생성 토큰, 대기열 대기 시간, TTFT, 디코드 시간, 초당 토큰, 평균 배치 크기
+- 디코드 스텝마다: 배치 점유율(동시에 디코딩 중인 시퀀스 수)
+- 종료 사유(eos / stop / length / cancelled / error) 별 카운터
+- 우선순위 클래스(interactive / bulk / backfill) 별 대기열 깊이(gauge)와 대기 시간
+- admission control: 진행/대기 중인 요청 수, 대기 시간, 거절(429/503) 사유별 카운터
+- 요약 cascade: 작은 모델 결과 채택 / 검증 실패로 Kanana 재생성 / 작은 모델 오류 카운터
+- 라벨: mode (short / long / reply / other), backend (hf / cpu / ollama / fake), priority
+
+TTFT 는 요청 제출 시점부터 첫 토큰까지 (대기열 대기 포함, 사용자가 체감하는 값).
+디코드 시간은 첫 토큰부터 마지막 토큰까지.
+/metrics 엔드포인트는 render() 결과를 그대로 내보낸다.
+'''
+
+from typing import Dict, Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+LABELS = ("mode", "backend")
+
+_TOKEN_BUCKETS = (8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+_BATCH_BUCKETS = (1, 2, 3, 4, 6, 8, 12, 16, 24, 32)
+
+PROMPT_TOKENS = Histogram(
+    "llm_prompt_tokens", "Prompt length in tokens", LABELS, buckets=_TOKEN_BUCKETS,
+)
+GENERATED_TOKENS = Histogram(
+    "llm_generated_tokens", "Generated tokens per request", LABELS, buckets=_TOKEN_BUCKETS,
+)
+QUEUE_WAIT = Histogram(
+    "llm_queue_wait_seconds", "Time from submit until prefill starts", LABELS, buckets=_LATENCY_BUCKETS,
+)
+PRIORITY_QUEUE_WAIT = Histogram(
+    "llm_priority_queue_wait_seconds", "Time from submit until prefill starts, by priority class",
+    ("backend", "priority"), buckets=_LATENCY_BUCKETS,
+)
+QUEUE_DEPTH = Gauge(
+    "llm_queue_depth", "Requests waiting for a batch slot", ("backend", "priority"),
+)
+TIME_TO_FIRST_TOKEN = Histogram(
+    "llm_time_to_first_token_seconds", "Time from submit until the first generated token", LABELS,
+    buckets=_LATENCY_BUCKETS,
+)
+DECODE_SECONDS = Histogram(
+    "llm_decode_seconds", "Time from the first to the last generated token", LABELS, buckets=_LATENCY_BUCKETS,
+)
+TOKENS_PER_SECOND = Histogram(
+    "llm_decode_tokens_per_second", "Per-request decode throughput", LABELS,
+    buckets=(1, 2, 5, 10, 15, 20, 30, 40, 60, 80, 120, 200),
+)
+REQUEST_BATCH_SIZE = Histogram(
+    "llm_request_batch_size", "Mean batch occupancy while the request was decoding", LABELS,
+    buckets=_BATCH_BUCKETS,
+)
+BATCH_OCCUPANCY = Histogram(
+    "llm_batch_occupancy", "Sequences in the batch at each decode step", ("backend",), buckets=_BATCH_BUCKETS,
+)
+ADMISSION_ACTIVE = Gauge("llm_admission_active", "LLM requests admitted and in progress")
+ADMISSION_WAITING = Gauge("llm_admission_waiting", "LLM requests waiting for admission")
+ADMISSION_WAIT = Histogram(
+    "llm_admission_wait_seconds", "Time spent waiting for admission", buckets=_LATENCY_BUCKETS,
+)
+ADMISSION_REJECTED = Counter(
+    "llm_admission_rejected_total", "LLM requests rejected by admission control", ("reason",),
+)
+CASCADE_RESULTS = Counter(
+    "llm_cascade_total", "Small-model summaries accepted or sent back to the main model", ("mode", "outcome"),
+)
+GENERATIONS = Counter(
+    "llm_generations_total", "Finished generations by stop reason", LABELS + ("finish_reason",),
+)
+
+
+def _labels(mode: Optional[str], backend: str) -> Tuple[str, str]:
+    return mode or "other", backend
+
+
+def observe_generation(
+    mode: Optional[str],
+    backend: str,
+    *,
+    prompt_tokens: Optional[int] = None,
+    generated_tokens: int = 0,
+    queue_wait: Optional[float] = None,
+    ttft: Optional[float] = None,
+    decode_time: Optional[float] = None,
+    batch_size: Optional[float] = None,
+    finish_reason: str = "stop",
+    priority: Optional[str] = None,
+):
+    """생성 1건 기록. 백엔드가 알 수 없는 값은 None 으로 두면 해당 히스토그램만 건너뛴다."""
+    labels = _labels(mode, backend)
+    if prompt_tokens is not None:
+        PROMPT_TOKENS.labels(*labels).observe(prompt_tokens)
+    GENERATED_TOKENS.labels(*labels).observe(generated_tokens)
+    if queue_wait is not None:
+        QUEUE_WAIT.labels(*labels).observe(queue_wait)
+        if priority is not None:
+            PRIORITY_QUEUE_WAIT.labels(backend, priority).observe(queue_wait)
+    if ttft is not None:
+        TIME_TO_FIRST_TOKEN.labels(*labels).observe(ttft)
+    if decode_time is not None:
+        DECODE_SECONDS.labels(*labels).observe(decode_time)
+        if decode_time > 0 and generated_tokens > 1:
+            # 첫 토큰은 prefill 에서 나오므로 디코드 구간 토큰 수는 generated - 1
+            TOKENS_PER_SECOND.labels(*labels).observe((generated_tokens - 1) / decode_time)
+    if batch_size is not None:
+        REQUEST_BATCH_SIZE.labels(*labels).observe(batch_size)
+    GENERATIONS.labels(*labels, finish_reason).inc()
+
+
+def observe_failure(mode: Optional[str], backend: str, reason: str = "error"):
+    """reason: error / cancelled (취소 토큰으로 중단)"""
+    GENERATIONS.labels(*_labels(mode, backend), reason).inc()
+
+
+def observe_batch_step(backend: str, size: int):
+    BATCH_OCCUPANCY.labels(backend).observe(size)
+
+
+def observe_queue_depth(backend: str, depth: Dict[str, int]):
+    """depth: 우선순위 클래스 → 대기 중인 요청 수"""
+    for priority, count in depth.items():
+        QUEUE_DEPTH.labels(backend, priority).set(count)
+
+
+def observe_admission(active: int, waiting: int, wait: Optional[float] = None):
+    ADMISSION_ACTIVE.set(active)
+    ADMISSION_WAITING.set(waiting)
+    if wait is not None:
+        ADMISSION_WAIT.observe(wait)
+
+
+def observe_admission_rejected(reason: str):
+    ADMISSION_REJECTED.labels(reason).inc()
+
+
+def observe_cascade(mode: Optional[str], outcome: str):
+    """outcome: accepted (작은 모델 결과 사용) / rejected (검증 실패 → Kanana) / error (작은 모델 실패 → Kanana)"""
+    CASCADE_RESULTS.labels(mode or "other", outcome).inc()
+
+
+def render() -> Tuple[bytes, str]:
+    """(본문, Content-Type)"""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,269 @@
+# llm/registry.py
+'''
+모델 레지스트리 (한 프로세스가 들고 있는 모델들의 로딩 / 메모리 예산 / 유휴 모델 해제)
+
+- register(name, load, unload) 로 등록만 해 두고, 처음 쓰일 때 모델별 lock 안에서 한 번만 로딩
+  (동시에 첫 호출이 와도 두 번 로딩하지 않음)
+- 로딩 후 RAM / VRAM 사용량(footprint)을 측정해 보관
+- 예산(ram_budget / vram_budget, 바이트)을 넘으면 사용 중이 아닌 모델부터 오래 안 쓴 순(LRU)으로 해제
+  pinned 모델은 해제하지 않음. 해제된 모델은 다음에 쓰일 때 (그 요청 스레드에서) 다시 로딩된다
+  → 준비 상태(llm.loader)가 전제로 하는 주 모델은 pinned 로 등록한다 (llm.infer)
+- 사용 중 표시: use() 컨텍스트 또는 acquire() → release() (Future 가 끝날 때 반납하는 경우)
+- release 뒤의 예산 확인 / 해제는 레지스트리 전용 스레드에서 실행한다. release 는 Future 를 끝낸 스레드
+  (보통 그 백엔드의 배치 스케줄러 스레드)에서 불리므로, 거기서 바로 해제하면 스케줄러가 자기 스레드를
+  join 하거나 다른 백엔드의 디코드 루프가 해제가 끝날 때까지 멈춘다
+
+    with registry.use("polyglot") as (tokenizer, model):
+        ...
+
+footprint 는 load 가 돌려준 객체의 footprint() 메서드(있으면) 또는
+torch 모듈(튜플/리스트 안의 모듈 포함)의 파라미터 + 버퍼 크기를 디바이스별로 합산한다.
+'''
+
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_MB = 1024 * 1024
+
+
+def module_footprint(*objs) -> Dict[str, int]:
+    """torch 모듈들의 {"ram": 바이트, "vram": 바이트} (모듈이 아닌 값은 무시)"""
+    torch = sys.modules.get("torch")
+    footprint = {"ram": 0, "vram": 0}
+    if torch is None:
+        return footprint
+    seen = set()
+    for obj in objs:
+        if not isinstance(obj, torch.nn.Module):
+            continue
+        for tensor in list(obj.parameters()) + list(obj.buffers()):
+            if id(tensor) in seen:
+                continue
+            seen.add(id(tensor))
+            kind = "vram" if tensor.device.type == "cuda" else "ram"
+            footprint[kind] += tensor.numel() * tensor.element_size()
+    return footprint
+
+
+def measure_footprint(obj) -> Dict[str, int]:
+    if hasattr(obj, "footprint"):
+        return obj.footprint()
+    if isinstance(obj, (tuple, list)):
+        return module_footprint(*obj)
+    return module_footprint(obj)
+
+
+@dataclass
+class _Entry:
+    name: str
+    load: Callable[[], Any]
+    unload: Optional[Callable[[Any], None]] = None
+    pinned: bool = False
+    obj: Any = None
+    loaded: bool = False
+    footprint: Dict[str, int] = field(default_factory=lambda: {"ram": 0, "vram": 0})
+    in_use: int = 0
+    last_used: float = 0.0
+    loads: int = 0
+    evictions: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)   # 로딩 / 해제 직렬화
+
+
+class ModelRegistry:
+    def __init__(self, ram_budget: int = 0, vram_budget: int = 0, pinned=()):
+        self.ram_budget = ram_budget     # 0 이면 제한 없음
+        self.vram_budget = vram_budget
+        self.pinned = set(pinned)
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()    # in_use / last_used / 목록 보호
+        # release 뒤의 예산 확인 / 해제를 실행하는 스레드 (호출한 스레드를 붙잡지 않도록)
+        self._evictor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm-registry")
+
+    # -------------------------
+    # 등록 / 사용
+    # -------------------------
+    def register(self, name: str, load: Callable[[], Any], unload: Optional[Callable[[Any], None]] = None,
+                 pinned: bool = False):
+        """같은 이름을 다시 등록하면 무시 (모듈 재 import 대비)"""
+        with self._lock:
+            if name not in self._entries:
+                self._entries[name] = _Entry(name, load, unload, pinned or name in self.pinned)
+
+    def is_registered(self, name: str) -> bool:
+        return name in self._entries
+
+    def is_loaded(self, name: str) -> bool:
+        entry = self._entries.get(name)
+        return entry is not None and entry.loaded
+
+    def acquire(self, name: str) -> Tuple[Any, Callable[[], None]]:
+        """(모델 객체, release 함수). release 전까지는 해제 대상이 아니다."""
+        entry = self._entry(name)
+        with self._lock:
+            entry.in_use += 1
+            entry.last_used = time.monotonic()
+        try:
+            obj = self._ensure_loaded(entry)
+        except BaseException:
+            self._release(entry)
+            raise
+
+        released = threading.Event()
+
+        def release():
+            if not released.is_set():
+                released.set()
+                self._release(entry)
+
+        return obj, release
+
+    @contextmanager
+    def use(self, name: str):
+        obj, release = self.acquire(name)
+        try:
+            yield obj
+        finally:
+            release()
+
+    def load(self, name: str):
+        """미리 로딩 (사용 중 표시는 남기지 않음)"""
+        with self.use(name) as obj:
+            return obj
+
+    def evict(self, name: str) -> bool:
+        """사용 중이 아니고 pinned 가 아니면 해제. 해제했으면 True"""
+        entry = self._entry(name)
+        with entry.lock:
+            with self._lock:
+                if not entry.loaded or entry.in_use or entry.pinned:
+                    return False
+                obj, entry.obj, entry.loaded = entry.obj, None, False
+                footprint = entry.footprint
+                entry.footprint = {"ram": 0, "vram": 0}
+                entry.evictions += 1
+            if entry.unload is not None:
+                entry.unload(obj)
+            del obj
+            _release_device_memory()
+        logger.info(
+            f"[모델 레지스트리] {name} 해제 (RAM {footprint['ram'] / _MB:.0f}MB, VRAM {footprint['vram'] / _MB:.0f}MB)"
+        )
+        return True
+
+    # -------------------------
+    # 내부
+    # -------------------------
+    def _entry(self, name: str) -> _Entry:
+        entry = self._entries.get(name)
+        if entry is None:
+            raise KeyError(f"등록되지 않은 모델: {name}")
+        return entry
+
+    def _release(self, entry: _Entry):
+        with self._lock:
+            entry.in_use -= 1
+            entry.last_used = time.monotonic()
+        if self.ram_budget or self.vram_budget:
+            self._evictor.submit(self._enforce_budget_logged)
+
+    def _enforce_budget_logged(self):
+        try:
+            self._enforce_budget()
+        except Exception:
+            logger.exception("[모델 레지스트리] 유휴 모델 해제 실패")
+
+    def _ensure_loaded(self, entry: _Entry):
+        if entry.loaded:
+            return entry.obj
+        with entry.lock:
+            if entry.loaded:
+                return entry.obj
+            started = time.monotonic()
+            obj = entry.load()
+            footprint = measure_footprint(obj)
+            with self._lock:
+                entry.obj, entry.loaded, entry.footprint = obj, True, footprint
+                entry.loads += 1
+            logger.info(
+                f"[모델 레지스트리] {entry.name} 로딩 {time.monotonic() - started:.1f}s "
+                f"(RAM {footprint['ram'] / _MB:.0f}MB, VRAM {footprint['vram'] / _MB:.0f}MB)"
+            )
+        self._enforce_budget()
+        return obj
+
+    def _usage(self) -> Dict[str, int]:
+        usage = {"ram": 0, "vram": 0}
+        for entry in self._entries.values():
+            if entry.loaded:
+                usage["ram"] += entry.footprint["ram"]
+                usage["vram"] += entry.footprint["vram"]
+        return usage
+
+    def _over_budget(self) -> bool:
+        usage = self._usage()
+        return bool(
+            (self.ram_budget and usage["ram"] > self.ram_budget)
+            or (self.vram_budget and usage["vram"] > self.vram_budget)
+        )
+
+    def _enforce_budget(self):
+        while True:
+            with self._lock:
+                if not self._over_budget():
+                    return
+                idle = [
+                    e for e in self._entries.values()
+                    if e.loaded and not e.in_use and not e.pinned
+                ]
+                if not idle:
+                    logger.warning(f"[모델 레지스트리] 메모리 예산 초과 — 해제할 수 있는 유휴 모델 없음 {self._usage()}")
+                    return
+                victim = min(idle, key=lambda e: e.last_used)
+            if not self.evict(victim.name):
+                return
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "budget_mb": {"ram": self.ram_budget // _MB, "vram": self.vram_budget // _MB},
+                "usage_mb": {k: round(v / _MB, 1) for k, v in self._usage().items()},
+                "models": {
+                    e.name: {
+                        "loaded": e.loaded,
+                        "pinned": e.pinned,
+                        "in_use": e.in_use,
+                        "ram_mb": round(e.footprint["ram"] / _MB, 1),
+                        "vram_mb": round(e.footprint["vram"] / _MB, 1),
+                        "idle_seconds": round(time.monotonic() - e.last_used, 1) if e.last_used else None,
+                        "loads": e.loads,
+                        "evictions": e.evictions,
+                    }
+                    for e in self._entries.values()
+                },
+            }
+
+
+def _release_device_memory():
+    import gc
+
+    gc.collect()
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+# 프로세스 전역 레지스트리
+registry = ModelRegistry(
+    ram_budget=int(float(os.getenv("LLM_REGISTRY_RAM_BUDGET_MB", "0")) * _MB),
+    vram_budget=int(float(os.getenv("LLM_REGISTRY_VRAM_BUDGET_MB", "0")) * _MB),
+    pinned={n.strip() for n in os.getenv("LLM_REGISTRY_PINNED", "").split(",") if n.strip()},
+)
@@ -0,0 +1,620 @@
+# llm/scheduler.py
+'''
+Continuous batching 스케줄러
+
+- 여러 스레드(FastAPI threadpool)에서 동시에 들어오는 프롬프트를 하나의 배치로 모아 디코딩
+- 매 디코드 스텝마다 새 요청을 배치에 합류시키고, 끝난 시퀀스는 즉시 배치에서 제거
+- 요청별 샘플링 파라미터(temperature, top_p, repetition_penalty, max_new_tokens, stop words)를 유지
+- 모델 호출/토크나이저 사용은 모두 스케줄러 스레드 하나에서만 수행 (fast tokenizer 동시 사용 오류 방지)
+
+배치 상태:
+- KV cache: 레이어별 (key, value) 텐서, shape = (batch, heads, seq_len, head_dim)
+- attention mask: (batch, seq_len), 왼쪽 패딩 위치는 0
+- position_ids 는 attention mask 누적합으로 계산하므로 중간에 합류한 시퀀스도 위치가 어긋나지 않음
+- tail: (batch, window) 시퀀스별 마지막 토큰들. stop word 판정은 이 창만 디바이스 위에서 비교
+
+텔레메트리: 요청별 대기열 대기/TTFT/디코드 시간/토큰 수/평균 배치 크기, 스텝별 배치 점유율을
+llm.metrics 로 기록 (mode 라벨은 요청의 mode, 대기 시간은 우선순위 클래스별로도)
+
+대기열 (llm.fair_queue.FairQueue):
+- 우선순위 클래스 interactive > bulk > backfill, 같은 클래스 안에서는 user 별 round-robin
+- reserved_slots 만큼의 배치 자리는 interactive 전용 → bulk 가 배치를 꽉 채워도
+  단건 답변 요청은 다음 스텝에 바로 합류한다
+- min_free_memory(바이트)를 주면 GPU 여유 메모리가 그보다 적을 때는 새 시퀀스를 합류시키지 않고
+  진행 중인 시퀀스가 끝나 KV cache 가 줄어들 때까지 대기열에 둔다 (OOM 으로 배치 전체가 실패하는 것 방지)
+
+Prefix KV cache:
+- 요약/답변 프롬프트의 고정 지침 블록(prefix)은 모델 로딩 후 처음 한 번만 prefill 해서 보관
+- 이후 요청은 민원별 뒷부분(suffix)만 prefill. 마스크가 [prefix 1..1 | pad 0..0 | suffix 1..1] 형태가
+  되지만 position_ids 를 마스크 누적합으로 계산하므로 전체 프롬프트를 한 번에 넣은 것과 같다.
+- 어댑터마다 prefix KV 값이 다르므로 (prefix, adapter) 별로 따로 보관
+
+LoRA 어댑터 (llm.lora):
+- 요청마다 adapter 를 지정하면 모든 forward 에 행별 adapter_names 를 넘겨 한 배치에서 섞어 디코딩
+- 어댑터 로딩/해제처럼 모델을 바꾸는 작업은 run_in_loop() 로 스케줄러 스레드에서 스텝 사이에 실행
+
+후보 N개 (num_return_sequences > 1, 답변 후보 고르기):
+- 프롬프트는 한 행으로 한 번만 prefill 하고, KV cache / 마스크 / 마지막 logits 행을 후보 수만큼 복제해
+  각자 샘플링 → 후보들은 배치 자리를 하나씩 차지하며 다른 요청과 함께 디코딩된다
+- Future 결과는 후보 순서대로 List[str] (모든 후보가 끝났을 때). 스트리밍(on_text)과는 같이 쓸 수 없다
+
+따로 실행하는 요청 (runner, assisted decoding):
+- 배치에 합류하지 않는 생성도 같은 대기열(우선순위 / 공정 분배 / 예약 자리 / 취소)을 거쳐
+  스케줄러 스레드에서 runner(request) 로 실행한다 → 배치 디코딩과 같은 모델을 동시에 쓰지 않음
+- 실행하는 동안 진행 중인 배치는 다음 스텝을 기다린다
+
+취소 (llm.cancellation): 요청의 cancel 토큰을 매 스텝 종료 판정 때 확인해 취소된 시퀀스는 바로 배치에서 뺀다
+(Future 는 GenerationCancelled). 대기열에서 꺼낼 때 이미 취소된 요청은 prefill 하지 않는다.
+'''
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+import torch
+import torch.nn.functional as F
+from transformers import DynamicCache, LogitsProcessorList
+from transformers.generation.logits_process import (
+    RepetitionPenaltyLogitsProcessor,
+    TemperatureLogitsWarper,
+    TopPLogitsWarper,
+)
+
+from llm import lora, metrics
+from llm.admission import gpu_memory_pressure
+from llm.cancellation import CancelToken, GenerationCancelled
+from llm.fair_queue import DEFAULT_PRIORITY, FairQueue
+from llm.stopping import StopOnAnyStopWords, get_stop_criteria
+
+
+@dataclass
+class GenerationRequest:
+    prompt: str
+    max_new_tokens: int = 400
+    temperature: float = 0.7
+    top_p: float = 0.9
+    repetition_penalty: float = 1.3
+    stop_words: List[str] = field(default_factory=list)
+    # 고정 프롬프트 앞부분: prompt 가 이 문자열로 시작하면 앞부분 KV cache 를 재사용
+    prefix: Optional[str] = None
+    # 스트리밍용 콜백: 지금까지 생성된 텍스트를 받고, False 를 돌려주면 생성을 멈춘다
+    on_text: Optional[Callable[[str], bool]] = None
+    # 텔레메트리 라벨 (short / long / reply)
+    mode: Optional[str] = None
+    # 대기열 순서: 우선순위 클래스 + 공정 분배 단위(user_uid)
+    priority: str = DEFAULT_PRIORITY
+    user: Optional[str] = None
+    # LoRA 어댑터 이름 (None 이면 베이스 모델)
+    adapter: Optional[str] = None
+    # 취소 토큰: 취소되면 다음 스텝에서 생성을 멈추고 GenerationCancelled
+    cancel: Optional[CancelToken] = None
+    # 후보 수: 1 보다 크면 prefill 을 공유하고 Future 결과는 List[str]
+    num_return_sequences: int = 1
+    # 후보별 결과 (num_return_sequences > 1 일 때, 끝난 후보부터 채워짐)
+    results: List[Optional[str]] = field(default_factory=list)
+    # 배치 대신 스케줄러 스레드에서 따로 실행할 생성 함수 (assisted decoding). 반환값이 Future 결과
+    runner: Optional[Callable[["GenerationRequest"], str]] = None
+    future: Future = field(default_factory=Future)
+    submitted_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class _Sequence:
+    request: GenerationRequest
+    token_ids: torch.Tensor            # 프롬프트 + 생성 토큰 (repetition penalty 계산용, 1D)
+    processors: LogitsProcessorList
+    criteria: StopOnAnyStopWords
+    generated: List[int] = field(default_factory=list)
+    finish_reason: Optional[str] = None
+    candidate: int = 0                 # 후보 번호 (num_return_sequences > 1)
+    # 텔레메트리
+    prompt_tokens: int = 0
+    prefill_at: float = 0.0
+    first_token_at: float = 0.0
+    batch_size_sum: int = 0
+    decode_steps: int = 0
+
+
+class BatchScheduler:
+    """
+    llm.generate 대신 사용하는 iteration-level 배치 스케줄러.
+    submit() 은 Future 를 돌려주고, 결과는 '생성된 부분'만 디코딩한 문자열이다.
+    """
+
+    def __init__(self, model, tokenizer, max_batch_size: int = 8, idle_wait: float = 0.05, name: str = "hf",
+                 reserved_slots: int = 1, min_free_memory: int = 0):
+        self.name = name   # 텔레메트리 backend 라벨
+        self.model = model
+        self.tokenizer = tokenizer
+        self.tokenizer.padding_side = "left"
+        self.max_batch_size = max_batch_size
+        self.idle_wait = idle_wait
+        # interactive 전용 배치 자리 수 (배치 크기보다 작게)
+        self.reserved_slots = max(0, min(reserved_slots, max_batch_size - 1))
+        self.min_free_memory = min_free_memory
+
+        self._pending = FairQueue()
+        self._active: List[_Sequence] = []
+        self._cache = None        # legacy KV cache: tuple((k, v), ...)
+        self._attn = None         # (batch, seq_len)
+        self._next_tokens = None  # (batch, 1)
+        self._tail = None         # (batch, window) 마지막 토큰들, 빈 자리는 -1
+        self._window = 2
+        self._prefixes = {}       # (prefix 문자열, adapter) → (prefix 토큰 ids, legacy KV cache)
+        self._control: "queue.Queue[tuple]" = queue.Queue()   # run_in_loop 작업 (fn, Future)
+
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="llm-scheduler", daemon=True)
+
+    # -------------------------
+    # 외부 API
+    # -------------------------
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        # 스케줄러 스레드 안에서 불리면 (Future 콜백 등) 자기 자신은 join 할 수 없다 — 이번 스텝이 끝나면 멈춘다
+        if threading.current_thread() is not self._thread:
+            self._thread.join(timeout=5)
+        while True:
+            try:
+                _, future = self._control.get_nowait()
+            except queue.Empty:
+                break
+            if future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError("배치 스케줄러가 중지되었습니다."))
+
+    def submit(self, prompt: str, **params) -> Future:
+        request = GenerationRequest(prompt=prompt, **params)
+        if request.num_return_sequences > 1:
+            if request.on_text is not None or request.runner is not None:
+                raise ValueError("후보 여러 개(num_return_sequences)는 스트리밍 / runner 와 함께 쓸 수 없습니다.")
+            # 후보마다 배치 자리를 하나씩 쓰므로 배치 크기를 넘을 수 없다
+            request.num_return_sequences = min(request.num_return_sequences, self.max_batch_size)
+            request.results = [None] * request.num_return_sequences
+        self._pending.put(request, request.priority, request.user)
+        return request.future
+
+    def generate(self, prompt: str, **params) -> str:
+        return self.submit(prompt, **params).result()
+
+    def run_in_loop(self, fn: Callable[[], object]) -> Future:
+        """fn 을 스케줄러 스레드에서 다음 스텝 전에 실행 (진행 중인 배치는 그대로 이어서 디코딩)"""
+        future: Future = Future()
+        self._control.put((fn, future))
+        return future
+
+    def drop_prefixes(self, adapter: Optional[str]):
+        """해당 어댑터로 계산해 둔 prefix KV cache 를 버린다 (스케줄러 스레드에서 호출)"""
+        for key in [k for k in self._prefixes if k[1] == adapter]:
+            del self._prefixes[key]
+
+    def queue_stats(self) -> dict:
+        """우선순위 클래스별 대기열 상태 + 현재 배치 구성"""
+        stats = self._pending.stats()
+        for seq in list(self._active):
+            stat = stats.get(seq.request.priority)
+            if stat is not None:
+                stat["running"] = stat.get("running", 0) + 1
+        return stats
+
+    # -------------------------
+    # 메인 루프
+    # -------------------------
+    def _loop(self):
+        while not self._stopped.is_set():
+            self._run_control()
+            new_requests = self._collect_new_requests()
+            standalone = [req for req in new_requests if req.runner is not None]
+            new_requests = [req for req in new_requests if req.runner is None]
+            try:
+                if new_requests:
+                    self._prefill(new_requests)
+                self._run_standalone(standalone)
+                if self._active:
+                    self._decode_step()
+            except Exception as e:  # OOM 등: 현재 배치 전체를 실패 처리하고 계속 서비스
+                for seq in self._active:
+                    if not seq.request.future.done():
+                        seq.request.future.set_exception(e)
+                        metrics.observe_failure(seq.request.mode, self.name)
+                for req in new_requests + standalone:
+                    if not req.future.done():
+                        req.future.set_exception(e)
+                        metrics.observe_failure(req.mode, self.name)
+                self._reset_batch()
+
+    def _run_control(self):
+        while True:
+            try:
+                fn, future = self._control.get_nowait()
+            except queue.Empty:
+                return
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn())
+            except Exception as e:
+                future.set_exception(e)
+
+    def _run_standalone(self, requests: List[GenerationRequest]):
+        """runner 요청을 하나씩 실행. 실패는 그 요청만 실패 처리 (배치는 그대로)"""
+        for req in requests:
+            try:
+                req.future.set_result(req.runner(req))
+            except GenerationCancelled as e:
+                req.future.set_exception(e)
+            except Exception as e:
+                req.future.set_exception(e)
+                metrics.observe_failure(req.mode, self.name)
+
+    def _collect_new_requests(self) -> List[GenerationRequest]:
+        metrics.observe_queue_depth(self.name, self._pending.depth())
+        free = self.max_batch_size - len(self._active)
+        if free <= 0:
+            return []
+        if self._active and gpu_memory_pressure(self.min_free_memory):
+            return []
+
+        # interactive 가 아닌 요청은 예약 자리를 뺀 만큼만 배치를 차지할 수 있다
+        background = sum(1 for seq in self._active if seq.request.priority != DEFAULT_PRIORITY)
+        background_free = self.max_batch_size - self.reserved_slots - background
+
+        requests = []
+        # 후보 N개 요청은 배치 자리 N개. 다음 차례 요청이 남은 자리에 들어가지 않으면 꺼내지 않고
+        # 대기열 맨 앞에 둔 채 이번 스텝의 합류를 멈춘다 (배치가 비어 있을 때의 첫 요청만 예외,
+        # 후보 수는 submit 에서 max_batch_size 이하로 줄여 두므로 넘지 않는다)
+        slots = 0
+        # 배치가 비어 있으면 새 요청이 올 때까지 대기, 진행 중이면 대기 없이 있는 것만 합류
+        if not self._active:
+            try:
+                requests.append(self._pending.get(timeout=self.idle_wait))
+            except queue.Empty:
+                return []
+            slots += requests[0].num_return_sequences
+            if requests[0].priority != DEFAULT_PRIORITY:
+                background_free -= requests[0].num_return_sequences
+        def fits(req: GenerationRequest, priority: str) -> bool:
+            if slots + req.num_return_sequences > free:
+                return False
+            return priority == DEFAULT_PRIORITY or req.num_return_sequences <= background_free
+
+        while slots < free:
+            try:
+                if background_free > 0:
+                    req = self._pending.get_nowait(fits=fits)
+                else:
+                    req = self._pending.get_nowait(priorities=(DEFAULT_PRIORITY,), fits=fits)
+            except queue.Empty:
+                break
+            slots += req.num_return_sequences
+            if req.priority != DEFAULT_PRIORITY:
+                background_free -= req.num_return_sequences
+            requests.append(req)
+        collected = []
+        for req in requests:
+            if not req.future.set_running_or_notify_cancel():
+                continue
+            if req.cancel is not None and req.cancel.cancelled:
+                req.future.set_exception(GenerationCancelled(req.cancel.reason))
+                metrics.observe_failure(req.mode, self.name, "cancelled")
+                continue
+            collected.append(req)
+        return collected
+
+    # -------------------------
+    # Prefill: 새 요청들을 한 번에 인코딩하고 배치에 합류
+    # -------------------------
+    def _prefill(self, requests: List[GenerationRequest]):
+        # 같은 prefix 를 쓰는 요청끼리 묶어서 prefill (prefix KV 는 어댑터별이라 어댑터도 같이)
+        groups: dict = {}
+        for req in requests:
+            prefix = req.prefix if req.prefix and req.prompt.startswith(req.prefix) else None
+            groups.setdefault((prefix, req.adapter if prefix is not None else None), []).append(req)
+        for (prefix, adapter), group in groups.items():
+            self._prefill_group(prefix, adapter, group)
+
+    @torch.no_grad()
+    def _prefill_group(self, prefix: Optional[str], adapter: Optional[str], requests: List[GenerationRequest]):
+        started_at = time.monotonic()
+        device = self.model.device
+        batch = len(requests)
+
+        if prefix is None:
+            enc = self.tokenizer(
+                [r.prompt for r in requests],
+                return_tensors="pt",
+                padding=True,
+                truncation=True,
+            ).to(device)
+            prefix_ids = enc.input_ids.new_empty((0,))
+            past = DynamicCache()
+        else:
+            prefix_ids, prefix_cache = self._prefix_cache(prefix, adapter)
+            enc = self.tokenizer(
+                [r.prompt[len(prefix):] for r in requests],
+                return_tensors="pt",
+                padding=True,
+                truncation=True,
+                max_length=max(self.tokenizer.model_max_length - len(prefix_ids), 1),
+                add_special_tokens=False,
+            ).to(device)
+            past = DynamicCache.from_legacy_cache(tuple(
+                (k.expand(batch, -1, -1, -1), v.expand(batch, -1, -1, -1))
+                for k, v in prefix_cache
+            ))
+
+        suffix_attn = enc.attention_mask
+        attn = torch.cat([suffix_attn.new_ones((batch, len(prefix_ids))), suffix_attn], dim=-1)
+        position_ids = (attn.cumsum(-1) - 1).clamp(min=0)[:, len(prefix_ids):]
+
+        out = self.model(
+            input_ids=enc.input_ids,
+            attention_mask=attn,
+            position_ids=position_ids,
+            past_key_values=past,
+            use_cache=True,
+            **lora.forward_kwargs(self.model, [r.adapter for r in requests]),
+        )
+
+        cache = out.past_key_values.to_legacy_cache()
+        logits = out.logits[:, -1, :]
+        counts = [req.num_return_sequences for req in requests]
+        if any(count > 1 for count in counts):
+            # 후보 N개: prefill 은 한 번 했으므로 KV / 마스크 / 마지막 logits 행만 후보 수만큼 복제
+            index = torch.repeat_interleave(
+                torch.arange(batch, device=device), torch.tensor(counts, device=device)
+            )
+            cache = tuple((k.index_select(0, index), v.index_select(0, index)) for k, v in cache)
+            attn = attn.index_select(0, index)
+            logits = logits.index_select(0, index)
+
+        seqs = []
+        for i, req in enumerate(requests):
+            token_ids = torch.cat([prefix_ids, enc.input_ids[i][suffix_attn[i].bool()]])
+            for candidate in range(counts[i]):
+                seqs.append(_Sequence(
+                    request=req,
+                    token_ids=token_ids,
+                    processors=self._build_processors(req),
+                    criteria=get_stop_criteria(self.tokenizer, req.stop_words),
+                    candidate=candidate,
+                    prompt_tokens=len(token_ids),
+                    prefill_at=started_at,
+                ))
+        self._grow_window(max(seq.criteria.window for seq in seqs))
+
+        # 프롬프트 끝부분으로 tail 초기화 (모자라는 자리는 -1)
+        tail = torch.stack([
+            F.pad(seq.token_ids[-self._window:], (self._window - min(len(seq.token_ids), self._window), 0), value=-1)
+            for seq in seqs
+        ])
+
+        next_tokens = self._sample(seqs, logits)
+        first_token_at = time.monotonic()
+        for seq in seqs:
+            seq.first_token_at = first_token_at
+        self._merge(seqs, cache, attn, next_tokens, tail)
+        self._append(seqs, next_tokens)
+        self._retire()
+
+    @torch.no_grad()
+    def _prefix_cache(self, prefix: str, adapter: Optional[str] = None):
+        """(prefix, adapter) 의 (토큰 ids, KV cache) — 모델 로딩(스케줄러 생성) 후 처음 쓰일 때 한 번만 계산"""
+        entry = self._prefixes.get((prefix, adapter))
+        if entry is None:
+            ids = self.tokenizer(prefix, return_tensors="pt").input_ids.to(self.model.device)
+            out = self.model(
+                input_ids=ids, past_key_values=DynamicCache(), use_cache=True,
+                **lora.forward_kwargs(self.model, [adapter]),
+            )
+            entry = (ids[0], out.past_key_values.to_legacy_cache())
+            self._prefixes[(prefix, adapter)] = entry
+        return entry
+
+    # -------------------------
+    # Decode: 배치 전체 1 토큰 진행
+    # -------------------------
+    @torch.no_grad()
+    def _decode_step(self):
+        batch_size = len(self._active)
+        metrics.observe_batch_step(self.name, batch_size)
+        for seq in self._active:
+            seq.batch_size_sum += batch_size
+            seq.decode_steps += 1
+
+        attn = torch.cat([self._attn, self._attn.new_ones((self._attn.shape[0], 1))], dim=-1)
+        position_ids = attn.sum(-1, keepdim=True) - 1
+
+        out = self.model(
+            input_ids=self._next_tokens,
+            attention_mask=attn,
+            position_ids=position_ids,
+            past_key_values=DynamicCache.from_legacy_cache(self._cache),
+            use_cache=True,
+            **lora.forward_kwargs(self.model, [seq.request.adapter for seq in self._active]),
+        )
+        self._cache = out.past_key_values.to_legacy_cache()
+        self._attn = attn
+
+        next_tokens = self._sample(self._active, out.logits[:, -1, :])
+        self._next_tokens = next_tokens.unsqueeze(-1)
+        self._append(self._active, next_tokens)
+        self._retire()
+
+    def _grow_window(self, window: int):
+        if window <= self._window:
+            return
+        if self._tail is not None:
+            self._tail = F.pad(self._tail, (window - self._window, 0), value=-1)
+        self._window = window
+
+    # -------------------------
+    # 샘플링 (요청별 파라미터 적용)
+    # -------------------------
+    def _build_processors(self, req: GenerationRequest) -> LogitsProcessorList:
+        processors = LogitsProcessorList()
+        if req.repetition_penalty and req.repetition_penalty != 1.0:
+            processors.append(RepetitionPenaltyLogitsProcessor(req.repetition_penalty))
+        if req.temperature and req.temperature != 1.0:
+            processors.append(TemperatureLogitsWarper(req.temperature))
+        if req.top_p is not None and req.top_p < 1.0:
+            processors.append(TopPLogitsWarper(req.top_p))
+        return processors
+
+    def _sample(self, seqs: List[_Sequence], logits: torch.Tensor) -> torch.Tensor:
+        tokens = []
+        for i, seq in enumerate(seqs):
+            row = seq.processors(seq.token_ids.unsqueeze(0), logits[i:i + 1].float())
+            probs = torch.softmax(row, dim=-1)
+            tokens.append(torch.multinomial(probs, num_samples=1)[0])
+        return torch.cat(tokens)
+
+    # -------------------------
+    # 종료 판정 및 배치에서 제거
+    # -------------------------
+    def _stop_hits(self, seqs: List[_Sequence], tail: torch.Tensor) -> List[bool]:
+        """
+        stop word 판정. 같은 조건(criteria)을 쓰는 시퀀스끼리 묶어서 한 번에 비교한다.
+        tail 의 행 순서는 seqs 와 같다.
+        """
+        hits = [False] * len(seqs)
+        groups: dict = {}
+        for i, seq in enumerate(seqs):
+            groups.setdefault(id(seq.criteria), (seq.criteria, []))[1].append(i)
+        for criteria, rows in groups.values():
+            index = torch.tensor(rows, device=tail.device)
+            matched = criteria.match(tail.index_select(0, index)).tolist()
+            for row, hit in zip(rows, matched):
+                hits[row] = hit
+        return hits
+
+    def _append(self, seqs: List[_Sequence], next_tokens: torch.Tensor):
+        """
+        seqs 는 배치 맨 뒤에 붙어 있는 시퀀스들 (prefill 직후엔 새 시퀀스들, decode 땐 전체)
+        """
+        start = len(self._active) - len(seqs)
+        self._tail[start:] = torch.cat([self._tail[start:, 1:], next_tokens[:, None]], dim=-1)
+        stop_hits = self._stop_hits(seqs, self._tail[start:])
+
+        for i, (seq, token, stop_hit) in enumerate(zip(seqs, next_tokens.tolist(), stop_hits)):
+            seq.generated.append(token)
+            seq.token_ids = torch.cat([seq.token_ids, next_tokens[i:i + 1]])
+            if token == self.tokenizer.eos_token_id:
+                seq.finish_reason = "eos"
+            elif stop_hit:
+                seq.finish_reason = "stop"
+            elif len(seq.generated) >= seq.request.max_new_tokens:
+                seq.finish_reason = "length"
+            elif seq.request.cancel is not None and seq.request.cancel.cancelled:
+                seq.finish_reason = "cancelled"
+
+            if seq.finish_reason is None and seq.request.on_text is not None:
+                text = self.tokenizer.decode(seq.generated, skip_special_tokens=True)
+                if seq.request.on_text(text) is False:
+                    seq.finish_reason = "stop"
+
+    def _retire(self):
+        keep = []
+        for i, seq in enumerate(self._active):
+            if seq.finish_reason is None:
+                keep.append(i)
+                continue
+            self._finish(seq)
+            self._observe(seq)
+
+        if len(keep) != len(self._active):
+            self._select(keep)
+
+    def _finish(self, seq: _Sequence):
+        req = seq.request
+        if req.future.done():   # 같은 요청의 다른 후보가 취소되어 이미 끝남
+            return
+        if seq.finish_reason == "cancelled":
+            req.future.set_exception(GenerationCancelled(req.cancel.reason))
+            return
+        text = self.tokenizer.decode(seq.generated, skip_special_tokens=True)
+        if req.num_return_sequences <= 1:
+            req.future.set_result(text)
+            return
+        req.results[seq.candidate] = text
+        if all(result is not None for result in req.results):
+            req.future.set_result(list(req.results))
+
+    def _observe(self, seq: _Sequence):
+        req = seq.request
+        metrics.observe_generation(
+            req.mode,
+            self.name,
+            prompt_tokens=seq.prompt_tokens,
+            generated_tokens=len(seq.generated),
+            queue_wait=seq.prefill_at - req.submitted_at,
+            ttft=seq.first_token_at - req.submitted_at,
+            decode_time=time.monotonic() - seq.first_token_at,
+            batch_size=seq.batch_size_sum / seq.decode_steps if seq.decode_steps else len(self._active),
+            finish_reason=seq.finish_reason,
+            priority=req.priority,
+        )
+
+    def _select(self, keep: List[int]):
+        if not keep:
+            self._reset_batch()
+            return
+        index = torch.tensor(keep, device=self._attn.device)
+        self._active = [self._active[i] for i in keep]
+        self._attn = self._attn.index_select(0, index)
+        self._next_tokens = self._next_tokens.index_select(0, index)
+        self._tail = self._tail.index_select(0, index)
+        self._cache = tuple(
+            (k.index_select(0, index), v.index_select(0, index)) for k, v in self._cache
+        )
+        # 남은 시퀀스 모두가 패딩인 왼쪽 열은 잘라낸다
+        start = int(self._attn.any(dim=0).int().argmax())
+        if start > 0:
+            self._attn = self._attn[:, start:]
+            self._cache = tuple((k[:, :, start:], v[:, :, start:]) for k, v in self._cache)
+
+    def _merge(self, seqs: List[_Sequence], cache, attn: torch.Tensor, next_tokens: torch.Tensor,
+               tail: torch.Tensor):
+        """새로 prefill 한 시퀀스들을 기존 배치 뒤에 붙인다. 길이가 다르면 짧은 쪽을 왼쪽 패딩."""
+        next_tokens = next_tokens.unsqueeze(-1)
+        if not self._active:
+            self._active = list(seqs)
+            self._cache, self._attn, self._next_tokens, self._tail = cache, attn, next_tokens, tail
+            return
+
+        old_len, new_len = self._attn.shape[1], attn.shape[1]
+        length = max(old_len, new_len)
+        old_cache = _left_pad_cache(self._cache, length - old_len)
+        new_cache = _left_pad_cache(cache, length - new_len)
+
+        self._cache = tuple(
+            (torch.cat([ok, nk], dim=0), torch.cat([ov, nv], dim=0))
+            for (ok, ov), (nk, nv) in zip(old_cache, new_cache)
+        )
+        self._attn = torch.cat([
+            F.pad(self._attn, (length - old_len, 0)),
+            F.pad(attn, (length - new_len, 0)),
+        ], dim=0)
+        self._next_tokens = torch.cat([self._next_tokens, next_tokens], dim=0)
+        self._tail = torch.cat([self._tail, tail], dim=0)
+        self._active.extend(seqs)
+
+    def _reset_batch(self):
+        self._active = []
+        self._cache = None
+        self._attn = None
+        self._next_tokens = None
+        self._tail = None
+
+
+def _left_pad_cache(cache, pad: int):
+    if pad <= 0:
+        return cache
+    return tuple(
+        (F.pad(k, (0, 0, pad, 0)), F.pad(v, (0, 0, pad, 0))) for k, v in cache
+    )
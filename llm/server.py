@@ -0,0 +1,312 @@
+# llm/server.py
+'''
+로컬 LLM 모델 서버 (모델을 가진 유일한 프로세스)
+
+    LLM_BACKEND=hf python -m llm.server --host 127.0.0.1 --port 8100
+
+API 서버는 LLM_BACKEND=remote (LLM_SERVER_URL=http://127.0.0.1:8100) 로 띄우면
+uvicorn 워커 수와 관계없이 GPU 에는 모델이 하나만 올라간다.
+
+- 모델 로딩/워밍업은 API 와 같은 ModelLoader 로 백그라운드에서 수행 (로딩 중에는 503 + Retry-After)
+- POST /generate       요청을 이 프로세스의 백엔드(LLM_BACKEND / LLM_MODE_BACKENDS)로 그대로 전달
+                       stream=true 면 NDJSON 으로 새 텍스트 조각을 흘려보냄
+                       num_return_sequences > 1 이면 후보 목록 {"texts": [...]}
+                       (stream=true 면 끝날 때까지 빈 줄(keep-alive)을 보낸 뒤 {"texts"} → {"done"},
+                        연결이 끊기면 취소)
+- POST /count_tokens   토큰 수
+- GET  /adapters                 LoRA 어댑터 목록
+  PUT  /adapters/{name}          어댑터 로딩 (body: {"path": LLM_ADAPTER_DIR 기준 상대 경로}), 같은 이름이면 교체
+  DELETE /adapters/{name}        진행 중인 요청이 끝나면 해제 (재시작 없이 교체)
+- GET  /healthz        로딩 상태 (ready 가 아니면 503)
+- GET  /metrics        생성 텔레메트리 (Prometheus)
+- 모든 동시 요청은 같은 배치 스케줄러로 들어가므로 워커는 반드시 1개
+- --cpu-affinity (LLM_CPU_AFFINITY): 이 프로세스를 묶을 코어 목록 (예: "0-7,16-23", cpu 백엔드 replica 용)
+  모델만 있는 프로세스라 여기서만 적용한다 (API 프로세스에서는 배포의 taskset / cpuset 으로)
+- /generate 앞에 admission control (LLM_SERVER_MAX_CONCURRENT / LLM_SERVER_MAX_QUEUE)
+  넘치면 429 / 503 + Retry-After (RemoteBackend 가 Overloaded 로 바꿔 API 까지 그대로 전달)
+'''
+
+import argparse
+import json
+import os
+import queue
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import List, Literal, Optional
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from starlette.concurrency import iterate_in_threadpool
+
+from llm import metrics
+from llm.admission import AdmissionController, Overloaded
+from llm.cancellation import CancelToken
+from llm.loader import model_loader
+
+app = FastAPI(title="LLM model server")
+
+# 후보 N개 스트리밍에서 결과를 기다리는 동안 빈 줄을 보내는 간격 (초)
+CANDIDATE_KEEPALIVE = 1.0
+
+# API 노드 여러 대의 요청이 모이므로 API 쪽 admission 보다 넉넉하게
+admission = AdmissionController(
+    max_concurrent=int(os.getenv("LLM_SERVER_MAX_CONCURRENT", "64")),
+    max_queue=int(os.getenv("LLM_SERVER_MAX_QUEUE", "128")),
+    queue_timeout=float(os.getenv("LLM_ADMISSION_QUEUE_TIMEOUT", "10")),
+    retry_after=int(os.getenv("LLM_ADMISSION_RETRY_AFTER", "5")),
+    min_free_memory=int(float(os.getenv("LLM_MIN_FREE_GPU_MB", "0")) * 1024 * 1024),
+)
+
+
+class GenerateRequest(BaseModel):
+    prompt: str
+    max_new_tokens: int = 400
+    temperature: float = 0.7
+    top_p: float = 0.9
+    repetition_penalty: float = 1.3
+    stop_words: List[str] = []
+    prefix: Optional[str] = None
+    mode: Optional[str] = None
+    # API 서버에서 지정한 대기열 우선순위 / 공정 분배 단위 (llm.fair_queue)
+    priority: Literal["interactive", "bulk", "backfill"] = "interactive"
+    user: Optional[str] = None
+    # LoRA 어댑터 (부서별 문체). 로딩되지 않은 이름이면 400
+    adapter: Optional[str] = None
+    # 후보 수 (1 보다 크면 prefill 한 번으로 후보를 함께 디코딩)
+    num_return_sequences: int = Field(1, ge=1)
+    stream: bool = False
+
+
+class CountTokensRequest(BaseModel):
+    text: str
+    mode: Optional[str] = None
+
+
+class LoadAdapterRequest(BaseModel):
+    path: Optional[str] = None   # LLM_ADAPTER_DIR 기준 상대 경로 (없으면 어댑터 이름)
+
+
+def _not_ready() -> JSONResponse:
+    status = model_loader.status()
+    return JSONResponse(
+        status_code=503,
+        content=status,
+        headers={"Retry-After": str(model_loader.retry_after)},
+    )
+
+
+def _overloaded(e: Overloaded) -> JSONResponse:
+    return JSONResponse(
+        status_code=e.status_code,
+        content={"reason": e.reason, "detail": str(e)},
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
+@app.on_event("startup")
+def start_model_loader():
+    from llm import infer
+
+    if infer.BACKEND == "remote" or "remote" in infer.MODE_BACKENDS.values():
+        raise RuntimeError("모델 서버는 remote 백엔드를 쓸 수 없습니다. LLM_BACKEND 를 hf/cpu 등으로 지정하세요.")
+    model_loader.start()
+
+
+@app.get("/healthz")
+def healthz():
+    if not model_loader.is_ready():
+        return _not_ready()
+    return model_loader.status()
+
+
+@app.post("/generate")
+def generate(req: GenerateRequest):
+    if not model_loader.is_ready():
+        return _not_ready()
+
+    from llm import infer
+
+    try:
+        ticket = admission.acquire()
+    except Overloaded as e:
+        return _overloaded(e)
+
+    params = req.model_dump(exclude={"prompt", "stream", "mode", "num_return_sequences"})
+    if req.num_return_sequences > 1 and req.stream:
+        return _generate_candidates_stream(req, params, ticket)
+    if req.num_return_sequences > 1:
+        try:
+            return {"texts": infer.submit_to_backend(
+                req.mode, req.prompt, num_return_sequences=req.num_return_sequences, **params,
+            ).result()}
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"detail": str(e)})
+        finally:
+            ticket.release()
+    if not req.stream:
+        try:
+            return {"text": infer.submit_to_backend(req.mode, req.prompt, **params).result()}
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"detail": str(e)})
+        finally:
+            ticket.release()
+
+    chunks: "queue.Queue[str | None]" = queue.Queue()
+    state = {"emitted": "", "closed": False}
+    # 클라이언트(RemoteBackend)가 연결을 끊으면 취소 → 다음 디코드 스텝에서 배치에서 빠진다
+    cancel = CancelToken()
+
+    # 백엔드 생성 스레드에서 호출됨. 클라이언트가 끊었으면 False 로 생성 중단
+    def on_text(raw: str) -> bool:
+        emitted = state["emitted"]
+        if len(raw) > len(emitted) and raw.startswith(emitted):
+            chunks.put(raw[len(emitted):])
+            state["emitted"] = raw
+        return not state["closed"]
+
+    try:
+        future = infer.submit_to_backend(req.mode, req.prompt, on_text=on_text, cancel=cancel, **params)
+    except ValueError as e:
+        ticket.release()
+        return JSONResponse(status_code=400, content={"detail": str(e)})
+    future.add_done_callback(lambda f: chunks.put(None))
+    future.add_done_callback(lambda f: ticket.release())
+
+    def ndjson():
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is None:
+                    break
+                yield json.dumps({"text": chunk}, ensure_ascii=False) + "\n"
+            try:
+                final = future.result()
+            except Exception as e:
+                yield json.dumps({"error": str(e)}, ensure_ascii=False) + "\n"
+                return
+            emitted = state["emitted"]
+            if len(final) > len(emitted) and final.startswith(emitted):
+                yield json.dumps({"text": final[len(emitted):]}, ensure_ascii=False) + "\n"
+            yield json.dumps({"done": True}) + "\n"
+        finally:
+            state["closed"] = True
+            if not future.done():
+                cancel.cancel("client_disconnected")
+
+    return StreamingResponse(_cancel_on_disconnect(ndjson(), cancel), media_type="application/x-ndjson")
+
+
+def _generate_candidates_stream(req: GenerateRequest, params: dict, ticket):
+    """
+    후보 N개 + stream=true: 후보는 조각으로 나눠 보낼 수 없으므로 끝날 때까지 CANDIDATE_KEEPALIVE 초마다
+    빈 줄을 보낸다. 빈 줄을 쓰는 순간마다 끊긴 연결을 알아채고 취소 → 후보들이 다음 스텝에서 배치에서 빠진다
+    """
+    from llm import infer
+
+    cancel = CancelToken()
+    try:
+        future = infer.submit_to_backend(
+            req.mode, req.prompt, num_return_sequences=req.num_return_sequences, cancel=cancel, **params,
+        )
+    except ValueError as e:
+        ticket.release()
+        return JSONResponse(status_code=400, content={"detail": str(e)})
+    future.add_done_callback(lambda f: ticket.release())
+
+    def ndjson():
+        try:
+            while True:
+                try:
+                    texts = future.result(timeout=CANDIDATE_KEEPALIVE)
+                    break
+                except FutureTimeout:
+                    yield "\n"
+                except Exception as e:
+                    yield json.dumps({"error": str(e)}, ensure_ascii=False) + "\n"
+                    return
+            yield json.dumps({"texts": texts}, ensure_ascii=False) + "\n"
+            yield json.dumps({"done": True}) + "\n"
+        finally:
+            if not future.done():
+                cancel.cancel("client_disconnected")
+
+    return StreamingResponse(_cancel_on_disconnect(ndjson(), cancel), media_type="application/x-ndjson")
+
+
+async def _cancel_on_disconnect(events, cancel: CancelToken):
+    # 연결이 끊겨 StreamingResponse 가 멈추면 동기 제너레이터는 버려질 뿐이므로 여기서 취소하고 닫는다
+    try:
+        async for event in iterate_in_threadpool(events):
+            yield event
+    finally:
+        cancel.cancel("client_disconnected")
+        events.close()
+
+
+@app.post("/count_tokens")
+def count_tokens(req: CountTokensRequest):
+    if not model_loader.is_ready():
+        return _not_ready()
+
+    from llm import infer
+    with infer.use_backend(req.mode) as backend:
+        return {"tokens": backend.count_tokens(req.text)}
+
+
+@app.get("/adapters")
+def list_adapters(mode: Optional[str] = "reply"):
+    from llm import infer
+    return {"adapters": infer.list_adapters(mode)}
+
+
+@app.put("/adapters/{name}")
+def load_adapter(name: str, req: Optional[LoadAdapterRequest] = None, mode: Optional[str] = "reply"):
+    from llm import infer
+    try:
+        infer.load_adapter(name, req.path if req else None, mode)
+    except (ValueError, NotImplementedError) as e:
+        return JSONResponse(status_code=400, content={"detail": str(e)})
+    return {"adapters": infer.list_adapters(mode)}
+
+
+@app.delete("/adapters/{name}")
+def unload_adapter(name: str, mode: Optional[str] = "reply"):
+    from llm import infer
+    try:
+        infer.unload_adapter(name, mode)
+    except KeyError:
+        return JSONResponse(status_code=404, content={"detail": f"로딩되지 않은 LoRA 어댑터: {name}"})
+    except NotImplementedError as e:
+        return JSONResponse(status_code=400, content={"detail": str(e)})
+    return {"adapters": infer.list_adapters(mode)}
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="LLM 모델 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--cpu-affinity", default=os.getenv("LLM_CPU_AFFINITY") or None,
+                        help='이 프로세스를 묶을 코어 목록 (예: "0-7,16-23")')
+    args = parser.parse_args()
+
+    if args.cpu_affinity:
+        from llm.backends.cpu import parse_cpu_list
+
+        cpus = parse_cpu_list(args.cpu_affinity)
+        os.sched_setaffinity(0, cpus)
+        print(f"CPU affinity: {sorted(cpus)}")
+
+    # 모델/배치 스케줄러는 프로세스 하나에만 있어야 하므로 workers=1 고정
+    uvicorn.run(app, host=args.host, port=args.port, workers=1)
+
+
+if __name__ == "__main__":
+    main()
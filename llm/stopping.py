@@ -0,0 +1,130 @@
+# llm/stopping.py
+'''
+종료 조건 (stop words)
+
+- 배치의 각 시퀀스별로 종료 여부를 판정해 (batch,) bool 텐서로 반환
+- 매 스텝 마지막 window 토큰만 디바이스 위에서 비교 → 시퀀스 길이와 무관하게 O(1)
+- "\n" 을 stop word 로 주면 줄바꿈이 포함된 토큰이 본문 뒤에 나올 때 종료 (summarize_short 용)
+- 토크나이즈 결과는 get_stop_criteria() 로 캐시해서 재사용 (요청마다 다시 토크나이즈하지 않음)
+- StopOnCancel: 취소 토큰(llm.cancellation)이 취소되면 HF generate 를 다음 스텝에서 멈춤
+'''
+
+import threading
+from typing import Dict, List, Tuple
+
+import torch
+from transformers import StoppingCriteria
+
+NEWLINE = "\n"
+
+
+class StopOnAnyStopWords(StoppingCriteria):
+    """
+    stop_words 안의 어느 문자열이라도 출력되면 해당 시퀀스를 종료.
+    예: ["끝.", "end."], ["끝.", "end.", "\n"]
+    """
+    def __init__(self, tokenizer, stop_words: List[str]):
+        self.stop_words = list(stop_words)
+        self.use_newline = NEWLINE in self.stop_words
+
+        ids_list = []
+        for w in self.stop_words:
+            if w == NEWLINE:
+                continue
+            ids = tokenizer(w, add_special_tokens=False).input_ids
+            if ids:
+                ids_list.append(ids)
+
+        # newline 판정에는 직전 토큰 1개가 필요하므로 window 는 최소 2
+        self.window = max([len(ids) for ids in ids_list] + [2])
+
+        # (stop word 수, window): 오른쪽 정렬, 빈 자리는 mask=False
+        stop_ids = torch.full((len(ids_list), self.window), -1, dtype=torch.long)
+        stop_mask = torch.zeros((len(ids_list), self.window), dtype=torch.bool)
+        for i, ids in enumerate(ids_list):
+            stop_ids[i, self.window - len(ids):] = torch.tensor(ids)
+            stop_mask[i, self.window - len(ids):] = True
+
+        newline_ids, blank_ids = _newline_token_ids(tokenizer) if self.use_newline else ([], [])
+        self._cpu = {
+            "stop_ids": stop_ids,
+            "stop_mask": stop_mask,
+            "newline_ids": torch.tensor(newline_ids, dtype=torch.long),
+            "soft_ids": torch.tensor(sorted(set(newline_ids) | set(blank_ids)), dtype=torch.long),
+        }
+        self._per_device: Dict[str, Dict[str, torch.Tensor]] = {}
+
+    def _tensors(self, device) -> Dict[str, torch.Tensor]:
+        key = str(device)
+        if key not in self._per_device:
+            self._per_device[key] = {k: v.to(device) for k, v in self._cpu.items()}
+        return self._per_device[key]
+
+    def match(self, tail: torch.Tensor) -> torch.Tensor:
+        """
+        tail: (batch, window) 각 시퀀스의 마지막 window 토큰 (모자라면 -1 로 왼쪽 패딩)
+        반환: (batch,) bool — 이번 스텝에 종료 조건을 만족한 시퀀스
+        """
+        t = self._tensors(tail.device)
+        if tail.shape[1] < self.window:
+            tail = torch.nn.functional.pad(tail, (self.window - tail.shape[1], 0), value=-1)
+        tail = tail[:, -self.window:]
+
+        hit = torch.zeros(tail.shape[0], dtype=torch.bool, device=tail.device)
+        if t["stop_ids"].numel():
+            eq = (tail[:, None, :] == t["stop_ids"][None]) | ~t["stop_mask"][None]
+            hit |= eq.all(dim=-1).any(dim=-1)
+
+        if self.use_newline:
+            # 줄바꿈 토큰이 '내용 있는 토큰' 바로 뒤에 나오면 종료
+            # (프롬프트 끝의 ':\n' 이나 출력 앞쪽의 공백/빈 줄에서는 멈추지 않음)
+            last, prev = tail[:, -1], tail[:, -2]
+            hit |= torch.isin(last, t["newline_ids"]) & ~torch.isin(prev, t["soft_ids"])
+        return hit
+
+    def __call__(self, input_ids, scores, **kwargs):
+        # input_ids: (batch, seq_len) — HF generate 는 행별 bool 텐서를 받아 시퀀스별로 종료 처리
+        return self.match(input_ids[:, -self.window:])
+
+
+class StopOnCancel(StoppingCriteria):
+    """취소 토큰이 취소되면 배치 전체를 종료 (assisted decoding 은 배치 1 이라 요청 하나)"""
+    def __init__(self, token):
+        self.token = token
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return torch.full((input_ids.shape[0],), self.token.cancelled, dtype=torch.bool, device=input_ids.device)
+
+
+# =========================
+# 캐시
+# =========================
+_criteria_cache: Dict[Tuple[int, Tuple[str, ...]], StopOnAnyStopWords] = {}
+_newline_cache: Dict[int, Tuple[List[int], List[int]]] = {}
+_cache_lock = threading.Lock()
+
+
+def get_stop_criteria(tokenizer, stop_words: List[str]) -> StopOnAnyStopWords:
+    """(토크나이저, stop words) 조합별로 한 번만 만들어 재사용"""
+    key = (id(tokenizer), tuple(stop_words))
+    with _cache_lock:
+        criteria = _criteria_cache.get(key)
+        if criteria is None:
+            criteria = StopOnAnyStopWords(tokenizer, stop_words)
+            _criteria_cache[key] = criteria
+        return criteria
+
+
+def _newline_token_ids(tokenizer) -> Tuple[List[int], List[int]]:
+    """
+    (줄바꿈을 포함하는 토큰 id 목록, 공백으로만 이루어진 토큰 id 목록)
+    어휘 전체를 한 번 디코딩하므로 토크나이저별로 캐시한다.
+    """
+    key = id(tokenizer)
+    if key not in _newline_cache:
+        vocab_size = len(tokenizer)
+        texts = tokenizer.batch_decode([[i] for i in range(vocab_size)])
+        newline_ids = [i for i, t in enumerate(texts) if NEWLINE in t]
+        blank_ids = [i for i, t in enumerate(texts) if t and not t.strip()]
+        _newline_cache[key] = (newline_ids, blank_ids)
+    return _newline_cache[key]
@@ -0,0 +1,18 @@
+# tests/conftest.py
+'''
+pytest 공통 설정
+
+- 저장소 루트를 import 경로에 넣는다 (llm / app 패키지)
+- LLM 백엔드는 fake (모델 없이 결정적인 응답) — 모델 / GPU 가 없어도 llm.infer 를 import 할 수 있도록
+- torch / psycopg2 / Postgres 가 필요한 테스트는 각 파일에서 pytest.importorskip / skip 으로 건너뛴다
+'''
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("LLM_CACHE_ENABLED", "0")
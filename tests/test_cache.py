@@ -0,0 +1,150 @@
+# tests/test_cache.py
+'''
+llm.cache: 캐시 키 정규화 / 메모리 LRU / 보관 기간(TTL) / 공유 저장소 계층
+'''
+
+import pytest
+
+from llm import cache
+from llm.cache import ResultCache, make_key
+
+
+class DictStore:
+    """공유 저장소 대역 (Postgres 테이블 대신 dict)"""
+
+    def __init__(self, fail: bool = False):
+        self.rows = {}
+        self.fail = fail
+
+    def get(self, key):
+        if self.fail:
+            raise RuntimeError("store down")
+        return self.rows.get(key)
+
+    def put(self, key, mode, model_id, value):
+        if self.fail:
+            raise RuntimeError("store down")
+        self.rows[key] = (mode, model_id, value)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    return now
+
+
+def test_key_ignores_whitespace_differences():
+    a = make_key("m", "t", "short", {"temperature": 0.3}, "가로등이  고장났습니다.\n")
+    b = make_key("m", "t", "short", {"temperature": 0.3}, " 가로등이 고장났습니다.")
+    assert a == b
+
+
+@pytest.mark.parametrize("changed", [
+    dict(model_id="other"),
+    dict(template_ver="t2"),
+    dict(mode="long"),
+    dict(params={"temperature": 0.4}),
+    dict(text="다른 민원"),
+])
+def test_key_changes_with_each_component(changed):
+    base = dict(model_id="m", template_ver="t", mode="short", params={"temperature": 0.3}, text="민원")
+    args = dict(base, **changed)
+    assert make_key(args["model_id"], args["template_ver"], args["mode"], args["params"], args["text"]) != \
+        make_key(base["model_id"], base["template_ver"], base["mode"], base["params"], base["text"])
+
+
+def test_lru_evicts_least_recently_used():
+    c = ResultCache(max_entries=2)
+    c.put("a", "short", "m", "A")
+    c.put("b", "short", "m", "B")
+    assert c.get("a") == "A"          # a 를 최근 사용으로
+    c.put("c", "short", "m", "C")     # b 가 밀려난다
+    assert c.get("b") is None
+    assert c.get("a") == "A"
+    assert c.get("c") == "C"
+
+
+def test_entries_expire_after_max_age(clock):
+    c = ResultCache(max_age_seconds=60)
+    c.put("a", "short", "m", "A")
+    clock[0] += 59
+    assert c.get("a") == "A"
+    clock[0] += 2
+    assert c.get("a") is None
+    assert c.stats()["misses"] == 1
+
+
+def test_disabled_cache_never_returns():
+    c = ResultCache(enabled=False)
+    c.put("a", "short", "m", "A")
+    assert c.get("a") is None
+
+
+def test_empty_values_are_not_cached():
+    c = ResultCache()
+    c.put("a", "short", "m", "")
+    assert c.get("a") is None
+
+
+def test_store_hit_fills_memory():
+    store = DictStore()
+    store.rows["a"] = "A"
+    c = ResultCache()
+    c.attach_store(store)
+    assert c.get("a") == "A"
+    store.rows.clear()
+    assert c.get("a") == "A"   # 두 번째는 메모리에서
+    assert c.stats()["store_hits"] == 1
+    assert c.stats()["memory_hits"] == 1
+
+
+def test_put_records_model_id_in_store():
+    store = DictStore()
+    c = ResultCache()
+    c.attach_store(store)
+    c.put("a", "short", "small-model", "A")
+    assert store.rows["a"] == ("short", "small-model", "A")
+
+
+def test_store_errors_are_ignored():
+    c = ResultCache()
+    c.attach_store(DictStore(fail=True))
+    c.put("a", "short", "m", "A")        # 메모리에는 들어간다
+    assert c.get("a") == "A"
+    assert c.get("b") is None
+    assert c.stats()["store_errors"] == 2
+
+
+def test_get_or_compute_computes_once():
+    c = ResultCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return "A"
+
+    assert c.get_or_compute("a", "short", "m", compute) == "A"
+    assert c.get_or_compute("a", "short", "m", compute) == "A"
+    assert len(calls) == 1
+    # use_cache=False 는 조회를 건너뛰고 새 결과로 갱신
+    assert c.get_or_compute("a", "short", "m", lambda: "B", use_cache=False) == "B"
+    assert c.get("a") == "B"
+
+
+def test_summary_key_includes_pipeline_settings(monkeypatch):
+    from llm import infer
+
+    key = infer._short_key("민원")
+    monkeypatch.setattr(infer, "SUMMARY_INPUT_TOKENS", infer.SUMMARY_INPUT_TOKENS + 1)
+    assert infer._short_key("민원") != key
+    assert infer._short_key("민원") != infer._long_key("민원")
+
+
+def test_summary_records_producing_model(monkeypatch):
+    from llm import infer
+
+    recorded = []
+    monkeypatch.setattr(infer.result_cache, "put", lambda key, mode, model_id, value: recorded.append((mode, model_id)))
+    infer.summarize_short("가로등이 고장났습니다. 빠른 수리 부탁드립니다.")
+    assert recorded == [("short", infer.model_id_for("short"))]
@@ -0,0 +1,55 @@
+# tests/test_cascade.py
+'''
+llm.cascade.check: 작은 모델 요약을 그대로 쓸지 판정하는 규칙별 탈락 사유 / overlap 근거 비율
+'''
+
+import pytest
+
+from llm import cascade
+
+SOURCE = "화명1동 아파트 앞 도로에 불법주차 차량이 많아 통행이 어렵습니다. 단속을 요청합니다."
+
+
+def test_overlap_ignores_spacing_and_punctuation():
+    assert cascade.overlap("불법 주차!", SOURCE) == 1.0
+    assert cascade.overlap("해운대 해수욕장", SOURCE) == 0.0
+    assert cascade.overlap("", SOURCE) == 0.0
+
+
+def test_short_summary_passes():
+    assert cascade.check("short", "화명1동 불법주차 단속 요청", True, SOURCE) is None
+
+
+def test_long_summary_passes():
+    text = "화명1동 아파트 앞 도로에 불법주차 차량이 많습니다. 단속을 요청합니다. 끝."
+    assert cascade.check("long", text, True, SOURCE) is None
+
+
+@pytest.mark.parametrize("mode,text,stopped,reason", [
+    ("short", "   ", True, "empty"),
+    ("short", "[지침] 화명1동 불법주차", True, "prompt_leak"),
+    ("long", "### Response 불법주차 끝.", True, "prompt_leak"),
+    ("short", "화명1동 불법주차 " * 5, True, "too_long"),
+    ("short", "화명1동 불법주차 단속을 요청합니다.", True, "not_noun_phrase"),
+    ("long", "화명1동 불법주차 단속을 요청합니다.", False, "no_end_marker"),
+    ("long", "- 화명1동 불법주차\n- 단속 요청 끝.", True, "list_format"),
+    ("long", "1) 화명1동 불법주차 단속 요청 끝.", True, "list_format"),
+    ("long", " ".join(f"불법주차 {i}." for i in range(cascade.MAX_LONG_SENTENCES + 1)), True,
+     "too_many_sentences"),
+    ("long", "불법주차 단속 요청. 불법주차 단속 요청. 끝.", True, "repetition"),
+    ("short", "해운대 해수욕장 소음", True, "ungrounded"),
+])
+def test_rejection_reasons(mode, text, stopped, reason):
+    assert cascade.check(mode, text, stopped, SOURCE) == reason
+
+
+def test_short_mode_checks_first_line_only():
+    assert cascade.check("short", "화명1동 불법주차\n두 번째 줄은 요청합니다.", True, SOURCE) is None
+
+
+def test_min_overlap_threshold():
+    text = "화명1동 불법주차 소음"
+    ratio = cascade.overlap(text, SOURCE)
+    assert 0 < ratio < 1
+    assert cascade.check("short", text, True, SOURCE, min_overlap=ratio) is None
+    assert cascade.check("short", text, True, SOURCE, min_overlap=ratio + 0.01) == "ungrounded"
@@ -0,0 +1,47 @@
+# tests/test_chunking.py
+'''
+llm.chunking.split: 토큰 예산 안의 청크로 나누기 / llm.infer 의 map-reduce 요약 경로 (fake 백엔드)
+'''
+
+from llm import chunking
+
+TEXT = " ".join(f"{i}번째 문장입니다." for i in range(1, 41))
+
+
+def test_split_sentences_on_punctuation_and_newlines():
+    assert chunking.split_sentences("첫 문장. 둘째 문장!\n셋째 줄\n\n넷째?") == ["첫 문장.", "둘째 문장!", "셋째 줄", "넷째?"]
+
+
+def test_within_budget_returns_text_as_is():
+    assert chunking.split(f"  {TEXT}  ", total_tokens=100, budget=100) == [TEXT]
+
+
+def test_chunks_fit_budget_and_keep_sentence_order():
+    total = len(TEXT)   # 글자당 토큰 1개
+    chunks = chunking.split(TEXT, total_tokens=total, budget=60, margin=0.9)
+    assert len(chunks) > 1
+    assert all(len(c) <= 54 for c in chunks)
+    assert " ".join(chunks) == TEXT
+    # 문장 경계에서 자른다
+    assert all(c.endswith("입니다.") for c in chunks)
+
+
+def test_long_sentence_is_cut_by_characters():
+    text = "가" * 250
+    chunks = chunking.split(text, total_tokens=250, budget=100, margin=1.0)
+    assert [len(c) for c in chunks] == [100, 100, 50]
+    assert "".join(chunks) == text
+
+
+def test_map_reduce_summary_on_long_input(monkeypatch):
+    from llm import infer
+
+    monkeypatch.setattr(infer, "EXTRACTIVE_TOKENS", 0)
+    monkeypatch.setattr(infer, "SUMMARY_INPUT_TOKENS", 120)
+
+    chunks = infer._summary_chunks("long", TEXT)
+    assert chunks is not None and len(chunks) > 1
+    assert infer._summary_chunks("long", "짧은 민원입니다.") is None
+
+    raw = infer.summary_submit("long", TEXT).result(timeout=30)
+    assert raw.model_id.startswith("map-reduce(")
@@ -0,0 +1,70 @@
+# tests/test_extractive.py
+'''
+llm.extractive: 상투 문장 / 중복 제거, TextRank 중요도, 예산 안 추출 압축
+'''
+
+from llm import extractive
+
+COMPLAINT = "\n".join([
+    "안녕하세요.",
+    "화명1동 아파트 앞 도로에 불법주차 차량이 많습니다.",
+    "불법주차 차량 때문에 아파트 앞 도로 통행이 어렵습니다.",
+    "어제는 날씨가 맑았습니다.",
+    "화명1동 아파트 앞 도로에 불법주차 차량이 많습니다.",
+    "아파트 앞 도로 불법주차 단속을 요청합니다.",
+    "첨부파일 사진1.jpg",
+    "감사합니다.",
+])
+
+
+def test_is_boilerplate():
+    assert extractive.is_boilerplate("안녕하세요.")
+    assert extractive.is_boilerplate("수고하십니다~")
+    assert extractive.is_boilerplate("첨부 파일: 현장 사진")
+    assert extractive.is_boilerplate("현장사진.JPG")
+    assert not extractive.is_boilerplate("안녕하세요 화명1동 주민입니다. 불법주차 신고합니다.")
+
+
+def test_within_budget_returns_text_unchanged():
+    assert extractive.compress(f" {COMPLAINT} ", budget=len(COMPLAINT) + 10) == COMPLAINT
+    assert extractive.compress(COMPLAINT, budget=0) == COMPLAINT
+
+
+def test_textrank_ranks_central_sentence_higher():
+    sentences = [
+        "어제는 날씨가 맑았습니다.",
+        "아파트 앞 도로 불법주차 단속을 요청합니다.",
+        "불법주차 차량 때문에 아파트 앞 도로 통행이 어렵습니다.",
+        "아파트 앞 도로에 불법주차 차량이 많습니다.",
+    ]
+    scores = extractive.textrank(sentences)
+    assert len(scores) == len(sentences)
+    # 첫 문장 가산점이 있어도 다른 문장과 겹치지 않는 문장이 가장 낮다
+    assert scores[0] == min(scores)
+    assert extractive.textrank([]) == []
+
+
+def test_compress_drops_boilerplate_and_duplicates_within_budget():
+    budget = 100
+    out = extractive.compress(COMPLAINT, budget=budget)
+    lines = out.split("\n")
+    assert len(out) <= budget
+    assert "안녕하세요." not in lines and "감사합니다." not in lines
+    assert not any("첨부파일" in line for line in lines)
+    assert len(lines) == len(set(lines))
+    assert "어제는 날씨가 맑았습니다." not in lines
+    # 원래 순서 유지
+    original = COMPLAINT.split("\n")
+    assert lines == sorted(lines, key=original.index)
+
+
+def test_compress_uses_token_ratio():
+    # 글자당 토큰 2개면 같은 예산에 절반 분량만 들어간다
+    by_chars = extractive.compress(COMPLAINT, budget=100)
+    by_tokens = extractive.compress(COMPLAINT, budget=100, total_tokens=len(COMPLAINT) * 2)
+    assert len(by_tokens) * 2 <= 100 < len(by_chars) * 2
+
+
+def test_compress_truncates_first_sentence_when_nothing_fits():
+    text = "가" * 80 + ". " + "나" * 80 + "."
+    assert extractive.compress(text, budget=20) == "가" * 20
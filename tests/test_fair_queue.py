@@ -0,0 +1,102 @@
+# tests/test_fair_queue.py
+'''
+llm.fair_queue: 우선순위 클래스 / 사용자별 round-robin / 예약 자리(interactive 만 꺼내기) / fits 확인
+'''
+
+import queue
+import threading
+
+import pytest
+
+from llm.fair_queue import FairExecutor, FairQueue, check_priority
+
+
+def drain(q: FairQueue, **kwargs):
+    items = []
+    while True:
+        try:
+            items.append(q.get_nowait(**kwargs))
+        except queue.Empty:
+            return items
+
+
+def test_higher_priority_class_first():
+    q = FairQueue()
+    q.put("backfill", "backfill")
+    q.put("bulk", "bulk")
+    q.put("interactive", "interactive")
+    assert drain(q) == ["interactive", "bulk", "backfill"]
+
+
+def test_round_robin_between_users_fifo_within_user():
+    q = FairQueue()
+    for i in range(3):
+        q.put(f"a{i}", "bulk", user="a")
+    q.put("b0", "bulk", user="b")
+    q.put("c0", "bulk", user="c")
+    # 사용자 a 가 먼저 3건을 넣어도 b, c 는 각자 첫 차례에 나온다
+    assert drain(q) == ["a0", "b0", "c0", "a1", "a2"]
+
+
+def test_reserved_slots_take_only_interactive():
+    q = FairQueue()
+    q.put("bulk", "bulk", user="a")
+    with pytest.raises(queue.Empty):
+        q.get_nowait(priorities=("interactive",))
+    q.put("interactive", "interactive", user="b")
+    assert q.get_nowait(priorities=("interactive",)) == "interactive"
+    assert q.depth() == {"interactive": 0, "bulk": 1, "backfill": 0}
+
+
+def test_fits_leaves_the_next_item_in_place():
+    q = FairQueue()
+    q.put(("big", 3), user="a")
+    q.put(("small", 1), user="b")
+    with pytest.raises(queue.Empty):
+        q.get_nowait(fits=lambda item, priority: item[1] <= 2)
+    # 맞지 않은 항목이 그대로 다음 차례
+    assert q.get_nowait() == ("big", 3)
+    assert q.get_nowait(fits=lambda item, priority: item[1] <= 2) == ("small", 1)
+
+
+def test_get_times_out_when_empty():
+    with pytest.raises(queue.Empty):
+        FairQueue().get(timeout=0.01)
+
+
+def test_get_wakes_up_on_put():
+    q = FairQueue()
+    got = []
+    thread = threading.Thread(target=lambda: got.append(q.get(timeout=5)))
+    thread.start()
+    q.put("x")
+    thread.join(5)
+    assert got == ["x"]
+
+
+def test_stats_per_class():
+    q = FairQueue()
+    q.put("a", "bulk", user="a")
+    q.put("b", "bulk", user="b")
+    stats = q.stats()
+    assert stats["bulk"]["depth"] == 2
+    assert stats["bulk"]["users"] == 2
+    assert stats["interactive"]["depth"] == 0
+
+
+def test_unknown_priority_is_rejected():
+    with pytest.raises(ValueError):
+        check_priority("urgent")
+    with pytest.raises(ValueError):
+        FairQueue().put("x", "urgent")
+
+
+def test_fair_executor_runs_and_propagates_errors():
+    executor = FairExecutor(max_workers=1)
+    assert executor.submit(lambda x: x * 2, 21).result(5) == 42
+
+    def boom():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        executor.submit(boom, priority="bulk", user="a").result(5)
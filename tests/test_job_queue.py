@@ -0,0 +1,210 @@
+# tests/test_job_queue.py
+'''
+app.services.job_queue: 생성 작업의 등록 / 가져가기(claim) / 취소 상태 전이
+
+FOR UPDATE SKIP LOCKED / JSONB 를 쓰므로 Postgres 가 필요하다.
+TEST_DATABASE_URL 에 테스트 전용 DB 를 주면 실행 (없으면 건너뜀). 만든 행은 테스트가 끝나면 지운다.
+다른 queued 작업이 있으면 claim 순서가 달라지므로 비어 있는 DB 를 쓴다.
+'''
+
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if not DATABASE_URL:
+    pytest.skip("TEST_DATABASE_URL (Postgres) 가 없으면 건너뜀", allow_module_level=True)
+pytest.importorskip("psycopg2")
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.database import Base  # noqa: E402
+from app.models import Complaint, GenerationJob, User  # noqa: E402
+from app.services import job_queue  # noqa: E402
+from app.services.job_queue import JobCancelled, JobFailed  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def session_factory():
+    engine = create_engine(DATABASE_URL)
+    Base.metadata.create_all(engine, tables=[User.__table__, Complaint.__table__, GenerationJob.__table__])
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def complaints(session_factory):
+    """테스트용 사용자 + 민원 3건 → (user_uid, [민원 id])"""
+    session = session_factory()
+    user_uid = f"test-{uuid.uuid4()}"
+    session.add(User(user_uid=user_uid, user_id=user_uid, name="test", password="x"))
+    session.flush()
+    rows = [Complaint(user_uid=user_uid, title=f"민원 {i}", content="가로등 고장") for i in range(3)]
+    session.add_all(rows)
+    session.commit()
+    ids = [c.id for c in rows]
+    yield user_uid, ids
+
+    session.query(GenerationJob).filter(GenerationJob.complaint_id.in_(ids)).delete(synchronize_session=False)
+    session.query(Complaint).filter(Complaint.id.in_(ids)).delete(synchronize_session=False)
+    session.query(User).filter(User.user_uid == user_uid).delete(synchronize_session=False)
+    session.commit()
+    session.close()
+
+
+def status_of(session_factory, job_id):
+    session = session_factory()
+    try:
+        job = session.get(GenerationJob, job_id)
+        return job.status, job.waiters
+    finally:
+        session.close()
+
+
+def test_enqueue_reuses_the_active_job_and_counts_waiters(db, session_factory, complaints):
+    user_uid, (cid, _, _) = complaints
+    first = job_queue.enqueue(db, "reply", cid, user_uid)
+    second = job_queue.enqueue(db, "reply", cid, user_uid)
+    assert second.id == first.id
+    assert status_of(session_factory, first.id) == ("queued", 2)
+
+    # 종류 / 어댑터가 다르면 다른 작업
+    assert job_queue.enqueue(db, "reply-again", cid, user_uid).id != first.id
+    assert job_queue.enqueue(db, "reply", cid, user_uid, adapter="traffic").id != first.id
+    # 요약은 어댑터를 쓰지 않으므로 어댑터만 다른 요청도 같은 작업
+    summary = job_queue.enqueue(db, "summary", cid, user_uid)
+    assert job_queue.enqueue(db, "summary", cid, user_uid, adapter="traffic").id == summary.id
+
+
+def test_enqueue_rejects_unknown_kind_and_priority(db, complaints):
+    user_uid, (cid, _, _) = complaints
+    with pytest.raises(ValueError):
+        job_queue.enqueue(db, "translate", cid, user_uid)
+    with pytest.raises(ValueError):
+        job_queue.enqueue(db, "reply", cid, user_uid, priority="urgent")
+
+
+def test_interactive_request_promotes_a_queued_bulk_job(db, complaints):
+    user_uid, (cid, _, _) = complaints
+    bulk = job_queue.enqueue(db, "reply", cid, user_uid, priority="bulk")
+    promoted = job_queue.enqueue(db, "reply", cid, user_uid, priority="interactive")
+    assert promoted.id == bulk.id
+    assert promoted.priority == "interactive"
+
+
+def test_claim_takes_higher_priority_first(db, complaints):
+    user_uid, (a, b, _) = complaints
+    bulk = job_queue.enqueue(db, "reply", a, user_uid, priority="bulk")
+    interactive = job_queue.enqueue(db, "reply", b, user_uid, priority="interactive")
+
+    claimed = job_queue.claim(db, "w1")
+    assert claimed.id == interactive.id
+    assert (claimed.status, claimed.worker_id, claimed.attempts) == ("running", "w1", 1)
+    assert job_queue.claim(db, "w2").id == bulk.id
+    assert job_queue.claim(db, "w3") is None
+
+
+def test_claim_skips_rows_locked_by_another_worker(session_factory, complaints):
+    user_uid, (a, b, _) = complaints
+    setup = session_factory()
+    first = job_queue.enqueue(setup, "reply", a, user_uid)
+    second = job_queue.enqueue(setup, "reply", b, user_uid)
+    setup.close()
+
+    holder = session_factory()
+    holder.query(GenerationJob).filter(GenerationJob.id == first.id).with_for_update().one()
+    other = session_factory()
+    try:
+        assert job_queue.claim(other, "w2").id == second.id
+    finally:
+        holder.rollback()
+        holder.close()
+        other.close()
+
+
+def test_cancel_transitions(db, session_factory, complaints):
+    user_uid, (a, b, _) = complaints
+    queued = job_queue.enqueue(db, "reply", a, user_uid)
+    assert job_queue.cancel(db, queued.id) == "cancelled"
+
+    running = job_queue.enqueue(db, "reply", b, user_uid)
+    assert job_queue.claim(db, "w1").id == running.id
+    assert job_queue.cancel(db, running.id) == "cancelling"
+    assert job_queue.is_cancel_requested(db, running.id)
+    job_queue.mark_cancelled(db, running.id)
+    assert status_of(session_factory, running.id)[0] == "cancelled"
+
+    # 끝난 작업은 그대로, 없는 작업은 None
+    assert job_queue.cancel(db, running.id) == "cancelled"
+    assert job_queue.cancel(db, -1) is None
+
+
+def test_leave_cancels_only_when_the_last_waiter_leaves(db, session_factory, complaints):
+    user_uid, (a, b, _) = complaints
+    job = job_queue.enqueue(db, "reply", a, user_uid)
+    job_queue.enqueue(db, "reply", a, user_uid)
+
+    assert job_queue.leave(db, job.id) == "queued"
+    assert status_of(session_factory, job.id) == ("queued", 1)
+    assert job_queue.leave(db, job.id) == "cancelled"
+    # 취소된 작업에는 합류하지 않고 새 작업을 만든다
+    renewed = job_queue.enqueue(db, "reply", a, user_uid)
+    assert renewed.id != job.id
+    job_queue.cancel(db, renewed.id)
+
+    running = job_queue.enqueue(db, "reply", b, user_uid)
+    job_queue.claim(db, "w1")
+    assert job_queue.leave(db, running.id) == "cancelling"
+
+
+def test_claim_recovers_stale_running_jobs(db, session_factory, complaints):
+    user_uid, (a, b, _) = complaints
+    job = job_queue.enqueue(db, "reply", a, user_uid)
+    job_queue.claim(db, "dead-worker")
+    stale = datetime.utcnow() - timedelta(seconds=120)
+    db.query(GenerationJob).filter(GenerationJob.id == job.id).update({"heartbeat_at": stale})
+    db.commit()
+
+    reclaimed = job_queue.claim(db, "w2", lease_seconds=60)
+    assert (reclaimed.id, reclaimed.worker_id, reclaimed.attempts) == (job.id, "w2", 2)
+
+    # max_attempts 를 넘게 끊긴 작업은 실패 처리
+    db.query(GenerationJob).filter(GenerationJob.id == job.id).update({"heartbeat_at": stale})
+    db.commit()
+    assert job_queue.claim(db, "w3", lease_seconds=60, max_attempts=2) is None
+    assert status_of(session_factory, job.id)[0] == "failed"
+
+
+def test_wait_for_job(db, session_factory, complaints):
+    user_uid, (a, b, c) = complaints
+    done = job_queue.enqueue(db, "reply", a, user_uid)
+    job_queue.complete(db, done.id, {"reply_id": 7})
+    assert job_queue.wait_for_job(session_factory, done.id, timeout=1) == {"reply_id": 7}
+
+    failed = job_queue.enqueue(db, "reply", b, user_uid)
+    job_queue.fail(db, failed.id, "모델 오류")
+    with pytest.raises(JobFailed):
+        job_queue.wait_for_job(session_factory, failed.id, timeout=1)
+
+    # 다른 요청도 기다리는 작업은 떠나도 취소되지 않는다
+    shared = job_queue.enqueue(db, "reply", c, user_uid)
+    job_queue.enqueue(db, "reply", c, user_uid)
+    with pytest.raises(JobCancelled):
+        job_queue.wait_for_job(session_factory, shared.id, timeout=1, should_cancel=lambda: True)
+    assert status_of(session_factory, shared.id) == ("queued", 1)
+
+    # 삭제된 작업
+    db.query(GenerationJob).filter(GenerationJob.id == shared.id).delete()
+    db.commit()
+    with pytest.raises(JobFailed):
+        job_queue.wait_for_job(session_factory, shared.id, timeout=1)
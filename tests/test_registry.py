@@ -0,0 +1,139 @@
+# tests/test_registry.py
+'''
+llm.registry.ModelRegistry: 한 번만 로딩 / 메모리 예산을 넘으면 유휴 모델부터 LRU 해제 / pinned·사용 중 모델은 유지
+'''
+
+import threading
+import time
+
+import pytest
+
+from llm.registry import ModelRegistry
+
+
+class Model:
+    def __init__(self, name: str, ram: int):
+        self.name = name
+        self.ram = ram
+
+    def footprint(self):
+        return {"ram": self.ram, "vram": 0}
+
+
+class Loader:
+    """load / unload 호출 기록 (unload 가 어느 스레드에서 불렸는지도)"""
+
+    def __init__(self, name: str, ram: int = 100):
+        self.name = name
+        self.ram = ram
+        self.loads = 0
+        self.unload_threads = []
+
+    def load(self):
+        self.loads += 1
+        return Model(self.name, self.ram)
+
+    def unload(self, obj):
+        self.unload_threads.append(threading.current_thread().name)
+
+
+def register(registry: ModelRegistry, loader: Loader, pinned: bool = False):
+    registry.register(loader.name, load=loader.load, unload=loader.unload, pinned=pinned)
+
+
+def settle(registry: ModelRegistry):
+    """release 뒤 레지스트리 스레드에서 도는 예산 확인이 끝날 때까지 기다린다"""
+    registry._evictor.submit(lambda: None).result(5)
+
+
+def test_loads_once_under_concurrent_first_use():
+    registry = ModelRegistry()
+    loader = Loader("m")
+    loader_load = loader.load
+
+    def slow_load():
+        time.sleep(0.05)
+        return loader_load()
+
+    registry.register("m", load=slow_load)
+    threads = [threading.Thread(target=registry.load, args=("m",)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert loader.loads == 1
+    assert registry.is_loaded("m")
+
+
+def test_evicts_least_recently_used_idle_model_over_budget():
+    registry = ModelRegistry(ram_budget=250)
+    a, b, c = Loader("a"), Loader("b"), Loader("c")
+    for loader in (a, b, c):
+        register(registry, loader)
+
+    registry.load("a")
+    time.sleep(0.01)
+    registry.load("b")
+    time.sleep(0.01)
+    registry.load("c")   # 300 > 250 → 가장 오래 안 쓴 a 해제
+    settle(registry)
+
+    assert not registry.is_loaded("a")
+    assert registry.is_loaded("b") and registry.is_loaded("c")
+    assert registry.stats()["models"]["a"]["evictions"] == 1
+
+    registry.load("a")   # 다음에 쓰일 때 다시 로딩
+    settle(registry)
+    assert a.loads == 2
+    assert not registry.is_loaded("b")
+
+
+def test_pinned_and_in_use_models_are_not_evicted():
+    registry = ModelRegistry(ram_budget=150)
+    primary, small, other = Loader("primary"), Loader("small"), Loader("other")
+    register(registry, primary, pinned=True)
+    register(registry, small)
+    register(registry, other)
+
+    registry.load("primary")
+    _, release = registry.acquire("small")    # 사용 중
+    settle(registry)
+    assert registry.is_loaded("primary") and registry.is_loaded("small")
+    assert registry.evict("primary") is False
+    assert registry.evict("small") is False
+
+    release()
+    settle(registry)
+    assert not registry.is_loaded("small")    # 반납하면 유일한 해제 대상
+    assert registry.is_loaded("primary")
+
+
+def test_release_never_unloads_on_the_releasing_thread():
+    # Future 완료 콜백(배치 스케줄러 스레드)에서 release 해도 해제는 레지스트리 스레드에서
+    registry = ModelRegistry(ram_budget=150)
+    primary, small = Loader("primary"), Loader("small")
+    register(registry, primary, pinned=True)
+    register(registry, small)
+    registry.load("primary")
+    _, release = registry.acquire("small")
+
+    thread = threading.Thread(target=release, name="llm-scheduler")
+    thread.start()
+    thread.join(5)
+    settle(registry)
+
+    assert small.unload_threads and "llm-scheduler" not in small.unload_threads
+
+
+def test_release_is_idempotent():
+    registry = ModelRegistry()
+    register(registry, Loader("m"))
+    _, release = registry.acquire("m")
+    release()
+    release()
+    assert registry.stats()["models"]["m"]["in_use"] == 0
+
+
+def test_unknown_model_raises_key_error():
+    with pytest.raises(KeyError):
+        ModelRegistry().acquire("missing")
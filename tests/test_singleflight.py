@@ -0,0 +1,108 @@
+# tests/test_singleflight.py
+'''
+app.services.singleflight: 프로세스 안의 single-flight 와 advisory lock 을 쓰지 않을 때의 Coalescer.hold
+(advisory lock 자체는 Postgres 가 필요해서 여기서는 다루지 않는다)
+'''
+
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("psycopg2")   # app 패키지 import 시 Postgres 엔진을 만든다
+
+from app.services.singleflight import Coalescer, SingleFlight  # noqa: E402
+
+
+def run_in_thread(fn):
+    result = {}
+
+    def target():
+        try:
+            result["value"] = fn()
+        except BaseException as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    return thread, result
+
+
+def test_concurrent_calls_share_the_leader_result():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 42
+
+    leader, leader_result = run_in_thread(lambda: flight.do("k", work))
+    started.wait(5)
+    follower, follower_result = run_in_thread(lambda: flight.do("k", work))
+    time.sleep(0.05)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert calls == [1]
+    assert leader_result["value"] == (42, False)
+    assert follower_result["value"] == (42, True)
+
+
+def test_followers_receive_the_leader_exception():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def work():
+        started.set()
+        release.wait(5)
+        raise ValueError("boom")
+
+    leader, leader_result = run_in_thread(lambda: flight.do("k", work))
+    started.wait(5)
+    follower, follower_result = run_in_thread(lambda: flight.do("k", lambda: "unused"))
+    time.sleep(0.05)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert isinstance(leader_result["error"], ValueError)
+    assert isinstance(follower_result["error"], ValueError)
+
+
+def test_sequential_calls_run_again():
+    flight = SingleFlight()
+    assert flight.do("k", lambda: 1) == (1, False)
+    assert flight.do("k", lambda: 2) == (2, False)
+
+
+def test_hold_without_advisory_lock_excludes_run():
+    coalescer = Coalescer(engine=None)
+    with coalescer.hold([("reply", 1), ("summary", 1)]) as held:
+        assert held == {("reply", 1), ("summary", 1)}
+        waiter, result = run_in_thread(lambda: coalescer.run(("reply", 1), lambda: "ran"))
+        time.sleep(0.1)
+        assert waiter.is_alive()   # 잡아 둔 동안에는 실행하지 않는다
+    waiter.join(5)
+    # 풀린 뒤에는 결과를 공유하지 않고 직접 실행
+    assert result["value"] == "ran"
+
+
+def test_hold_skips_keys_with_a_call_in_flight():
+    coalescer = Coalescer(engine=None)
+    started, release = threading.Event(), threading.Event()
+
+    def work():
+        started.set()
+        release.wait(5)
+        return "done"
+
+    runner, _ = run_in_thread(lambda: coalescer.run(("reply", 2), work))
+    started.wait(5)
+    with coalescer.hold([("reply", 2), ("reply", 3)]) as held:
+        assert held == {("reply", 3)}
+    release.set()
+    runner.join(5)
@@ -0,0 +1,78 @@
+# tests/test_stopping.py
+'''
+llm.stopping.StopOnAnyStopWords: 시퀀스별 마지막 window 토큰만 보고 종료 여부를 판정하는지
+'''
+
+from types import SimpleNamespace
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from llm.stopping import StopOnAnyStopWords  # noqa: E402
+
+
+class CharTokenizer:
+    """글자 하나 = 토큰 하나인 테스트용 토크나이저 (id 는 어휘 안의 순서)"""
+
+    def __init__(self, alphabet: str):
+        self.vocab = sorted(set(alphabet))
+        self.ids = {c: i for i, c in enumerate(self.vocab)}
+
+    def __call__(self, text: str, add_special_tokens: bool = False):
+        return SimpleNamespace(input_ids=[self.ids[c] for c in text])
+
+    def __len__(self):
+        return len(self.vocab)
+
+    def batch_decode(self, sequences):
+        return ["".join(self.vocab[i] for i in seq) for seq in sequences]
+
+
+ALPHABET = "가나다라끝.end \n"
+
+
+def tails(tok: CharTokenizer, texts, window: int) -> "torch.Tensor":
+    """문자열별 마지막 window 토큰 (모자라면 -1 로 왼쪽 패딩)"""
+    rows = []
+    for text in texts:
+        ids = tok(text).input_ids[-window:]
+        rows.append([-1] * (window - len(ids)) + ids)
+    return torch.tensor(rows, dtype=torch.long)
+
+
+@pytest.fixture
+def tok():
+    return CharTokenizer(ALPHABET)
+
+
+def test_matches_only_rows_ending_with_a_stop_word(tok):
+    criteria = StopOnAnyStopWords(tok, ["끝.", "end."])
+    hit = criteria.match(tails(tok, ["가나다 끝.", "가나다", "나 end.", "끝. 가나"], criteria.window))
+    assert hit.tolist() == [True, False, True, False]
+
+
+def test_window_is_longest_stop_word(tok):
+    criteria = StopOnAnyStopWords(tok, ["끝.", "end."])
+    assert criteria.window == len("end.")
+
+
+def test_short_tail_is_padded(tok):
+    criteria = StopOnAnyStopWords(tok, ["end."])
+    # window 보다 짧은 tail 도 받는다 (막 생성을 시작한 시퀀스)
+    tail = tails(tok, ["끝."], 2)
+    assert criteria.match(tail).tolist() == [False]
+
+
+def test_newline_after_content_stops(tok):
+    criteria = StopOnAnyStopWords(tok, ["끝.", "\n"])
+    hit = criteria.match(tails(tok, ["가나다\n", "가나\n\n", " \n", "가나다"], criteria.window))
+    # 내용 토큰 바로 뒤의 줄바꿈만 종료. 빈 줄 / 공백 뒤의 줄바꿈은 계속
+    assert hit.tolist() == [True, False, False, False]
+
+
+def test_call_uses_last_window_tokens(tok):
+    criteria = StopOnAnyStopWords(tok, ["끝."])
+    input_ids = torch.tensor([tok("가나다라가나다라끝.").input_ids, tok("가나다라가나다라가나").input_ids])
+    assert criteria(input_ids, None).tolist() == [True, False]